@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 import inspect
 from langgraph.types import Command
 from agents.llms import get_llm
-from agents.tools import web_search_chat, get_recent_prices
+from agents.tools import web_search_chat, get_recent_prices, get_portfolio_analytics, get_technical_indicators, backtest_strategy
 from agents.custom_tool_node import CustomToolNode, call_tool_condition, tool_return_condition
 from agents.state import ChatAgentState
 from pathlib import Path
@@ -20,7 +20,7 @@ def create_graph() -> StateGraph:
     # Define nodes
 
     # Tool nodes
-    tools = [web_search_chat, get_recent_prices]
+    tools = [web_search_chat, get_recent_prices, get_portfolio_analytics, get_technical_indicators, backtest_strategy]
 
     # Tool call node
     tool_node = CustomToolNode(tools)
@@ -97,12 +97,13 @@ def create_graph() -> StateGraph:
     # Compile the graph
     return workflow.compile()
 
-def get_response(question: str, messages = None, graph_execution = None, recursion_count = None):
+def get_response(question: str, messages = None, graph_execution = None, recursion_count = None, username = None):
     """
     Run the chat agent workflow with the given question.
     
     Args:
         question: The user's question about their portfolio
+        username: The logged-in user, so tools can read their portfolio
         
     Returns:
         The final state after the workflow completes
@@ -118,6 +119,7 @@ def get_response(question: str, messages = None, graph_execution = None, recursi
 
     initial_state = {
         'question': question,
+        'username': username or '',
         'messages': messages if messages is not None else [SystemMessage(content=agent_system_message),HumanMessage(content=question)],
         'response': '',
         'urls':[],
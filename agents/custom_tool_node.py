@@ -93,7 +93,8 @@ class CustomToolNode:
             # Always extend messages and graph_execution
             merged_update["messages"].extend(cmd.update.get("messages", []))
 
-            if "graph_execution" in cmd.update:
+            # Tools append their events to the state's own list; only extend with other lists
+            if "graph_execution" in cmd.update and cmd.update["graph_execution"] is not merged_update["graph_execution"]:
                 merged_update["graph_execution"].extend(cmd.update.get("graph_execution"))
             
             # For other fields, store the latest value
@@ -7,14 +7,23 @@ from langgraph.graph.state import CompiledStateGraph
 import os
 from dotenv import load_dotenv
 import inspect
-from langgraph.types import Command
+from langgraph.types import Command, Send
+from langgraph.graph import START
 #from src.state import AgentState
 from agents.llms import get_llm
 from agents.tools import web_search, reach_conclusion
 from agents.custom_tool_node import CustomToolNode, call_tool_condition, tool_return_condition
-from agents.state import NewsAgentState
+from agents.state import NewsAgentState, BatchNewsAgentState
+from agents.search_context import open_context, close_context
 from pathlib import Path
 from datetime import datetime
+import time
+
+# Symbols researched at once by a batch run, to stay within LLM and search rate limits
+BATCH_CONCURRENCY = int(os.getenv("NEWS_BATCH_CONCURRENCY", "4"))
+
+# Token counters reported per LLM call and summed per symbol and per batch
+TOKEN_KEYS = ('input_tokens', 'output_tokens', 'total_tokens')
 
 
 
@@ -45,6 +54,7 @@ def create_graph()-> StateGraph:
         llm = llm.bind_tools(tools)
 
 
+        started = time.perf_counter()
         if state["messages"] != []:
 
             try: 
@@ -59,7 +69,8 @@ def create_graph()-> StateGraph:
 
         activity_type = 'tool_call' if response.tool_calls else 'ai'
 
-        event = {'activity': 'agent', 'activity_type': activity_type , 'status': 'success'}
+        event = {'activity': 'agent', 'activity_type': activity_type , 'status': 'success',
+                 'tokens': _token_usage(response), 'seconds': time.perf_counter() - started}
 
         # get the existing state variables
         messages = state.get('messages',[])
@@ -99,9 +110,11 @@ def create_graph()-> StateGraph:
 
                     messages_to_summarize.append(AIMessage(content=msg.content))
 
+        started = time.perf_counter()
         response = llm.invoke(messages_to_summarize)
         final_verdict = response.content
-        event = {'activity': 'summarize', 'activity_type': 'ai' , 'status': 'success'}
+        event = {'activity': 'summarize', 'activity_type': 'ai' , 'status': 'success',
+                 'tokens': _token_usage(response), 'seconds': time.perf_counter() - started}
 
         # get the existing state variables
         graph_execution = state.get("graph_execution", [])
@@ -158,18 +171,9 @@ def create_graph()-> StateGraph:
 def run_workflow(stock_code:str):
 
     # Load judge instructions
-    with open("agents/instructions/news_agent_instructions.md","r") as f:
-        agent_system_message= f.read()
+    agent_system_message = _load_instructions()
 
-    initial_state = {
-        "stock_code": stock_code,
-        "messages": [SystemMessage(content=agent_system_message ), HumanMessage(content=f"instruct how to research on this stock code: {stock_code}")],
-        "urls": [],
-        "reached_conclusion": False,
-        "final_verdict": "",
-        "graph_execution":[],
-        "recursion_count": 0
-    }
+    initial_state = _initial_state(stock_code, agent_system_message)
 
     # Create the graph
     graph = create_graph()
@@ -179,3 +183,137 @@ def run_workflow(stock_code:str):
     result = graph.invoke(initial_state)
 
     return result
+
+def create_batch_graph(system_message: str) -> CompiledStateGraph:
+    """
+    Create the graph researching several stocks in one run: the stock codes are fanned out
+    with Send to a research node, which runs the single-stock graph for its stock code.
+    Branches run in parallel and their results are merged into the 'results' state key.
+
+    Only searches and page downloads are shared between branches. Each stock code still
+    gets the full single-stock run, with its own copy of the system prompt, its own agent
+    loop and its own summary, so a batch makes as many LLM calls as separate runs
+    (see benchmarks/bench_news_batch.py).
+
+    Args:
+        system_message: Agent instructions, loaded once for the whole batch
+
+    Returns:
+        Compiled batch graph, invoked with a BatchNewsAgentState
+    """
+    # One compiled single-stock graph shared by every branch
+    symbol_graph = create_graph()
+
+    def fan_out(state: BatchNewsAgentState):
+        """Start one research branch per distinct stock code"""
+        return [Send("research", {"stock_code": stock_code, "batch_id": state["batch_id"]})
+                for stock_code in dict.fromkeys(state["stock_codes"])]
+
+    def research(branch: dict):
+        """Research one stock code with the single-stock graph and account its tokens and latency"""
+        stock_code = branch["stock_code"]
+        started = time.perf_counter()
+        try:
+            result = symbol_graph.invoke(_initial_state(stock_code, system_message, branch["batch_id"]))
+            graph_execution = result.get("graph_execution", [])
+            symbol_result = {
+                "final_verdict": result.get("final_verdict", ""),
+                "urls": list(dict.fromkeys(result.get("urls", []))),
+                "graph_execution": graph_execution,
+                "tokens": usage_totals(graph_execution),
+                "error": None
+            }
+        except Exception as e:
+            print(f"Error researching {stock_code}: {e}")
+            symbol_result = {"final_verdict": "", "urls": [], "graph_execution": [],
+                             "tokens": usage_totals([]), "error": str(e)}
+        symbol_result["seconds"] = time.perf_counter() - started
+        return {"results": {stock_code: symbol_result}}
+
+    workflow = StateGraph(BatchNewsAgentState)
+    workflow.add_node("research", research)
+    workflow.add_conditional_edges(START, fan_out, ["research"])
+    workflow.add_edge("research", END)
+    return workflow.compile()
+
+def run_batch_workflow(stock_codes: List[str], max_concurrency: int = None) -> dict:
+    """
+    Research several stocks in one graph run. Symbols are researched in parallel and share
+    one search context, so related holdings (e.g., NVDA and AMD) reuse each other's search
+    results and fetched pages instead of repeating them. Planning and summarization are not
+    shared: LLM calls and tokens are those of separate runs.
+
+    Args:
+        stock_codes: Stock codes to research; duplicates are researched once
+        max_concurrency: Stocks researched at once, defaults to NEWS_BATCH_CONCURRENCY
+
+    Returns:
+        Dictionary with 'results' (stock code -> final_verdict, urls, graph_execution, tokens,
+        seconds and error), the batch 'tokens' and wall-clock 'seconds', and the
+        'search' reuse counters of the shared search context
+    """
+    started = time.perf_counter()
+    batch_id = open_context()
+    try:
+        graph = create_batch_graph(_load_instructions())
+        result = graph.invoke(
+            {"stock_codes": list(stock_codes), "batch_id": batch_id, "results": {}},
+            config={"max_concurrency": max_concurrency or BATCH_CONCURRENCY}
+        )
+    finally:
+        context = close_context(batch_id)
+
+    results = result.get("results", {})
+    tokens = {key: sum(symbol["tokens"][key] for symbol in results.values()) for key in TOKEN_KEYS + ('llm_calls',)}
+    return {
+        "results": results,
+        "tokens": tokens,
+        "seconds": time.perf_counter() - started,
+        "search": context.stats() if context is not None else {}
+    }
+
+def usage_totals(graph_execution: List[dict]) -> dict:
+    """
+    Sum the token usage recorded in the events of a graph run.
+
+    Args:
+        graph_execution: Events of the run
+
+    Returns:
+        Dictionary with input_tokens, output_tokens, total_tokens and llm_calls
+    """
+    totals = dict.fromkeys(TOKEN_KEYS, 0)
+    totals['llm_calls'] = 0
+    for event in graph_execution:
+        tokens = event.get('tokens')
+        if tokens is None:
+            continue
+        totals['llm_calls'] += 1
+        for key in TOKEN_KEYS:
+            totals[key] += tokens.get(key, 0)
+    return totals
+
+def _token_usage(response) -> dict:
+    """Token usage reported with an LLM response, zeros if the provider reports none."""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    return {key: usage.get(key, 0) or 0 for key in TOKEN_KEYS}
+
+def _load_instructions() -> str:
+    """Load the news agent system message."""
+    with open("agents/instructions/news_agent_instructions.md","r") as f:
+        return f.read()
+
+def _initial_state(stock_code: str, system_message: str, batch_id: str = None) -> dict:
+    """Initial single-stock state, optionally tied to the search context of a batch run."""
+    initial_state = {
+        "stock_code": stock_code,
+        "messages": [SystemMessage(content=system_message ), HumanMessage(content=f"instruct how to research on this stock code: {stock_code}")],
+        "urls": [],
+        "reached_conclusion": False,
+        "final_verdict": "",
+        "graph_execution":[],
+        "recursion_count": 0
+    }
+    if batch_id:
+        initial_state["batch_id"] = batch_id
+    return initial_state
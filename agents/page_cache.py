@@ -0,0 +1,307 @@
+"""
+Persistent cache of the pages fetched by the agents' web search tools.
+The same finance pages come up in search after search, across agent runs and users, so the
+extracted text of each page is kept in a SQLite database (data/page_cache.db) keyed by its
+normalized URL. A page is served from the cache until its domain's TTL expires; it is then
+revalidated with a conditional request (ETag / Last-Modified), which costs a round trip but
+no download or parsing when the page is unchanged. The database is bounded in size by
+evicting the least recently used pages.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from agents.web_fetch import FetchCancelled, download, extract_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    domain TEXT NOT NULL,
+    text TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+"""
+
+# Database file the pages are cached in
+CACHE_PATH = Path(__file__).resolve().parents[1] / "data" / "page_cache.db"
+
+# Seconds a page is served without revalidation, per domain (subdomains included)
+DEFAULT_TTL = 1800.0
+DOMAIN_TTLS = {
+    "finance.yahoo.com": 900.0,
+    "reuters.com": 900.0,
+    "cnbc.com": 900.0,
+    "marketwatch.com": 900.0,
+    "sec.gov": 86400.0,
+    "wikipedia.org": 86400.0,
+    "investopedia.com": 86400.0
+}
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src")
+
+class PageCache:
+    """
+    URL -> extracted page text cache with per-domain TTLs, conditional revalidation and LRU eviction.
+
+    Args:
+        path: SQLite database file, defaults to data/page_cache.db
+        max_bytes: Size of the cached text above which least recently used pages are evicted;
+                   0 disables the cache
+        default_ttl: Seconds a page of a domain without its own TTL is fresh
+        domain_ttls: Domain -> seconds its pages are fresh, matched against the host and its parent domains
+        clock: Wall-clock time function (timestamps are persisted), injectable for tests
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: float = DEFAULT_TTL, domain_ttls: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.path = Path(path) if path is not None else CACHE_PATH
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.domain_ttls = dict(DOMAIN_TTLS if domain_ttls is None else domain_ttls)
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Lookups served from the cache (hits), after a 304 (revalidated) or from a stale copy because
+        # the site failed (stale), and lookups that downloaded the page (misses, changed pages: refreshed)
+        self.hits = 0
+        self.revalidated = 0
+        self.stale = 0
+        self.misses = 0
+        self.refreshed = 0
+        self.evictions = 0
+
+    def fetch(self, url: str, cancel: Optional[threading.Event] = None) -> str:
+        """
+        Get the text of a page, from the cache when possible.
+
+        Args:
+            url: Page URL
+            cancel: Event set when the download is no longer needed
+
+        Returns:
+            The page text
+
+        Raises:
+            FetchCancelled: If cancel was set before the download finished
+            requests.RequestException: If the page cannot be fetched and has no cached copy
+        """
+        if self.max_bytes <= 0:
+            response, body = download(url, cancel)
+            response.raise_for_status()
+            return extract_text(body, response.encoding)
+
+        key = normalize_url(url)
+        now = self._clock()
+        row = self._lookup(key)
+        if row is not None and now < row["expires_at"]:
+            self._touch(key, now)
+            self._count("hits")
+            return row["text"]
+
+        # Stale or missing: ask the site, with the validators of the cached copy
+        headers = {}
+        if row is not None:
+            if row["etag"]:
+                headers["If-None-Match"] = row["etag"]
+            if row["last_modified"]:
+                headers["If-Modified-Since"] = row["last_modified"]
+        try:
+            response, body = download(url, cancel, headers)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except FetchCancelled:
+            raise
+        except requests.RequestException:
+            if row is None:
+                raise
+            # The site is down or unreachable: an outdated page beats no page
+            self._count("stale")
+            return row["text"]
+
+        if response.status_code == 304 and row is not None:
+            self._renew(key, url, response, row, now)
+            self._count("revalidated")
+            return row["text"]
+
+        response.raise_for_status()
+        text = extract_text(body, response.encoding)
+        if "no-store" not in response.headers.get("Cache-Control", ""):
+            self._store(key, url, response, text, now)
+        self._count("refreshed" if row is not None else "misses")
+        return text
+
+    def ttl(self, url: str) -> float:
+        """
+        Seconds a page of this URL's domain is served without revalidation.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            TTL of the most specific configured domain, or the default TTL
+        """
+        host = (urlsplit(url).hostname or "").lower()
+        parts = host.split(".")
+        for i in range(len(parts)):
+            ttl = self.domain_ttls.get(".".join(parts[i:]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with the lookup counters, hit_rate (lookups answered without a download),
+            evictions, and the entries and bytes in the database
+        """
+        entries, size = 0, 0
+        if self.max_bytes > 0:
+            entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        with self._lock:
+            served = self.hits + self.revalidated + self.stale
+            lookups = served + self.misses + self.refreshed
+            return {
+                'lookups': lookups,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'stale': self.stale,
+                'misses': self.misses,
+                'refreshed': self.refreshed,
+                'hit_rate': served / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': size
+            }
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pages")
+
+    def close(self) -> None:
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _lookup(self, key: str) -> Optional[sqlite3.Row]:
+        return self._conn().execute(
+            "SELECT text, etag, last_modified, expires_at FROM pages WHERE key = ?", (key,)).fetchone()
+
+    def _touch(self, key: str, now: float) -> None:
+        with self._transaction() as conn:
+            conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key))
+
+    def _renew(self, key: str, url: str, response: requests.Response, row: sqlite3.Row, now: float) -> None:
+        """Extend a page confirmed unchanged by a 304, keeping validators the response did not resend."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, fetched_at = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                (response.headers.get("ETag", row["etag"]), response.headers.get("Last-Modified", row["last_modified"]),
+                 now, now + self.ttl(url), now, key))
+
+    def _store(self, key: str, url: str, response: requests.Response, text: str, now: float) -> None:
+        """Insert or replace a page, then evict least recently used pages beyond max_bytes."""
+        size = len(key) + len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (key, domain, text, etag, last_modified, fetched_at, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, urlsplit(key).hostname or "", text, response.headers.get("ETag"),
+                 response.headers.get("Last-Modified"), now, now + self.ttl(url), now, size))
+            # Keep the most recently used pages that fit in max_bytes
+            evicted = conn.execute(
+                "DELETE FROM pages WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY accessed_at DESC, key ROWS UNBOUNDED PRECEDING) AS kept FROM pages) WHERE kept > ?)",
+                (self.max_bytes,)).rowcount
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode with explicit transactions; creates the database on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last cached pages in a power failure only costs a download
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so variants of one page share a cache entry: lowercase scheme and host,
+    no default port, fragment or tracking parameters, and sorted query parameters.
+
+    Args:
+        url: Page URL
+
+    Returns:
+        Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not name.lower().startswith(TRACKING_PARAMS))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+def _domain_ttls(spec: str) -> Dict[str, float]:
+    """Parse PAGE_CACHE_DOMAIN_TTLS, e.g. 'reuters.com=600,sec.gov=86400', over the built-in TTLs."""
+    ttls = dict(DOMAIN_TTLS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        domain, _, seconds = item.partition("=")
+        try:
+            ttls[domain.strip().lower()] = float(seconds)
+        except ValueError:
+            print(f"Ignoring invalid page cache TTL '{item}'")
+    return ttls
+
+# Shared page cache, used by the web search tools
+page_cache = PageCache(
+    Path(os.getenv("PAGE_CACHE_PATH", CACHE_PATH)),
+    max_bytes=int(os.getenv("PAGE_CACHE_BYTES", str(64 * 1024 * 1024))),
+    default_ttl=float(os.getenv("PAGE_CACHE_TTL", str(DEFAULT_TTL))),
+    domain_ttls=_domain_ttls(os.getenv("PAGE_CACHE_DOMAIN_TTLS", ""))
+)
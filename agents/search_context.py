@@ -0,0 +1,140 @@
+"""
+Search context shared by the symbols researched in one batch run of the news agent.
+Related holdings (e.g., NVDA and AMD) tend to issue the same sector queries and land on the
+same articles, so web_search results and fetched pages are kept per batch and reused by
+every symbol of that batch instead of being searched and downloaded again.
+"""
+
+import threading
+import uuid
+from typing import Callable, Dict, Optional
+
+from agents.web_fetch import FetchCancelled
+
+# Seconds between checks of a waiting lookup's cancel event
+WAIT_INTERVAL = 0.05
+
+class SearchContext:
+    """
+    Thread-safe cache of search results and page texts for one batch run.
+    Concurrent lookups of the same key share one fetch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> value, and key -> Event set when its in-flight fetch finishes
+        self._queries = {}
+        self._pages = {}
+        self._inflight = {}
+        self.query_hits = 0
+        self.query_misses = 0
+        self.page_hits = 0
+        self.page_misses = 0
+
+    def search(self, query: str, fetch: Callable[[str], list]) -> list:
+        """
+        Get the results of a search query, running it once per batch.
+
+        Args:
+            query: Search query; queries differing only in case or spacing share results
+            fetch: Function running the query, called as fetch(query)
+
+        Returns:
+            The search results (do not modify them)
+        """
+        return self._get(self._queries, ("query", " ".join(query.lower().split())), query, fetch)
+
+    def page(self, url: str, fetch: Callable[[str], Optional[str]],
+             cancel: Optional[threading.Event] = None) -> Optional[str]:
+        """
+        Get the text of a page, downloading it once per batch.
+
+        Args:
+            url: Page URL
+            fetch: Function downloading and extracting the page text, called as fetch(url)
+            cancel: Event set when the page is no longer needed; a caller waiting for another
+                    symbol's download of the page stops waiting once it is set
+
+        Returns:
+            The page text, or None if it could not be fetched
+
+        Raises:
+            FetchCancelled: If cancel was set while waiting for another symbol's download
+        """
+        return self._get(self._pages, ("page", url), url, fetch, cancel)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get reuse counters.
+
+        Returns:
+            Dictionary with query and page hits and misses
+        """
+        with self._lock:
+            return {
+                'query_hits': self.query_hits,
+                'query_misses': self.query_misses,
+                'page_hits': self.page_hits,
+                'page_misses': self.page_misses
+            }
+
+    def _get(self, store: dict, key: tuple, arg: str, fetch: Callable, cancel: Optional[threading.Event] = None):
+        kind = key[0]
+        while True:
+            with self._lock:
+                if key[1] in store:
+                    setattr(self, f"{kind}_hits", getattr(self, f"{kind}_hits") + 1)
+                    return store[key[1]]
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    setattr(self, f"{kind}_misses", getattr(self, f"{kind}_misses") + 1)
+                    break
+            # Another symbol is fetching the same key: wait for it and read its result,
+            # unless this caller's search finishes first
+            while not event.wait(WAIT_INTERVAL):
+                if cancel is not None and cancel.is_set():
+                    raise FetchCancelled(arg)
+
+        try:
+            value = fetch(arg)
+            with self._lock:
+                store[key[1]] = value
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+# batch id -> SearchContext of the batch runs in progress
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+def open_context() -> str:
+    """
+    Create the search context of a new batch run.
+
+    Returns:
+        Batch id to put in the agent state as 'batch_id'
+    """
+    batch_id = uuid.uuid4().hex
+    with _contexts_lock:
+        _contexts[batch_id] = SearchContext()
+    return batch_id
+
+def get_context(batch_id: Optional[str]) -> Optional[SearchContext]:
+    """Search context of a batch run, or None outside a batch run."""
+    if not batch_id:
+        return None
+    with _contexts_lock:
+        return _contexts.get(batch_id)
+
+def close_context(batch_id: str) -> Optional[SearchContext]:
+    """
+    Drop the search context of a finished batch run.
+
+    Returns:
+        The dropped context, for its stats
+    """
+    with _contexts_lock:
+        return _contexts.pop(batch_id, None)
@@ -1,5 +1,5 @@
 
-from typing import Dict, Any, List, TypedDict, Literal, Annotated
+from typing import Dict, Any, List, TypedDict, Literal, Annotated, NotRequired
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
 
 # Define the state schema
@@ -19,12 +19,31 @@ class NewsAgentState(TypedDict):
     graph_execution: List[dict]
     # Recursion count
     recursion_count:int
+    # Batch run the symbol is researched in, whose search context is shared (optional)
+    batch_id: NotRequired[str]
+
+
+def merge_results(existing: Dict[str, dict], new: Dict[str, dict]) -> Dict[str, dict]:
+    """Reducer combining the per-symbol results written by parallel branches."""
+    return {**(existing or {}), **(new or {})}
+
+
+class BatchNewsAgentState(TypedDict):
+    """State for the batch workflow which researches several stocks in one graph run."""
+    # The stock codes to be analysed
+    stock_codes: List[str]
+    # Batch run id, key of the shared search context
+    batch_id: str
+    # Stock code -> result of its research (verdict, urls, tokens, seconds)
+    results: Annotated[Dict[str, dict], merge_results]
 
 
 class ChatAgentState(TypedDict):
     """State for the three agents workflow."""
     # The original user question
     question: str 
+    # The logged-in user, used by tools that read the user's portfolio
+    username: str
     # Messages for the tools used
     messages: List[BaseMessage]
     # Reference URLs
@@ -4,8 +4,6 @@ Tools for LangGraph agents to use in the three agents framework.
 
 from typing import Dict, Any, Annotated, Union
 from langchain_core.tools import tool
-import requests
-from bs4 import BeautifulSoup
 from googlesearch import search
 from ddgs import DDGS
 import json
@@ -14,13 +12,40 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import InjectedToolCallId
 from langgraph.prebuilt import InjectedState
 from agents.state import NewsAgentState, ChatAgentState
-from app.utils.finance import get_recent_prices as finance_get_recent_prices
+from agents.search_context import get_context
+from agents.web_fetch import FetchCancelled, fetch_pages
+from agents.page_cache import page_cache
+from app.utils.finance import get_price_series
+from app.utils.analytics import analyze_portfolio
+from app.utils.backtest import backtest_symbols
+from app.utils.indicators import indicator_engine
+from app.utils.storage import user_dir, read_json
 
 
 
 
 # support function to determine who called the tool, by matching the last message in state
 
+def _ddg_search(query: str) -> list:
+    """Run a duckduckgo text search and return its top 5 results."""
+    return DDGS().text(query, max_results=5)
+
+def _fetch_page_text_or_none(url: str, cancel=None):
+    """Page text through the shared page cache, or None if the page cannot be fetched (a cancelled fetch still raises)."""
+    try:
+        return page_cache.fetch(url, cancel)
+    except FetchCancelled:
+        raise
+    except Exception as e:
+        print(f"Error fetching {url}: {str(e)}")
+        return None
+
+def _fetch_search_pages(url_list: list, context=None) -> dict:
+    """Fetch the pages of a search concurrently, through the batch search context if there is one."""
+    if context is None:
+        return fetch_pages(url_list, _fetch_page_text_or_none)
+    return fetch_pages(url_list, lambda url, cancel: context.page(url, lambda u: _fetch_page_text_or_none(u, cancel), cancel))
+
 @tool
 def web_search(query: str, state: Annotated[NewsAgentState, InjectedState] ) -> dict:
     """
@@ -40,31 +65,23 @@ def web_search(query: str, state: Annotated[NewsAgentState, InjectedState] ) ->
     # logging the event for debug
     event = {'activity': 'websearch', 'activity_type': 'tools', 'status': 'success'}
 
+    # In a batch run, symbols of the batch share search results and fetched pages
+    context = get_context(state.get('batch_id'))
+
     # Use duckduckgo search
     
     try: 
-        results = DDGS().text(query, max_results=5)
+        if context is not None:
+            results = context.search(query, _ddg_search)
+        else:
+            results = _ddg_search(query)
         url_list = [i['href'] for i in results]
 
-        # Parse each URL and extract text content       
-        
-        for url in url_list:
-            #print(f"Fetching URL by an agent: {url}")
-            try:
-                response = requests.get(url, timeout=5)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                web_search_context += f"\n\n\nSource: {url}\n\nContent:"
-                # Extract text content (example: all paragraph text)
-                paragraphs = soup.find_all('p')
-                context = ''
-                for p in paragraphs:
-                    context += f"{p.get_text()[:500]}"  # Limit to 500 characters per paragraph
-                context = context.strip()
-                web_search_context += context + "\n"
-                final_urls.append(url)
-            except Exception as e:
-                print(f"Error fetching {url}: {str(e)}")
-                continue    
+        # Fetch the pages concurrently, keeping those that arrive before the search deadline
+        for url, context_text in _fetch_search_pages(url_list, context).items():
+            web_search_context += f"\n\n\nSource: {url}\n\nContent:"
+            web_search_context += context_text + "\n"
+            final_urls.append(url)
 
     except Exception as e:
         event['status'] = f'Failure {e}'
@@ -101,28 +118,14 @@ def web_search_chat(query: str, state: Annotated[ChatAgentState, InjectedState]
     # Use duckduckgo search
     
     try: 
-        results = DDGS().text(query, max_results=5)
+        results = _ddg_search(query)
         url_list = [i['href'] for i in results]
 
-        # Parse each URL and extract text content       
-        
-        for url in url_list:
-            #print(f"Fetching URL by an agent: {url}")
-            try:
-                response = requests.get(url, timeout=5)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                web_search_context += f"\n\n\nSource: {url}\n\nContent:"
-                # Extract text content (example: all paragraph text)
-                paragraphs = soup.find_all('p')
-                context = ''
-                for p in paragraphs:
-                    context += f"{p.get_text()[:500]}"  # Limit to 500 characters per paragraph
-                context = context.strip()
-                web_search_context += context + "\n"
-                final_urls.append(url)
-            except Exception as e:
-                print(f"Error fetching {url}: {str(e)}")
-                continue    
+        # Fetch the pages concurrently, keeping those that arrive before the search deadline
+        for url, context_text in _fetch_search_pages(url_list).items():
+            web_search_context += f"\n\n\nSource: {url}\n\nContent:"
+            web_search_context += context_text + "\n"
+            final_urls.append(url)
 
     except Exception as e:
         event['status'] = f'Failure {e}'
@@ -162,22 +165,24 @@ def reach_conclusion(state: Annotated[Union[NewsAgentState, ChatAgentState], Inj
 
 
 @tool
-def get_recent_prices(symbol: str, state: Annotated[ChatAgentState, InjectedState]) -> dict:
+def get_recent_prices(symbol: str, state: Annotated[ChatAgentState, InjectedState], months: int = 3) -> dict:
     """
-    Gets the recent stock price data for the given symbol over the last 3 months.
+    Gets the recent closing prices for the given symbol.
+    Periods longer than 6 months are returned as weekly closes.
     
     Args:
         symbol: Stock symbol (e.g., 'AAPL', 'MSFT')
+        months: Number of months of history to return (default 3)
         
     Returns:
-        A list of strings containing price data formatted as "date":{date}, "closing_price":{closing_price}
+        A dictionary with parallel 'dates' and 'closes' lists and the bar 'interval'
     """
     # logging the event for debug
     event = {'activity': 'get_recent_prices', 'activity_type': 'tools', 'status': 'success'}
     
     try:
-        # Call the finance utility function
-        price_list = finance_get_recent_prices(symbol)
+        # Call the finance utility function for a compact columnar payload
+        series = get_price_series(symbol, months=months)
         
         # Update state
         graph_execution = state.get('graph_execution', [])
@@ -185,9 +190,8 @@ def get_recent_prices(symbol: str, state: Annotated[ChatAgentState, InjectedStat
         
         return {
             'response': {
-                'prices': price_list,
-                'symbol': symbol,
-                'count': len(price_list)
+                **series,
+                'count': len(series['dates'])
             },
             'state_updates': {
                 'graph_execution': graph_execution
@@ -200,8 +204,9 @@ def get_recent_prices(symbol: str, state: Annotated[ChatAgentState, InjectedStat
         
         return {
             'response': {
-                'prices': [],
                 'symbol': symbol,
+                'dates': [],
+                'closes': [],
                 'error': str(e),
                 'count': 0
             },
@@ -209,3 +214,133 @@ def get_recent_prices(symbol: str, state: Annotated[ChatAgentState, InjectedStat
                 'graph_execution': graph_execution
             }
         }
+
+
+@tool
+def get_technical_indicators(symbol: str, state: Annotated[ChatAgentState, InjectedState]) -> dict:
+    """
+    Gets precomputed technical indicators for the given symbol from daily closes:
+    20-day SMA and EMA, 14-day RSI (Wilder's smoothing), MACD (12/26/9) and 20-day Bollinger bands (2 std).
+    
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL', 'MSFT')
+        
+    Returns:
+        A dictionary with the latest close, its date and each indicator value (None if not enough history)
+    """
+    # logging the event for debug
+    event = {'activity': 'get_technical_indicators', 'activity_type': 'tools', 'status': 'success'}
+    
+    try:
+        snapshot = indicator_engine.get(symbol)
+        response = {
+            'symbol': symbol,
+            **{key: round(value, 2) if isinstance(value, float) else value for key, value in snapshot.items()}
+        }
+    except Exception as e:
+        event['status'] = f'Failure: {str(e)}'
+        response = {'symbol': symbol, 'error': str(e)}
+    
+    graph_execution = state.get('graph_execution', [])
+    graph_execution.append(event)
+    
+    return {
+        'response': response,
+        'state_updates': {
+            'graph_execution': graph_execution
+        }
+    }
+
+
+@tool
+def get_portfolio_analytics(state: Annotated[ChatAgentState, InjectedState], symbols: list = None, months: int = 12) -> dict:
+    """
+    Computes risk and return analytics for the user's portfolio: total return, annualized
+    volatility, max drawdown and beta against SPY for each holding and the whole portfolio,
+    plus the most and least correlated pairs of holdings.
+    
+    Args:
+        symbols: Optional list of stock symbols to analyze instead of the user's portfolio
+        months: Number of months of history to analyze (default 12)
+        
+    Returns:
+        A dictionary with 'portfolio', 'holdings' and 'correlation' metrics (percentages already computed)
+    """
+    # logging the event for debug
+    event = {'activity': 'get_portfolio_analytics', 'activity_type': 'tools', 'status': 'success'}
+    
+    try:
+        quantities = None
+        if not symbols:
+            # Analyze the holdings of the logged-in user
+            username = state.get('username')
+            portfolio = read_json(user_dir(username) / "portfolio.json") if username else None
+            holdings = [stock for stock in (portfolio or []) if stock.get('stock_code')]
+            symbols = [stock['stock_code'] for stock in holdings]
+            quantities = [stock.get('quantity', 0) for stock in holdings]
+        
+        if symbols:
+            response = analyze_portfolio(symbols, quantities, months=months)
+        else:
+            response = {'error': 'No holdings found; pass the symbols to analyze'}
+    except Exception as e:
+        event['status'] = f'Failure: {str(e)}'
+        response = {'error': str(e)}
+    
+    graph_execution = state.get('graph_execution', [])
+    graph_execution.append(event)
+    
+    return {
+        'response': response,
+        'state_updates': {
+            'graph_execution': graph_execution
+        }
+    }
+
+@tool
+def backtest_strategy(state: Annotated[ChatAgentState, InjectedState], strategy: str = "ma_crossover", symbols: list = None,
+                      years: int = 5, fast: int = 50, slow: int = 200, threshold: float = 0.05) -> dict:
+    """
+    Backtests a trading strategy on daily price history and compares it with buy-and-hold.
+    'ma_crossover' holds each stock while its fast moving average is above the slow one;
+    'threshold_rebalance' holds equal weights and rebalances when any weight drifts by more than the threshold.
+    
+    Args:
+        strategy: 'ma_crossover' or 'threshold_rebalance'
+        symbols: Optional list of stock symbols to backtest instead of the user's portfolio
+        years: Years of history to backtest (default 5)
+        fast: Fast moving-average window in days, for ma_crossover (default 50)
+        slow: Slow moving-average window in days, for ma_crossover (default 200)
+        threshold: Weight drift that triggers a rebalance, for threshold_rebalance (default 0.05)
+        
+    Returns:
+        A dictionary with 'portfolio' and 'buy_and_hold' metrics (return, CAGR, volatility, Sharpe, drawdown)
+    """
+    # logging the event for debug
+    event = {'activity': 'backtest_strategy', 'activity_type': 'tools', 'status': 'success'}
+    
+    try:
+        if not symbols:
+            # Backtest the holdings of the logged-in user
+            username = state.get('username')
+            portfolio = read_json(user_dir(username) / "portfolio.json") if username else None
+            symbols = [stock['stock_code'] for stock in (portfolio or []) if stock.get('stock_code')]
+        
+        params = {'fast': fast, 'slow': slow} if strategy == 'ma_crossover' else {'threshold': threshold}
+        if symbols:
+            response = backtest_symbols(symbols, strategy, years=years, **params)
+        else:
+            response = {'error': 'No holdings found; pass the symbols to backtest'}
+    except Exception as e:
+        event['status'] = f'Failure: {str(e)}'
+        response = {'error': str(e)}
+    
+    graph_execution = state.get('graph_execution', [])
+    graph_execution.append(event)
+    
+    return {
+        'response': response,
+        'state_updates': {
+            'graph_execution': graph_execution
+        }
+    }
@@ -0,0 +1,172 @@
+"""
+Concurrent page fetching for the agents' web search tools.
+Result pages are downloaded in parallel over one pooled HTTP session, so connections to the
+same hosts are reused across searches. A search returns as soon as enough pages have arrived
+or its deadline passes; downloads still running are cancelled.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+# Threads downloading pages, shared by every search in this process
+FETCH_WORKERS = int(os.getenv("WEB_FETCH_WORKERS", "16"))
+
+# Seconds a whole search may spend fetching pages, and pages after which it stops waiting
+SEARCH_DEADLINE = float(os.getenv("WEB_SEARCH_DEADLINE", "8"))
+SEARCH_MIN_PAGES = int(os.getenv("WEB_SEARCH_MIN_PAGES", "3"))
+
+# Connect and read timeouts of one request, and the most bytes read from one page
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 5.0
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+# Characters kept per paragraph of a page
+PARAGRAPH_CHARS = 500
+
+_session = None
+_pool = None
+_lock = threading.Lock()
+
+class FetchCancelled(Exception):
+    """Raised by a page download that was cancelled because its search finished without it."""
+
+def get_session() -> requests.Session:
+    """Shared HTTP session with a connection pool sized for the fetch threads, created on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "Mozilla/5.0 (compatible; trading-agent/1.0)"
+            _session = session
+        return _session
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="web-fetch")
+        return _pool
+
+def download(url: str, cancel: Optional[threading.Event] = None,
+             headers: Optional[dict] = None) -> Tuple[requests.Response, bytes]:
+    """
+    Download a page over the shared session, reading its body in chunks so the download
+    stops as soon as it is cancelled.
+
+    Args:
+        url: Page URL
+        cancel: Event set when the download is no longer needed
+        headers: Extra request headers
+
+    Returns:
+        Tuple of (response, body), the body limited to MAX_PAGE_BYTES
+
+    Raises:
+        FetchCancelled: If cancel was set before the download finished
+        requests.RequestException: If the request failed
+    """
+    if cancel is not None and cancel.is_set():
+        raise FetchCancelled(url)
+    response = get_session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True)
+    try:
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            if cancel is not None and cancel.is_set():
+                raise FetchCancelled(url)
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_PAGE_BYTES:
+                break
+        return response, b"".join(chunks)
+    finally:
+        response.close()
+
+def extract_text(html: Union[str, bytes], encoding: Optional[str] = None) -> str:
+    """
+    Extract the paragraph text of a page.
+
+    Args:
+        html: Page HTML, as text or as raw bytes
+        encoding: Encoding of raw bytes declared by the server, detected if None
+
+    Returns:
+        The text of every paragraph, each limited to PARAGRAPH_CHARS characters
+    """
+    soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding if isinstance(html, bytes) else None)
+    return ''.join(p.get_text()[:PARAGRAPH_CHARS] for p in soup.find_all('p')).strip()
+
+def fetch_page_text(url: str, cancel: Optional[threading.Event] = None) -> str:
+    """
+    Download a page and extract its paragraph text.
+
+    Args:
+        url: Page URL
+        cancel: Event set when the download is no longer needed
+
+    Returns:
+        The page text
+    """
+    response, body = download(url, cancel)
+    response.raise_for_status()
+    return extract_text(body, response.encoding)
+
+def fetch_pages(urls: Iterable[str], fetch: Callable[[str, threading.Event], Optional[str]] = fetch_page_text,
+                min_pages: Optional[int] = None, deadline: Optional[float] = None) -> Dict[str, str]:
+    """
+    Fetch pages concurrently, returning once min_pages pages have arrived, every fetch has
+    finished or the deadline has passed. Fetches still running are then cancelled.
+
+    Args:
+        urls: Page URLs in ranking order
+        fetch: Function returning a page's text (or None), called as fetch(url, cancel);
+               it should stop and raise FetchCancelled once cancel is set
+        min_pages: Pages after which the remaining fetches are cancelled, defaults to SEARCH_MIN_PAGES
+        deadline: Seconds to wait for pages, defaults to SEARCH_DEADLINE
+
+    Returns:
+        Dictionary mapping URL -> text for the pages that arrived, in ranking order
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    min_pages = min(min_pages or SEARCH_MIN_PAGES, len(urls))
+    stop_at = time.monotonic() + (deadline if deadline is not None else SEARCH_DEADLINE)
+
+    cancel = threading.Event()
+    pool = _get_pool()
+    futures = {pool.submit(fetch, url, cancel): url for url in urls}
+    texts = {}
+    pending = set(futures)
+    try:
+        while pending and len(texts) < min_pages:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    text = future.result()
+                except FetchCancelled:
+                    continue
+                except Exception as e:
+                    print(f"Error fetching {futures[future]}: {str(e)}")
+                    continue
+                if text is not None:
+                    texts[futures[future]] = text
+    finally:
+        # Stragglers: queued fetches never start, running ones stop at their next chunk
+        cancel.set()
+        for future in pending:
+            future.cancel()
+    return {url: texts[url] for url in urls if url in texts}
@@ -0,0 +1,188 @@
+"""
+Batch portfolio refresh across every user of the platform.
+All portfolios are scanned first so each distinct symbol is fetched exactly once,
+then every affected portfolio is revalued and written. Each phase is timed so the
+refresh can be profiled as the number of users grows.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.utils import storage
+from app.utils.storage import read_versioned, compare_and_swap, transaction, user_versions
+from app.utils.finance import get_current_prices
+from app.src.portfolio_updater import revalue_portfolio, symbol_last_updated, due_symbols
+
+def scan_portfolios(base: Optional[Path] = None, workers: int = 8) -> dict:
+    """
+    Read the portfolio of every user.
+
+    Args:
+        base: Directory with one sub-directory per user, defaults to data/users
+        workers: Threads used to read the files
+
+    Returns:
+        Dictionary mapping username -> (portfolio path, holdings, version) for users with a non-empty portfolio
+    """
+    base = Path(base) if base is not None else storage.BASE
+    paths = [base / username / "portfolio.json" for username in sorted(user_versions("portfolio.json", base))]
+
+    def load(path):
+        try:
+            return read_versioned(path)
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            return None, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        portfolios = list(pool.map(load, paths))
+    return {path.parent.name: (path, portfolio, version) for path, (portfolio, version) in zip(paths, portfolios) if portfolio}
+
+def refresh_all_portfolios(base: Optional[Path] = None, workers: int = 8, force: bool = False) -> dict:
+    """
+    Refresh prices for every user's portfolio with one fetch per distinct symbol.
+    Holdings the market-hours refresh policy considers current are skipped unless forced.
+    With the sqlite storage backend the scan and the revaluation each run as one SQL statement.
+
+    Args:
+        base: Directory with one sub-directory per user, defaults to data/users
+        workers: Threads used to read and write portfolio files
+        force: Refresh every holding regardless of market hours
+
+    Returns:
+        Report with counts (users, holdings, symbols, priced, updated), the usernames
+        that failed to write, and the seconds spent per phase under 'timings'
+    """
+    store = storage.sqlite_store()
+    if store is not None and base is None:
+        return _refresh_in_database(store, force)
+
+    timings = {}
+    started = time.perf_counter()
+
+    # Scan: read every portfolio and build the union of symbols due for a refresh
+    phase = time.perf_counter()
+    portfolios = scan_portfolios(base, workers)
+    due = {}
+    for username, (_, holdings, _) in portfolios.items():
+        last_updated = symbol_last_updated(holdings)
+        due[username] = list(last_updated) if force else due_symbols(last_updated)
+    symbols = list(dict.fromkeys(symbol for user_due in due.values() for symbol in user_due))
+    timings['scan'] = time.perf_counter() - phase
+
+    # Fetch: each distinct symbol once, through the shared quote cache and batched fetch layer
+    phase = time.perf_counter()
+    prices = get_current_prices(symbols)
+    timings['fetch'] = time.perf_counter() - phase
+
+    # Revalue: apply the shared prices to every portfolio in memory
+    phase = time.perf_counter()
+    timestamp = datetime.now().isoformat()
+    changed = {}
+    holdings_count = 0
+    for username, (path, holdings, version) in portfolios.items():
+        holdings_count += len(holdings)
+        user_due = set(due[username])
+        due_holdings = [stock for stock in holdings if stock.get('stock_code') in user_due]
+        if due_holdings and revalue_portfolio(due_holdings, prices, timestamp, verbose=False):
+            changed[username] = (path, holdings, version)
+    timings['revalue'] = time.perf_counter() - phase
+
+    # Write: only portfolios with at least one updated holding, unless they changed since the scan
+    phase = time.perf_counter()
+
+    def write(item):
+        username, (path, holdings, version) = item
+        try:
+            if not compare_and_swap(path, holdings, version):
+                # Another writer saved this portfolio meanwhile: apply the prices to their version
+                user_due = set(due[username])
+                for txn in transaction(path):
+                    latest = txn.data or []
+                    revalue_portfolio([stock for stock in latest if stock.get('stock_code') in user_due],
+                                      prices, timestamp, verbose=False)
+                    txn.commit(latest)
+            return None
+        except Exception as e:
+            print(f"Error writing portfolio for {username}: {e}")
+            return username
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        failed = [username for username in pool.map(write, changed.items()) if username]
+    timings['write'] = time.perf_counter() - phase
+    timings['total'] = time.perf_counter() - started
+
+    return {
+        'users': len(portfolios),
+        'holdings': holdings_count,
+        'symbols': len(symbols),
+        'priced': sum(price is not None for price in prices.values()),
+        'updated': len(changed) - len(failed),
+        'failed': failed,
+        'timings': timings
+    }
+
+def _refresh_in_database(store, force: bool) -> dict:
+    """
+    refresh_all_portfolios for the sqlite backend: holdings are scanned and revalued
+    in the database without loading any portfolio.
+
+    Args:
+        store: SQLiteStore of the storage module
+        force: Refresh every holding regardless of market hours
+
+    Returns:
+        Report in the refresh_all_portfolios format
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    # Scan: oldest price per user and symbol, grouped in the database
+    phase = time.perf_counter()
+    last_updated = store.symbol_last_updated()
+    due = [list(symbols) if force else due_symbols(symbols) for symbols in last_updated.values()]
+    symbols = list(dict.fromkeys(symbol for user_due in due for symbol in user_due))
+    timings['scan'] = time.perf_counter() - phase
+
+    # Fetch: each distinct symbol once
+    phase = time.perf_counter()
+    prices = get_current_prices(symbols)
+    timings['fetch'] = time.perf_counter() - phase
+
+    # Apply: record the quotes and revalue every holding of the priced symbols in one statement
+    phase = time.perf_counter()
+    updated = store.apply_prices(prices, datetime.now().isoformat())
+    timings['apply'] = time.perf_counter() - phase
+    timings['total'] = time.perf_counter() - started
+
+    return {
+        'users': len(store.user_versions("portfolio.json")),
+        'holdings': store.count_holdings(),
+        'symbols': len(symbols),
+        'priced': sum(price is not None for price in prices.values()),
+        'updated': updated,
+        'failed': [],
+        'timings': timings
+    }
+
+def format_report(report: dict) -> str:
+    """
+    Format a refresh report as a short text summary.
+
+    Args:
+        report: Result of refresh_all_portfolios
+
+    Returns:
+        Multi-line summary with counts and per-phase timings
+    """
+    lines = [
+        f"Users: {report['users']}, holdings: {report['holdings']}, distinct symbols: {report['symbols']}, "
+        f"priced: {report['priced']}",
+        f"Portfolios updated: {report['updated']}" + (f", failed: {', '.join(report['failed'])}" if report['failed'] else "")
+    ]
+    for name, seconds in report['timings'].items():
+        lines.append(f"  {name:<8} {seconds:>9.3f} s")
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+"""
+News pre-warming worker.
+Periodically collects the symbols held across all users and runs the news workflow for them
+ahead of demand, storing the digests in the shared news cache that get_news_for_stock serves
+from. The portfolio page then finds every held symbol's digest already cached and renders
+without waiting for an agent run.
+"""
+
+import threading
+import time
+from typing import List, Optional
+
+from app.utils.holdings_index import HoldingsIndex, holdings_index
+from app.utils.news_cache import NewsCache, news_cache
+from app.utils.news import fetch_agent_news_batch
+
+def plan_prewarm(index: Optional[HoldingsIndex] = None, cache: Optional[NewsCache] = None,
+                 lead: float = 600.0) -> List[dict]:
+    """
+    Collect the held symbols whose digest is missing, failed or expires soon, in priority order:
+    symbols never fetched first (a page opened now would wait for them), then the most widely
+    held, then the oldest digests.
+
+    Args:
+        index: Holdings index, defaults to the shared index
+        cache: News cache, defaults to the shared cache
+        lead: Seconds before expiry at which a digest is refreshed, so users never see it expire
+
+    Returns:
+        List of dictionaries with symbol, holders and age (None if never fetched)
+    """
+    index = index if index is not None else holdings_index
+    cache = cache if cache is not None else news_cache
+
+    due = []
+    for symbol in index.symbols():
+        age = cache.age(symbol)
+        # Fresh digests are left alone, as are digests whose last refresh failed until their retry time
+        if age is not None and cache.is_fresh(symbol) and (age < cache.ttl - lead or cache.retrying(symbol)):
+            continue
+        due.append({'symbol': symbol, 'holders': len(index.holders(symbol)), 'age': age})
+
+    due.sort(key=lambda entry: (entry['age'] is not None, -entry['holders'], -(entry['age'] or 0.0)))
+    return due
+
+def prewarm_news(index: Optional[HoldingsIndex] = None, cache: Optional[NewsCache] = None,
+                 lead: float = 600.0, limit: Optional[int] = None, batch_size: int = 4) -> dict:
+    """
+    Run one pre-warming pass: refresh the due symbols in priority order, a batch at a time.
+    Symbols of a batch are researched in one batch workflow, sharing search results.
+
+    Args:
+        index: Holdings index, defaults to the shared index
+        cache: News cache, defaults to the shared cache
+        lead: Seconds before expiry at which a digest is refreshed
+        limit: Maximum number of symbols refreshed in this pass
+        batch_size: Symbols researched per batch workflow
+
+    Returns:
+        Report with counts (held, due, refreshed), the symbols that failed, the agent token
+        usage under 'tokens' and the seconds spent per phase under 'timings'
+    """
+    index = index if index is not None else holdings_index
+    cache = cache if cache is not None else news_cache
+    timings = {}
+    started = time.perf_counter()
+
+    # Plan: pick up portfolio changes made by other processes, then rank the due symbols
+    phase = time.perf_counter()
+    index.refresh()
+    held = len(index.symbols())
+    due = plan_prewarm(index, cache, lead)
+    symbols = [entry['symbol'] for entry in due[:limit]]
+    timings['plan'] = time.perf_counter() - phase
+
+    # Research: one batch workflow per batch_size symbols, most urgent first
+    phase = time.perf_counter()
+    failed = []
+    tokens = {}
+    for start in range(0, len(symbols), max(1, batch_size)):
+        batch = symbols[start:start + max(1, batch_size)]
+        items, accounting = fetch_agent_news_batch(batch)
+        for key, value in accounting.get('tokens', {}).items():
+            tokens[key] = tokens.get(key, 0) + value
+        for symbol in batch:
+            # Store through the cache so it persists the digest and other processes pick it up;
+            # a failed symbol keeps its previous digest until its retry time
+            result = items.get(symbol)
+            cache.refresh(symbol, lambda _, result=result: result)
+            if not result:
+                failed.append(symbol)
+    timings['research'] = time.perf_counter() - phase
+    timings['total'] = time.perf_counter() - started
+
+    return {
+        'held': held,
+        'due': len(due),
+        'refreshed': len(symbols) - len(failed),
+        'failed': failed,
+        'tokens': tokens,
+        'timings': timings
+    }
+
+def run_prewarm_worker(interval: float = 60.0, stop: Optional[threading.Event] = None, **kwargs) -> None:
+    """
+    Run pre-warming passes every interval seconds until stopped.
+
+    Args:
+        interval: Seconds between the start of two passes
+        stop: Event ending the loop when set, runs forever if None
+        **kwargs: Arguments of prewarm_news
+    """
+    stop = stop if stop is not None else threading.Event()
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            print(format_report(prewarm_news(**kwargs)))
+        except Exception as e:
+            print(f"Error pre-warming news: {e}")
+        stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+def format_report(report: dict) -> str:
+    """
+    Format a pre-warming report as a short text summary.
+
+    Args:
+        report: Result of prewarm_news
+
+    Returns:
+        Multi-line summary with counts, token usage and per-phase timings
+    """
+    lines = [
+        f"Held symbols: {report['held']}, due: {report['due']}, refreshed: {report['refreshed']}"
+        + (f", failed: {', '.join(report['failed'])}" if report['failed'] else ""),
+    ]
+    if report['tokens']:
+        lines.append(f"Tokens: {report['tokens'].get('total_tokens', 0)} in {report['tokens'].get('llm_calls', 0)} LLM calls")
+    for name, seconds in report['timings'].items():
+        lines.append(f"  {name:<8} {seconds:>9.3f} s")
+    return "\n".join(lines)
@@ -3,32 +3,151 @@ Background portfolio updater module for the trading agent platform.
 This module handles updating stock prices when a user profile is loaded.
 """
 
-import yfinance as yf
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import os
 import threading
+import time
 
-from app.utils.storage import user_dir, read_json, write_json_with_lock
-from app.utils.finance import get_current_price
+from app.utils.storage import user_dir, read_json, transaction
+from app.utils.finance import get_current_prices, validate_symbol
+from app.utils.holdings_index import HoldingsIndex, holdings_index
+from app.utils.portfolio import Portfolio
+from app.utils.market_calendar import market_calendar
 
-def update_portfolio_in_background(username: str) -> None:
+# Maximum symbols fetched per refresh (stalest first), 0 for no limit
+REFRESH_MAX_SYMBOLS = int(os.getenv("REFRESH_MAX_SYMBOLS", "0"))
+
+def update_portfolio_in_background(username: str) -> bool:
     """
-    Start a background thread to update portfolio prices without blocking UI.
+    Request a background update of portfolio prices without blocking UI.
+    Requests are coalesced by the shared refresh scheduler, so calling this on
+    every UI rerun does not start duplicate refreshes.
     
     Args:
         username: Username whose portfolio to update
+        
+    Returns:
+        True if a refresh was started, False if one is running or the prices are recent
+    """
+    return refresh_scheduler.request(username)
+
+class RefreshScheduler:
     """
-    thread = threading.Thread(
-        target=update_portfolio_with_fallbacks,
-        args=(username,),
-        daemon=True  # Make thread a daemon so it doesn't block app exit
-    )
-    thread.start()
+    Runs portfolio refreshes on a bounded worker pool.
+    
+    Each user has at most one refresh running and one pending. Automatic requests are
+    skipped while a refresh runs or within min_interval of the last one; forced requests
+    (e.g. an explicit "Update Prices") queue one more refresh after the running one.
+    
+    Args:
+        refresh: Function refreshing one user's portfolio, returning True on success
+        max_workers: Maximum number of refreshes running at once across all users
+        min_interval: Seconds after a refresh before an automatic request runs another
+        clock: Monotonic clock function, injectable for tests
+    """
+    
+    def __init__(self, refresh: Callable[[str], bool], max_workers: int = 4, min_interval: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.refresh = refresh
+        self.min_interval = min_interval
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="portfolio-refresh")
+        self._lock = threading.Condition()
+        # username -> refresh state, see status()
+        self._users = {}
+    
+    def request(self, username: str, force: bool = False) -> bool:
+        """
+        Request a refresh of a user's portfolio.
+        
+        Args:
+            username: Username whose portfolio to refresh
+            force: Refresh even if the last refresh is recent, queueing behind a running one
+            
+        Returns:
+            True if a refresh was started or queued, False if the request was coalesced or skipped
+        """
+        with self._lock:
+            user = self._users.setdefault(username, {
+                "running": False, "pending": False, "finished_at": None,
+                "last_refresh": None, "last_success": None
+            })
+            if user["running"]:
+                # A running refresh already covers automatic requests
+                if force and not user["pending"]:
+                    user["pending"] = True
+                    return True
+                return False
+            if not force and user["finished_at"] is not None and self._clock() - user["finished_at"] < self.min_interval:
+                return False
+            user["running"] = True
+        self._pool.submit(self._run, username)
+        return True
+    
+    def status(self, username: str) -> dict:
+        """
+        Get the refresh state of a user without starting any work.
+        
+        Args:
+            username: Username to look up
+            
+        Returns:
+            Dictionary with 'running', 'pending', 'last_refresh' (ISO timestamp or None)
+            and 'last_success' (bool or None)
+        """
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                return {"running": False, "pending": False, "last_refresh": None, "last_success": None}
+            return {key: user[key] for key in ("running", "pending", "last_refresh", "last_success")}
+    
+    def wait(self, username: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the user has no running or pending refresh.
+        
+        Args:
+            username: Username to wait for
+            timeout: Maximum seconds to wait, None waits indefinitely
+            
+        Returns:
+            True if the user is idle, False if the timeout expired first
+        """
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._busy(username), timeout=timeout)
+    
+    def _busy(self, username: str) -> bool:
+        user = self._users.get(username)
+        return user is not None and (user["running"] or user["pending"])
+    
+    def _run(self, username: str) -> None:
+        try:
+            success = bool(self.refresh(username))
+        except Exception as e:
+            print(f"Error refreshing portfolio for {username}: {e}")
+            success = False
+        
+        with self._lock:
+            user = self._users[username]
+            user["finished_at"] = self._clock()
+            user["last_refresh"] = datetime.now().isoformat()
+            user["last_success"] = success
+            # Start the queued refresh, keeping the user marked as running
+            run_again = user["pending"]
+            user["pending"] = False
+            user["running"] = run_again
+            self._lock.notify_all()
+        if run_again:
+            self._pool.submit(self._run, username)
 
 def update_portfolio_with_fallbacks(username: str) -> bool:
     """
     Update the portfolio of a user with current prices and calculated values,
     with proper fallbacks when prices can't be fetched.
+    Only symbols the market calendar marks as due are fetched; outside trading hours
+    a portfolio that already has the last close is neither fetched nor written.
     
     Args:
         username: Username whose portfolio to update
@@ -49,54 +168,163 @@ def update_portfolio_with_fallbacks(username: str) -> bool:
         # Current timestamp for update
         timestamp = datetime.now().isoformat()
         
-        # Update each stock in portfolio
-        for stock in portfolio:
-            symbol = stock.get('stock_code')
-            if not symbol:
-                continue
-                
-            # Get current price
-            current_price = get_current_price(symbol)
-            
-            # Apply fallbacks if current price can't be fetched:
-            # 1. Use existing current_price if available
-            # 2. Use purchase_price if no current_price exists
-            if current_price is None:
-                if 'current_price' in stock and stock['current_price'] is not None:
-                    # Use existing price as fallback
-                    current_price = stock['current_price']
-                    print(f"Using existing price for {symbol}: ${current_price}")
-                else:
-                    # Use purchase price as fallback if no current price exists
-                    current_price = stock.get('purchase_price')
-                    print(f"Using purchase price for {symbol}: ${current_price}")
-            
-            # Skip if we still don't have a valid price
-            if current_price is None:
-                print(f"No valid price found for {symbol}, skipping")
-                continue
-                
-            # Update stock information
-            stock['current_price'] = current_price
-            stock['last_updated'] = timestamp
-            
-            # Calculate value (quantity * current_price)
-            quantity = stock.get('quantity', 0)
-            stock['value'] = round(quantity * current_price, 2)
-            
-            # Calculate returns
-            purchase_price = stock.get('purchase_price', 0)
-            if purchase_price > 0:
-                # Total return (current value - purchase value)
-                stock['total_return'] = round(stock['value'] - (quantity * purchase_price), 2)
-                
-                # Percent return ((current - purchase) / purchase * 100)
-                stock['percent_return'] = round((current_price - purchase_price) / purchase_price * 100, 2)
-        
-        # Save updated portfolio
-        write_json_with_lock(portfolio_path, portfolio)
+        # Pick the symbols whose prices can have changed, stalest first
+        due = due_symbols(symbol_last_updated(portfolio))
+        if not due:
+            print(f"Prices for {username} are current, skipping refresh")
+            return True
+        
+        # Fetch prices for the due holdings in one batched request, without holding any lock
+        prices = get_current_prices(due)
+        
+        # Apply them to the latest portfolio; if another writer saved it meanwhile, re-apply to theirs
+        due_set = set(due)
+        for txn in transaction(portfolio_path):
+            portfolio = txn.data or []
+            revalue_portfolio([stock for stock in portfolio if stock.get('stock_code') in due_set], prices, timestamp)
+            txn.commit(portfolio)
         print(f"Portfolio updated successfully for {username}")
         return True
     except Exception as e:
         print(f"Error updating portfolio for {username}: {e}")
         return False
+
+def symbol_last_updated(portfolio: list) -> dict:
+    """
+    Get when each symbol of a portfolio was last priced.
+    
+    Args:
+        portfolio: List of holdings as stored in portfolio.json
+        
+    Returns:
+        Symbol -> ISO timestamp of its oldest lot, or None if any lot has never been priced
+    """
+    last_updated = {}
+    for stock in portfolio:
+        symbol = stock.get('stock_code')
+        if not symbol:
+            continue
+        timestamp = stock.get('last_updated') if stock.get('current_price') is not None else None
+        if symbol not in last_updated:
+            last_updated[symbol] = timestamp
+        elif last_updated[symbol] is not None and timestamp is not None:
+            last_updated[symbol] = min(last_updated[symbol], timestamp)
+        else:
+            last_updated[symbol] = None
+    return last_updated
+
+def due_symbols(last_updated: dict) -> list:
+    """
+    Apply the market-hours refresh policy to symbols' last update times.
+    
+    Args:
+        last_updated: Symbol -> ISO timestamp of its price, None if never priced
+        
+    Returns:
+        Symbols to fetch, stalest first and at most REFRESH_MAX_SYMBOLS of them;
+        every symbol if no market calendar is available
+    """
+    limit = REFRESH_MAX_SYMBOLS or None
+    if market_calendar is None:
+        return list(last_updated)[:limit]
+    return market_calendar.due_symbols(last_updated, limit=limit)
+
+def revalue_portfolio(portfolio: list, prices: dict, timestamp: str, verbose: bool = True) -> int:
+    """
+    Apply current prices to a portfolio in place, recalculating values and returns.
+    Holdings without a price fall back to their existing current_price, then are valued at their
+    purchase_price; only holdings with a fetched price get last_updated, so the others stay due.
+    
+    Args:
+        portfolio: List of holdings as stored in portfolio.json
+        prices: Symbol -> current price (None when it could not be fetched)
+        timestamp: ISO timestamp recorded as last_updated
+        verbose: Print which fallback was used for each holding
+        
+    Returns:
+        Number of holdings updated
+    """
+    return Portfolio(portfolio).revalue(prices, timestamp, fallback=True, verbose=verbose)
+
+def apply_price_tick(symbol: str, price: float, index: Optional[HoldingsIndex] = None) -> list:
+    """
+    Revalue only the portfolios that hold a symbol after its price changes.
+    Holders come from the symbol -> users index, so other portfolios are never read.
+    
+    Args:
+        symbol: Stock symbol whose price changed
+        price: New price
+        index: Holdings index to use, defaults to the shared index over data/users
+        
+    Returns:
+        Usernames whose portfolios were updated
+    """
+    index = index or holdings_index
+    timestamp = datetime.now().isoformat()
+    updated = []
+    for username in sorted(index.holders(symbol)):
+        path = index.portfolio_path(username)
+        try:
+            for txn in transaction(path):
+                portfolio = Portfolio(txn.data or [])
+                # Only the holdings of this symbol are touched
+                if portfolio.update_price(symbol, price, timestamp) and txn.commit(portfolio.to_json()):
+                    updated.append(username)
+        except Exception as e:
+            print(f"Error applying {symbol} price for {username}: {e}")
+    return updated
+
+# Shared scheduler for background portfolio refreshes
+refresh_scheduler = RefreshScheduler(
+    update_portfolio_with_fallbacks,
+    max_workers=int(os.getenv("REFRESH_WORKERS", "4")),
+    min_interval=float(os.getenv("REFRESH_MIN_INTERVAL", "60"))
+)
+
+def add_holding(username: str, stock_code: str, quantity: float, purchase_price: float, company_name: str = "") -> bool:
+    """
+    Add a holding to the portfolio of a user after checking that the symbol can be priced.
+    Each purchase is kept as its own lot; a lot of a symbol already held is valued at the
+    held lots' last price and left due, so the next refresh reprices the whole symbol.
+    
+    Args:
+        username: Username whose portfolio to update
+        stock_code: Stock symbol (e.g., 'AAPL')
+        quantity: Number of shares bought
+        purchase_price: Price paid per share
+        company_name: Company name shown in the UI, optional
+        
+    Returns:
+        True if the holding was added, False if the symbol is invalid or the write failed
+    """
+    stock_code = (stock_code or "").strip().upper()
+    
+    # Reject unknown or delisted symbols up front; the result is kept in the symbol index
+    if not validate_symbol(stock_code):
+        print(f"Symbol {stock_code or '<empty>'} could not be priced, holding not added")
+        return False
+    
+    try:
+        portfolio_path = user_dir(username) / "portfolio.json"
+        for txn in transaction(portfolio_path):
+            portfolio = txn.data or []
+            
+            held = [stock for stock in portfolio if stock.get('stock_code') == stock_code]
+            lot = {
+                "company_name": company_name or (held[0].get('company_name') if held else None) or stock_code,
+                "stock_code": stock_code,
+                "quantity": quantity,
+                "purchase_price": purchase_price
+            }
+            held_price = next((stock['current_price'] for stock in held if stock.get('current_price') is not None), None)
+            if held_price is not None:
+                # Value and returns from the last known price; without last_updated the symbol stays due
+                lot['current_price'] = held_price
+                Portfolio([lot]).revalue({}, fallback=True)
+            portfolio.append(lot)
+            
+            txn.commit(portfolio)
+        return True
+    except Exception as e:
+        print(f"Error adding {stock_code} for {username}: {e}")
+        return False
@@ -22,10 +22,12 @@ def ask_agent(username: str, message: str, history: List[BaseMessage]) -> str:
     # Add system message from chat instructions if this is a new conversation
     if not history:
         result = get_response(
-        question=message)
+        question=message,
+        username=username)
     else:
         result = get_response(
         question=message,
-        messages=history)
+        messages=history,
+        username=username)
     
     return result['response'], result['messages']
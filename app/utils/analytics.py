@@ -0,0 +1,202 @@
+"""
+Portfolio analytics computed with NumPy over aligned closing-price matrices.
+Returns, volatility, drawdown, beta and correlations for every holding are computed
+in one vectorized pass, so the chat agent never has to reason over raw prices.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.history_store import history_store
+
+# Trading days per year used to annualize volatility
+TRADING_DAYS = 252
+
+def load_close_matrix(symbols: Sequence[str], months: int = 12) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load closing prices for several symbols aligned on a common date axis.
+    Missing bars are forward-filled; dates before a symbol's first bar stay NaN.
+
+    Args:
+        symbols: Stock symbols to load
+        months: Number of months of history
+
+    Returns:
+        Tuple of (dates array, closes matrix with one column per symbol)
+    """
+    start = (pd.Timestamp.today().normalize() - pd.DateOffset(months=months)).date()
+    histories = [history_store.get(symbol, start) for symbol in symbols]
+
+    dates = np.unique(np.concatenate([h.dates for h in histories])) if histories else np.empty(0, dtype="datetime64[D]")
+    closes = np.full((len(dates), len(histories)), np.nan)
+    for column, history in enumerate(histories):
+        closes[np.searchsorted(dates, history.dates), column] = history.close
+
+    return dates, _forward_fill(closes)
+
+def compute_analytics(closes: np.ndarray, quantities: Optional[np.ndarray] = None,
+                      benchmark: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute per-holding and portfolio-level risk metrics.
+
+    Args:
+        closes: Matrix of closing prices, one row per date and one column per holding
+        quantities: Shares held per holding, defaults to one share each
+        benchmark: Closing prices of the benchmark index on the same dates, optional
+
+    Returns:
+        Dictionary of arrays: total_return, volatility, max_drawdown, beta (per holding),
+        correlation (holding x holding), and portfolio_* scalars for the combined position
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    n_holdings = closes.shape[1]
+    quantities = np.ones(n_holdings) if quantities is None else np.asarray(quantities, dtype=np.float64)
+
+    # Restrict to the window where every holding has a price
+    complete = np.all(np.isfinite(closes), axis=1)
+    if benchmark is not None:
+        benchmark = np.asarray(benchmark, dtype=np.float64)
+        complete &= np.isfinite(benchmark)
+        benchmark = benchmark[complete]
+    closes = closes[complete]
+    if len(closes) < 3:
+        raise ValueError("Not enough overlapping price history to compute analytics")
+
+    # Append the portfolio value series as an extra column so it shares every computation
+    values = closes @ quantities
+    prices = np.column_stack([closes, values])
+
+    returns = prices[1:] / prices[:-1] - 1.0
+    total_return = prices[-1] / prices[0] - 1.0
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    max_drawdown = (prices / np.maximum.accumulate(prices, axis=0) - 1.0).min(axis=0)
+
+    beta = np.full(n_holdings + 1, np.nan)
+    if benchmark is not None and len(benchmark) > 2:
+        market = benchmark[1:] / benchmark[:-1] - 1.0
+        market_centered = market - market.mean()
+        centered = returns - returns.mean(axis=0)
+        beta = centered.T @ market_centered / (market_centered @ market_centered)
+
+    if n_holdings > 1:
+        correlation = np.corrcoef(returns[:, :n_holdings], rowvar=False)
+    else:
+        correlation = np.ones((n_holdings, n_holdings))
+
+    return {
+        "total_return": total_return[:n_holdings],
+        "volatility": volatility[:n_holdings],
+        "max_drawdown": max_drawdown[:n_holdings],
+        "beta": beta[:n_holdings],
+        "correlation": correlation,
+        "weights": closes[-1] * quantities / values[-1],
+        "portfolio_total_return": total_return[-1],
+        "portfolio_volatility": volatility[-1],
+        "portfolio_max_drawdown": max_drawdown[-1],
+        "portfolio_beta": beta[-1],
+        "observations": len(prices)
+    }
+
+def analyze_portfolio(symbols: List[str], quantities: Optional[List[float]] = None, months: int = 12,
+                      benchmark: str = "SPY", top_pairs: int = 5) -> dict:
+    """
+    Load price history and summarize portfolio analytics for the agent tools.
+
+    Args:
+        symbols: Stock symbols held; several lots of one symbol are combined into one position
+        quantities: Shares held per symbol, defaults to one share each
+        months: Number of months of history to analyze
+        benchmark: Index symbol used for beta
+        top_pairs: Number of most and least correlated pairs to report
+
+    Returns:
+        Dictionary with per-holding metrics, portfolio metrics and correlation highlights
+    """
+    # Combine lots of the same symbol, so each symbol is one column with its total quantity
+    positions = {}
+    for i, symbol in enumerate(symbols):
+        quantity = 1.0 if quantities is None else float(quantities[i] or 0)
+        positions[symbol] = positions.get(symbol, 0.0) + quantity
+    symbols = list(positions)
+    quantities = None if quantities is None else list(positions.values())
+
+    dates, matrix = load_close_matrix(list(symbols) + [benchmark], months=months)
+
+    # Drop symbols without any price data
+    available = [i for i in range(len(symbols)) if np.isfinite(matrix[:, i]).any()]
+    missing = [symbols[i] for i in range(len(symbols)) if i not in available]
+    if not available:
+        return {"error": "No price history found for any symbol", "missing_symbols": missing}
+
+    held = [symbols[i] for i in available]
+    qty = None if quantities is None else np.asarray(quantities, dtype=np.float64)[available]
+    benchmark_closes = matrix[:, -1] if np.isfinite(matrix[:, -1]).any() else None
+    try:
+        metrics = compute_analytics(matrix[:, available], qty, benchmark_closes)
+    except ValueError as e:
+        return {"error": str(e), "missing_symbols": missing}
+
+    holdings = {
+        symbol: {
+            "weight_pct": _pct(metrics["weights"][i]),
+            "total_return_pct": _pct(metrics["total_return"][i]),
+            "annualized_volatility_pct": _pct(metrics["volatility"][i]),
+            "max_drawdown_pct": _pct(metrics["max_drawdown"][i]),
+            "beta": _round(metrics["beta"][i])
+        }
+        for i, symbol in enumerate(held)
+    }
+
+    return {
+        "period_months": months,
+        "benchmark": benchmark if benchmark_closes is not None else None,
+        "observations": metrics["observations"],
+        "portfolio": {
+            "total_return_pct": _pct(metrics["portfolio_total_return"]),
+            "annualized_volatility_pct": _pct(metrics["portfolio_volatility"]),
+            "max_drawdown_pct": _pct(metrics["portfolio_max_drawdown"]),
+            "beta": _round(metrics["portfolio_beta"])
+        },
+        "holdings": holdings,
+        "correlation": _correlation_highlights(held, metrics["correlation"], top_pairs),
+        "missing_symbols": missing
+    }
+
+def _correlation_highlights(symbols: List[str], correlation: np.ndarray, top_pairs: int) -> dict:
+    """Summarize a correlation matrix as its most and least correlated pairs."""
+    if len(symbols) < 2:
+        return {"most_correlated": [], "least_correlated": []}
+    rows, cols = np.triu_indices(len(symbols), k=1)
+    values = correlation[rows, cols]
+    order = np.argsort(values)
+
+    def pairs(indices):
+        return [[symbols[rows[i]], symbols[cols[i]], _round(values[i])] for i in indices]
+
+    summary = {
+        "most_correlated": pairs(order[::-1][:top_pairs]),
+        "least_correlated": pairs(order[:top_pairs]),
+        "average": _round(values.mean())
+    }
+    # Small portfolios get the full matrix
+    if len(symbols) <= 10:
+        summary["matrix"] = {s: dict(zip(symbols, map(_round, row))) for s, row in zip(symbols, correlation)}
+    return summary
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs down each column without a Python loop over rows."""
+    mask = np.isfinite(matrix)
+    index = np.where(mask, np.arange(len(matrix))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = matrix[index, np.arange(matrix.shape[1])]
+    # Rows before the first valid value stay NaN
+    filled[~np.maximum.accumulate(mask, axis=0)] = np.nan
+    return filled
+
+def _round(value, digits: int = 2):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+def _pct(value):
+    return _round(value * 100 if value is not None else None)
@@ -0,0 +1,284 @@
+"""
+Vectorized backtesting of simple rule-based strategies across many symbols at once.
+Strategies operate on a closing-price matrix (one row per date, one column per symbol)
+with NumPy array operations; parameter sweeps can be spread over a process pool.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.analytics import TRADING_DAYS, load_close_matrix
+
+def moving_average(closes: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average down each column, NaN until `window` valid prices are seen.
+
+    Args:
+        closes: Closing-price matrix (dates x symbols)
+        window: Number of bars in the average
+
+    Returns:
+        Matrix of the same shape with the moving averages
+    """
+    result = np.full(closes.shape, np.nan)
+    if window > len(closes):
+        return result
+    valid = np.isfinite(closes)
+    if valid.all():
+        # Fast path without missing prices: difference of cumulative sums
+        csum = np.cumsum(closes, axis=0)
+        result[window - 1] = csum[window - 1] / window
+        result[window:] = (csum[window:] - csum[:-window]) / window
+        return result
+
+    csum = np.cumsum(np.where(valid, closes, 0.0), axis=0)
+    ccount = np.cumsum(valid, axis=0)
+    total = csum.copy()
+    count = ccount.copy()
+    total[window:] -= csum[:-window]
+    count[window:] -= ccount[:-window]
+    np.divide(total, window, out=result, where=count == window)
+    return result
+
+def ma_crossover(closes: np.ndarray, fast: int = 50, slow: int = 200, cost_bps: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Long when the fast moving average is above the slow one, flat otherwise.
+    Signals are computed on the close and applied from the next bar.
+
+    Args:
+        closes: Closing-price matrix (dates x symbols)
+        fast: Fast moving-average window
+        slow: Slow moving-average window
+        cost_bps: Transaction cost per unit of turnover, in basis points
+
+    Returns:
+        Dictionary with per-symbol 'equity' curves (dates x symbols), 'positions' and 'trades'
+    """
+    signal = moving_average(closes, fast) > moving_average(closes, slow)
+    positions = signal.astype(np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.nan_to_num(closes[1:] / closes[:-1] - 1.0)
+    turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))[:-1]
+    strategy_returns = positions[:-1] * returns - turnover * cost_bps / 10_000
+
+    equity = np.ones_like(closes, dtype=np.float64)
+    equity[1:] = np.cumprod(1.0 + strategy_returns, axis=0)
+    return {"equity": equity, "positions": positions, "trades": turnover.sum(axis=0)}
+
+def threshold_rebalance(closes: np.ndarray, weights: Optional[np.ndarray] = None, threshold: float = 0.05,
+                        cost_bps: float = 0.0, lookahead: int = TRADING_DAYS) -> Dict[str, np.ndarray]:
+    """
+    Hold target weights and rebalance whenever any weight drifts more than `threshold` away.
+
+    Rebalancing is path dependent, so the portfolio is advanced from one rebalance to the
+    next: each step evaluates the drift of every symbol over up to `lookahead` bars in one
+    array operation and jumps to the first breach. The loop runs once per rebalance, not
+    once per bar.
+
+    Args:
+        closes: Closing-price matrix (dates x symbols) without missing values
+        weights: Target weights, defaults to equal weights
+        threshold: Absolute weight drift that triggers a rebalance (e.g. 0.05 for 5 points)
+        cost_bps: Transaction cost per unit of turnover, in basis points
+        lookahead: Bars evaluated per step
+
+    Returns:
+        Dictionary with the portfolio 'equity' curve (dates x 1) and the number of 'rebalances'
+    """
+    n_dates, n_symbols = closes.shape
+    weights = np.full(n_symbols, 1.0 / n_symbols) if weights is None else np.asarray(weights, dtype=np.float64)
+    equity = np.empty(n_dates)
+    equity[0] = 1.0
+    rebalances = 0
+    start = 0
+    # Weights held at `start`, drifted away from the targets since the last rebalance
+    held = weights
+
+    while start < n_dates - 1:
+        end = min(n_dates, start + 1 + lookahead)
+        sleeves = held * (closes[start + 1:end] / closes[start])
+        totals = sleeves.sum(axis=1)
+        equity[start + 1:end] = equity[start] * totals
+
+        drift = np.abs(sleeves / totals[:, None] - weights)
+        breaches = np.flatnonzero(drift.max(axis=1) > threshold)
+        if breaches.size:
+            start = start + 1 + breaches[0]
+            turnover = drift[breaches[0]].sum()
+            equity[start] *= 1.0 - turnover * cost_bps / 10_000
+            held = weights
+            rebalances += 1
+        else:
+            # No breach in this chunk: carry the drifted weights into the next one
+            held = sleeves[-1] / totals[-1]
+            start = end - 1
+
+    return {"equity": equity[:, None], "rebalances": np.array([rebalances])}
+
+# Strategies callable from run_backtest and parameter_sweep
+STRATEGIES = {
+    "ma_crossover": ma_crossover,
+    "threshold_rebalance": threshold_rebalance
+}
+
+def performance_metrics(equity: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Summary statistics for one or more equity curves.
+
+    Args:
+        equity: Equity curves (dates x curves), starting at 1.0
+
+    Returns:
+        Dictionary of arrays with one value per curve: total_return, cagr,
+        volatility, sharpe and max_drawdown
+    """
+    equity = equity.reshape(len(equity), -1)
+    returns = equity[1:] / equity[:-1] - 1.0
+    years = max((len(equity) - 1) / TRADING_DAYS, 1e-9)
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    mean_return = returns.mean(axis=0) * TRADING_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(volatility > 0, mean_return / volatility, 0.0)
+    return {
+        "total_return": equity[-1] - 1.0,
+        "cagr": np.power(np.maximum(equity[-1], 0.0), 1.0 / years) - 1.0,
+        "volatility": volatility,
+        "sharpe": sharpe,
+        "max_drawdown": (equity / np.maximum.accumulate(equity, axis=0) - 1.0).min(axis=0)
+    }
+
+def run_backtest(closes: np.ndarray, strategy: str = "ma_crossover", **params) -> dict:
+    """
+    Run a strategy over a closing-price matrix and compare it with buy-and-hold.
+    Capital is split equally across symbols for per-symbol strategies.
+
+    Args:
+        closes: Closing-price matrix (dates x symbols)
+        strategy: Name of a strategy in STRATEGIES
+        **params: Strategy parameters
+
+    Returns:
+        Dictionary with 'portfolio' and 'buy_and_hold' metrics, per-symbol metrics
+        (for per-symbol strategies) and strategy-specific counters
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', choose from {', '.join(STRATEGIES)}")
+
+    # Backtest only the window where every symbol has a price
+    closes = np.asarray(closes, dtype=np.float64)
+    closes = closes[np.all(np.isfinite(closes), axis=1)]
+    if len(closes) < 3:
+        raise ValueError("Not enough overlapping price history to backtest")
+
+    result = STRATEGIES[strategy](closes, **params)
+    equity = result["equity"]
+    portfolio_equity = equity.mean(axis=1)
+    buy_and_hold = (closes / closes[0]).mean(axis=1)
+
+    summary = {
+        "strategy": strategy,
+        "params": params,
+        "bars": int(closes.size),
+        "portfolio": _first(performance_metrics(portfolio_equity)),
+        "buy_and_hold": _first(performance_metrics(buy_and_hold))
+    }
+    if equity.shape[1] == closes.shape[1]:
+        summary["per_symbol"] = performance_metrics(equity)
+    for key in ("trades", "rebalances"):
+        if key in result:
+            summary[key] = result[key]
+    return summary
+
+def parameter_sweep(closes: np.ndarray, strategy: str, grid: Dict[str, Sequence], processes: Optional[int] = None) -> List[dict]:
+    """
+    Evaluate a strategy for every combination of parameters in a grid.
+
+    Args:
+        closes: Closing-price matrix (dates x symbols)
+        strategy: Name of a strategy in STRATEGIES
+        grid: Parameter name -> list of values to try
+        processes: Worker processes; 1 runs in-process, None uses one per CPU
+
+    Returns:
+        List of {'params', 'portfolio'} results sorted by Sharpe ratio, best first
+    """
+    combos = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    tasks = [(strategy, combo) for combo in combos]
+
+    if processes == 1:
+        _init_worker(closes)
+        results = [_run_task(task) for task in tasks]
+    else:
+        # Each worker receives the price matrix once, not once per task
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(closes,)) as pool:
+            results = list(pool.map(_run_task, tasks))
+
+    return sorted(results, key=lambda r: r["portfolio"]["sharpe"], reverse=True)
+
+def backtest_symbols(symbols: List[str], strategy: str = "ma_crossover", years: int = 5, **params) -> dict:
+    """
+    Backtest a strategy on stored price history for a list of symbols, for the agent tools.
+
+    Args:
+        symbols: Stock symbols to include
+        strategy: Name of a strategy in STRATEGIES
+        years: Years of daily history to use
+        **params: Strategy parameters
+
+    Returns:
+        Dictionary of rounded metrics for the strategy and buy-and-hold, plus per-symbol results
+    """
+    # Several lots of one symbol are one position; a duplicate column would double its weight
+    symbols = list(dict.fromkeys(symbols))
+    dates, closes = load_close_matrix(symbols, months=12 * years)
+    available = [i for i in range(len(symbols)) if np.isfinite(closes[:, i]).any()]
+    missing = [symbols[i] for i in range(len(symbols)) if i not in available]
+    if not available:
+        return {"error": "No price history found for any symbol", "missing_symbols": missing}
+
+    summary = run_backtest(closes[:, available], strategy, **params)
+    response = {
+        "strategy": strategy,
+        "params": params,
+        "years": years,
+        "portfolio": _rounded(summary["portfolio"]),
+        "buy_and_hold": _rounded(summary["buy_and_hold"]),
+        "missing_symbols": missing
+    }
+    if "per_symbol" in summary:
+        per_symbol = summary["per_symbol"]
+        response["per_symbol"] = {
+            symbols[col]: _rounded({key: values[i] for key, values in per_symbol.items()})
+            for i, col in enumerate(available)
+        }
+    if "rebalances" in summary:
+        response["rebalances"] = int(summary["rebalances"][0])
+    if "trades" in summary:
+        response["trades"] = int(summary["trades"].sum())
+    return response
+
+# Price matrix shared by the tasks of one worker process
+_worker_closes = None
+
+def _init_worker(closes: np.ndarray) -> None:
+    global _worker_closes
+    _worker_closes = closes
+
+def _run_task(task) -> dict:
+    strategy, params = task
+    summary = run_backtest(_worker_closes, strategy, **params)
+    return {"params": params, "portfolio": summary["portfolio"]}
+
+def _first(metrics: Dict[str, np.ndarray]) -> Dict[str, float]:
+    return {key: float(values[0]) for key, values in metrics.items()}
+
+def _rounded(metrics: Dict[str, float]) -> Dict[str, float]:
+    percent_keys = {"total_return", "cagr", "volatility", "max_drawdown"}
+    return {
+        (f"{key}_pct" if key in percent_keys else key): round(float(value) * (100 if key in percent_keys else 1), 2)
+        for key, value in metrics.items()
+    }
@@ -1,12 +1,40 @@
-import yfinance as yf
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from app.utils.storage import user_dir, read_json, write_json_with_lock
+from typing import Callable
+from app.utils.storage import user_dir, read_json, transaction
+from app.utils.quote_cache import quote_cache
+from app.utils.history_store import history_store
+from app.utils.market_data import get_provider, RateLimitError
+from app.utils.symbol_index import symbol_index
+from app.utils.portfolio import Portfolio
+from app.utils.market_calendar import market_calendar
+
+# Provider request policy: concurrent requests, symbols per request, seconds to wait for
+# a refresh, retries after a rate limit, and the first and largest backoff in seconds
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", "50"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", "0.5"))
+FETCH_BACKOFF_MAX = float(os.getenv("FETCH_BACKOFF_MAX", "8"))
+
+# Shared pool for provider requests, created on first use; its size caps concurrent
+# requests across every caller in the process
+_fetch_pool = None
+_fetch_pool_lock = threading.Lock()
 
 def get_recent_prices(symbol:str)->list:
     """
-    Get the recent prices of a stock by its symbol using yfinance.
-    Fetches the last 3 months of price data.
+    Get the recent prices of a stock by its symbol.
+    Reads the last 3 months of price data from the local history store,
+    which only downloads bars that are missing since the previous call.
     
     Args:
         symbol: Stock symbol (e.g., 'AAPL', 'MSFT')
@@ -14,37 +42,84 @@ def get_recent_prices(symbol:str)->list:
     Returns:
         List of strings with date and closing price information
     """
+    # Skip symbols the provider recently reported as unknown
+    if symbol_index.is_known_bad(symbol):
+        return []
+    
     try:
-        # Get ticker information
-        ticker = yf.Ticker(symbol)
-        
         # Get the historical price data for the last 3 months
-        data = ticker.history(period='3mo')
+        history = _recent_history(symbol, months=3)
         
-        # If data is empty, return empty list
-        if data.empty:
-            return []
+        # Format as requested: "date":{date}, "closing_price":{closing_price}
+        return _format_price_entries(history.dates, history.close)
+    except Exception as e:
+        print(f"Error fetching historical prices for {symbol}: {e}")
+        return []
+
+def get_price_series(symbol: str, months: int = 3, interval: str = 'auto') -> dict:
+    """
+    Get recent closing prices as a compact columnar payload for the agent tools.
+    
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL', 'MSFT')
+        months: Number of months of history to return
+        interval: '1d' for daily bars, '1wk' for the last close of each week,
+                  or 'auto' to use weekly bars for periods longer than 6 months
+        
+    Returns:
+        Dictionary with the symbol, interval, and parallel 'dates' and 'closes' lists
+    """
+    if interval == 'auto':
+        interval = '1wk' if months > 6 else '1d'
+    
+    # Skip symbols the provider recently reported as unknown
+    if symbol_index.is_known_bad(symbol):
+        return {'symbol': symbol, 'interval': interval, 'dates': [], 'closes': []}
+    
+    try:
+        history = _recent_history(symbol, months=months)
+        dates, closes = history.dates, history.close
         
-        # Format the results as a list of strings
-        price_list = []
-        for date, row in data.iterrows():
-            # Format date as string and get closing price
-            date_str = date.strftime('%Y-%m-%d')
-            close_price = round(row['Close'], 2)
-            
-            # Format as requested: "date":{date}, "closing_price":{closing_price}
-            price_entry = f"\"date\":\"{date_str}\", \"closing_price\":{close_price}"
-            price_list.append(price_entry)
+        # Downsample to weekly bars by keeping the last trading day of each week
+        if interval == '1wk' and len(dates):
+            weeks = (dates.astype('int64') + 3) // 7  # epoch day 0 is a Thursday
+            last_of_week = np.flatnonzero(np.append(weeks[1:] != weeks[:-1], True))
+            dates, closes = dates[last_of_week], closes[last_of_week]
         
-        return price_list
+        return {
+            'symbol': symbol,
+            'interval': interval,
+            'dates': np.datetime_as_string(dates, unit='D').tolist(),
+            'closes': np.round(closes, 2).tolist()
+        }
     except Exception as e:
         print(f"Error fetching historical prices for {symbol}: {e}")
+        return {'symbol': symbol, 'interval': interval, 'dates': [], 'closes': []}
+
+def _recent_history(symbol: str, months: int):
+    """Read the last `months` months of bars for a symbol from the history store."""
+    start = (pd.Timestamp.today().normalize() - pd.DateOffset(months=months)).date()
+    return history_store.get(symbol, start)
+
+def _format_price_entries(dates, closes) -> list:
+    """
+    Format parallel date and close arrays as price strings in one vectorized pass.
+    
+    Returns:
+        List of strings formatted as "date":"{date}", "closing_price":{closing_price}
+    """
+    if len(dates) == 0:
         return []
+    date_strs = np.datetime_as_string(dates, unit='D')
+    close_strs = np.round(closes, 2).astype(str)
+    entries = np.char.add(np.char.add('"date":"', date_strs), '", "closing_price":')
+    return np.char.add(entries, close_strs).tolist()
 
 
 def get_current_price(symbol: str) -> float:
     """
-    Get the current price of a stock by its symbol using yfinance.
+    Get the current price of a stock by its symbol, read through the shared quote cache.
+    Symbols recorded as invalid in the symbol index are not looked up until their retry time.
     
     Args:
         symbol: Stock symbol (e.g., 'AAPL', 'MSFT')
@@ -52,23 +127,140 @@ def get_current_price(symbol: str) -> float:
     Returns:
         Current price as float or None if symbol not found
     """
-    try:
-        # Get ticker information
-        ticker = yf.Ticker(symbol)
+    if symbol_index.is_known_bad(symbol):
+        return None
+    return quote_cache.get(symbol, _fetch_current_price, _quote_ttl())
+
+def validate_symbol(symbol: str) -> bool:
+    """
+    Check that a symbol can be priced, e.g. before adding it to a portfolio.
+    The result is recorded in the symbol index.
+    
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL', 'MSFT')
+        
+    Returns:
+        True if the provider returned a current price for the symbol
+    """
+    return bool(symbol) and get_current_price(symbol) is not None
+
+def _quote_ttl() -> Callable[[str], float]:
+    """
+    Cache lifetime of each quote fetched now: closes fetched outside trading hours are kept
+    until the next open, quotes of symbols trading on other markets only for the cache TTL.
+    """
+    if market_calendar is None:
+        return lambda symbol: quote_cache.ttl
+    calendar_ttl = market_calendar.quote_ttl(quote_cache.ttl)
+    return lambda symbol: calendar_ttl if market_calendar.follows_calendar(symbol) else quote_cache.ttl
+
+def _fetch_current_price(symbol: str) -> float:
+    """
+    Fetch the current price of a stock from the active market data provider,
+    bypassing the cache.
+    
+    Returns:
+        Current price as float or None if symbol not found
+    """
+    provider = get_provider()
+    prices = fetch_in_batches([symbol], lambda batch: {batch[0]: provider.get_quote(batch[0])})
+    # A failed request leaves the symbol out, so only a provider "not found" marks it invalid
+    symbol_index.record_results(prices)
+    return prices.get(symbol)
+
+def get_current_prices(symbols: list) -> dict:
+    """
+    Get the current prices of several stocks, read through the shared quote cache.
+    Symbols missing from the cache are fetched together in one batched download;
+    symbols recorded as invalid in the symbol index are skipped.
+    
+    Args:
+        symbols: List of stock symbols (e.g., ['AAPL', 'MSFT'])
         
-        # Get the latest price data
-        # Using history with period='1d' to get the most recent day's data
-        data = ticker.history(period='1d')
+    Returns:
+        Dictionary mapping each symbol to its current price as float,
+        or None for symbols that could not be found
+    """
+    # De-duplicate symbols while keeping their original order
+    unique_symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+    if not unique_symbols:
+        return {}
+    
+    # Known-bad symbols resolve to None without a request
+    fetch, _ = symbol_index.partition(unique_symbols)
+    prices = quote_cache.get_many(fetch, _fetch_current_prices, _quote_ttl()) if fetch else {}
+    return {symbol: prices.get(symbol) for symbol in unique_symbols}
+
+def _fetch_current_prices(symbols: list) -> dict:
+    """
+    Fetch the current prices of several stocks in concurrent batched provider requests,
+    bypassing the cache.
+    
+    Returns:
+        Dictionary mapping each symbol to its price as float or None
+    """
+    prices = fetch_in_batches(symbols, get_provider().get_quotes)
+    # Symbols whose request failed or timed out are not evidence of an invalid symbol
+    symbol_index.record_results(prices)
+    return {symbol: prices.get(symbol) for symbol in symbols}
+
+def fetch_in_batches(symbols: list, fetch_batch: Callable[[list], dict], batch_size: int = None,
+                     timeout: float = None) -> dict:
+    """
+    Split symbols into batches and fetch them concurrently on the shared request pool.
+    Rate-limited requests are retried with jittered exponential backoff, so a refresh
+    takes about as long as its slowest batch instead of the sum of all batches.
+    
+    Args:
+        symbols: Stock symbols to fetch
+        fetch_batch: Function taking a list of symbols and returning symbol -> value
+        batch_size: Symbols per request, defaults to FETCH_BATCH_SIZE
+        timeout: Seconds to wait for all batches, defaults to FETCH_TIMEOUT
         
-        # If data is empty, return None
-        if data.empty:
-            return None
-            
-        # Return the latest close price
-        return round(data['Close'].iloc[-1], 2)
-    except Exception as e:
-        print(f"Error fetching price for {symbol}: {e}")
-        return None
+    Returns:
+        Dictionary with the results of the batches that completed in time;
+        symbols from failed or timed-out batches are absent
+    """
+    batch_size = batch_size or FETCH_BATCH_SIZE
+    timeout = FETCH_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    
+    batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+    pool = _get_fetch_pool()
+    futures = {pool.submit(_fetch_with_backoff, fetch_batch, batch, deadline): batch for batch in batches}
+    done, pending = wait(futures, timeout=timeout)
+    
+    results = {}
+    for future in done:
+        try:
+            results.update(future.result())
+        except Exception as e:
+            print(f"Error fetching prices for {', '.join(futures[future])}: {e}")
+    for future in pending:
+        # Requests already running finish in the background; their results are dropped
+        future.cancel()
+        print(f"Timed out after {timeout:g}s fetching prices for {', '.join(futures[future])}")
+    return results
+
+def _fetch_with_backoff(fetch_batch: Callable[[list], dict], batch: list, deadline: float) -> dict:
+    """Call fetch_batch, retrying on RateLimitError until retries run out or the deadline passes."""
+    for attempt in range(FETCH_RETRIES + 1):
+        try:
+            return fetch_batch(batch)
+        except RateLimitError:
+            # Full jitter: wait a random time up to the exponential bound so throttled
+            # batches do not retry in lockstep
+            delay = random.uniform(0, min(FETCH_BACKOFF_MAX, FETCH_BACKOFF * 2 ** attempt))
+            if attempt == FETCH_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
+
+def _get_fetch_pool() -> ThreadPoolExecutor:
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix="price-fetch")
+        return _fetch_pool
 
 def update_portfolio_prices(username: str) -> bool:
     """
@@ -92,36 +284,14 @@ def update_portfolio_prices(username: str) -> bool:
         # Current timestamp for update
         timestamp = datetime.now().isoformat()
         
-        # Update each stock in portfolio
-        for stock in portfolio:
-            symbol = stock.get('stock_code')
-            if not symbol:
-                continue
-                
-            # Get current price
-            current_price = get_current_price(symbol)
-            if current_price is None:
-                continue
-                
-            # Update stock information
-            stock['current_price'] = current_price
-            stock['last_updated'] = timestamp
-            
-            # Calculate value (quantity * current_price)
-            quantity = stock.get('quantity', 0)
-            stock['value'] = round(quantity * current_price, 2)
-            
-            # Calculate returns
-            purchase_price = stock.get('purchase_price', 0)
-            if purchase_price > 0:
-                # Total return (current value - purchase value)
-                stock['total_return'] = round(stock['value'] - (quantity * purchase_price), 2)
-                
-                # Percent return ((current - purchase) / purchase * 100)
-                stock['percent_return'] = round((current_price - purchase_price) / purchase_price * 100, 2)
+        # Fetch prices for all holdings in one batched request, without holding any lock
+        prices = get_current_prices([stock.get('stock_code') for stock in portfolio])
         
-        # Save updated portfolio
-        write_json_with_lock(portfolio_path, portfolio)
+        # Revalue the latest portfolio in one pass and save it unless another writer saved first
+        for txn in transaction(portfolio_path):
+            portfolio = txn.data or []
+            Portfolio(portfolio).revalue(prices, timestamp)
+            txn.commit(portfolio)
         return True
     except Exception as e:
         print(f"Error updating portfolio for {username}: {e}")
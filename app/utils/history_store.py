@@ -0,0 +1,292 @@
+"""
+Persistent per-symbol OHLCV history store.
+Daily bars are kept as columnar NumPy arrays under data/history/<provider>/<SYMBOL>/ and read
+through memory maps. Requests only download the date range that is missing locally
+and merge it into the stored columns.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from filelock import FileLock
+
+from app.utils.market_data import get_provider
+
+# Base directory for stored price histories
+HISTORY_DIR = Path(__file__).resolve().parents[2] / "data" / "history"
+
+# Stored columns besides the date column, matching yfinance column names
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Symbols that may name a directory of the store (tickers, share classes, indices, FX and futures)
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.^=-]{1,15}$")
+
+class PriceHistory(NamedTuple):
+    """Daily bars for one symbol as parallel arrays (read-only views into the store)."""
+    dates: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self):
+        return len(self.dates)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the bars as a DataFrame indexed by date, like yfinance history()."""
+        return pd.DataFrame(
+            {"Open": self.open, "High": self.high, "Low": self.low, "Close": self.close, "Volume": self.volume},
+            index=pd.DatetimeIndex(self.dates, name="Date")
+        )
+
+def normalize_symbol(symbol) -> Optional[str]:
+    """
+    Normalize a symbol for the store, rejecting anything that is not a plausible ticker.
+    Symbols come from LLM tool arguments, so they must never be trusted as path components.
+
+    Args:
+        symbol: Stock symbol (e.g., 'aapl', 'BRK.B', '^GSPC')
+
+    Returns:
+        Upper-case symbol, or None if it does not match SYMBOL_PATTERN
+    """
+    if not isinstance(symbol, str):
+        return None
+    symbol = symbol.strip().upper()
+    return symbol if SYMBOL_PATTERN.match(symbol) and symbol not in (".", "..") else None
+
+def _empty_history() -> PriceHistory:
+    empty = np.empty(0, dtype=np.float64)
+    return PriceHistory(np.empty(0, dtype="datetime64[D]"), empty, empty, empty, empty, empty)
+
+class HistoryStore:
+    """
+    On-disk columnar store of daily bars with incremental append.
+
+    Args:
+        root: Directory holding one sub-directory per symbol; defaults to a directory
+              per market data provider under data/history/ so replayed bars never mix
+              with real ones
+        fetcher: Function (symbol, start, end) -> DataFrame used to fill missing ranges;
+                 defaults to the active provider's get_history
+        refresh_interval: Seconds before the latest bar is downloaded again
+    """
+
+    def __init__(self, root: Optional[Path] = None, fetcher: Optional[Callable] = None, refresh_interval: float = 900.0):
+        self.root = Path(root) if root is not None else None
+        self.fetcher = fetcher
+        self.refresh_interval = refresh_interval
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # directory -> (file stamp, memory-mapped columns), reused until the files change
+        self._mapped = {}
+        # directory -> time of the last download that returned nothing for a symbol with no stored bars;
+        # kept in memory so unknown symbols leave nothing on disk
+        self._empty_attempts = {}
+
+    def get(self, symbol: str, start: date, end: Optional[date] = None) -> PriceHistory:
+        """
+        Get bars for a date range, downloading only what is missing locally.
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL')
+            start: First date of the range
+            end: Last date of the range (inclusive), defaults to today
+
+        Returns:
+            PriceHistory with the bars in the range, empty for an invalid symbol
+        """
+        symbol = normalize_symbol(symbol)
+        if symbol is None:
+            return _empty_history()
+        today = date.today()
+        end = min(end or today, today)
+        with self._symbol_lock(symbol):
+            self._fill_missing(symbol, start, end, today)
+        return self.read(symbol, start, end)
+
+    def read(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> PriceHistory:
+        """
+        Read stored bars without touching the network.
+        The returned arrays are slices of read-only memory maps, so no data is copied.
+
+        Args:
+            symbol: Stock symbol
+            start: First date of the range, defaults to the first stored bar
+            end: Last date of the range (inclusive), defaults to the last stored bar
+
+        Returns:
+            PriceHistory with the stored bars in the range, empty for an invalid symbol
+        """
+        symbol = normalize_symbol(symbol)
+        if symbol is None:
+            return _empty_history()
+        directory = self._symbol_dir(symbol)
+        with self._symbol_lock(symbol):
+            arrays = self._open_columns(directory)
+        if arrays is None:
+            return _empty_history()
+
+        dates = arrays[0]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        return PriceHistory(*[column[lo:hi] for column in arrays])
+
+    def append(self, symbol: str, frame: pd.DataFrame) -> int:
+        """
+        Merge new bars into the stored history. Bars for dates already stored are replaced.
+
+        Args:
+            symbol: Stock symbol
+            frame: DataFrame with Open/High/Low/Close/Volume columns indexed by date
+
+        Returns:
+            Number of bars stored for the symbol after the merge
+
+        Raises:
+            ValueError: If the symbol is not valid
+        """
+        normalized = normalize_symbol(symbol)
+        if normalized is None:
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        symbol = normalized
+        with self._symbol_lock(symbol):
+            return self._merge(symbol, frame)
+
+    def _fill_missing(self, symbol: str, start: date, end: date, today: date) -> None:
+        # Caller must hold the symbol lock
+        meta = self._read_meta(symbol)
+        covered_from = date.fromisoformat(meta["covered_from"]) if meta.get("covered_from") else None
+        covered_to = date.fromisoformat(meta["covered_to"]) if meta.get("covered_to") else None
+        # Throttle repeated downloads of the open end of the range
+        fetched_at = max(meta.get("fetched_at", 0), self._empty_attempts.get(self._symbol_dir(symbol), 0))
+        refresh_due = time.time() - fetched_at > self.refresh_interval
+
+        ranges = []
+        if covered_from is None:
+            if refresh_due:
+                ranges.append((start, end))
+        else:
+            if start < covered_from:
+                ranges.append((start, covered_from - timedelta(days=1)))
+            if (end > covered_to or end == today) and refresh_due:
+                # Re-fetch from the last stored bar, which may still have been in progress
+                ranges.append((covered_to, end))
+
+        if not ranges:
+            return
+
+        last_bar = None
+        for range_start, range_end in ranges:
+            try:
+                fetch = self.fetcher or get_provider().get_history
+                frame = fetch(symbol, range_start, range_end + timedelta(days=1))
+            except Exception as e:
+                # Serve whatever is stored and retry the range on the next request
+                print(f"Error fetching history for {symbol}: {e}")
+                return
+            if frame is not None and not frame.empty:
+                self._merge(symbol, frame)
+                stored = self.read(symbol)
+                last_bar = stored.dates[-1].astype(object)
+
+        if covered_from is None and last_bar is None:
+            # Nothing known yet (likely an unknown symbol): remember the attempt in memory only,
+            # so it is not repeated right away but no directory is created for it
+            self._empty_attempts[self._symbol_dir(symbol)] = time.time()
+            return
+        self._empty_attempts.pop(self._symbol_dir(symbol), None)
+        meta["fetched_at"] = time.time()
+
+        # Coverage only advances to the last bar actually received, so a failed or
+        # empty download is retried once the refresh interval has passed
+        meta["covered_from"] = min(start, covered_from or start).isoformat()
+        meta["covered_to"] = max(d for d in (covered_to, last_bar) if d is not None).isoformat()
+        self._write_meta(symbol, meta)
+
+    def _merge(self, symbol: str, frame: pd.DataFrame) -> int:
+        # Caller must hold the symbol lock
+        index = frame.index
+        if getattr(index, "tz", None) is not None:
+            index = index.tz_localize(None)
+        new_dates = index.normalize().values.astype("datetime64[D]")
+        new_columns = [frame[column].to_numpy(dtype=np.float64) for column in COLUMNS]
+
+        current = self.read(symbol)
+        dates = np.concatenate([current.dates, new_dates])
+        columns = [np.concatenate([old, new]) for old, new in zip(current[1:], new_columns)]
+
+        # Keep the last occurrence of each date so new bars win, then sort by date
+        reversed_dates = dates[::-1]
+        _, first_in_reversed = np.unique(reversed_dates, return_index=True)
+        keep = len(dates) - 1 - first_in_reversed
+        dates = dates[keep]
+        columns = [column[keep] for column in columns]
+
+        directory = self._symbol_dir(symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+        with FileLock(str(directory / ".lock")):
+            # Write the date column last: readers use its stamp to detect a finished write
+            for name, values in zip(COLUMNS + ("Date",), columns + [dates]):
+                self._save_array(directory / f"{name}.npy", values)
+        self._mapped.pop(directory, None)
+        return len(dates)
+
+    def _open_columns(self, directory: Path) -> Optional[list]:
+        # Caller must hold the symbol lock
+        try:
+            stat = (directory / "Date.npy").stat()
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cached = self._mapped.get(directory)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        arrays = [np.load(directory / f"{name}.npy", mmap_mode="r") for name in ("Date",) + COLUMNS]
+        self._mapped[directory] = (stamp, arrays)
+        return arrays
+
+    def _save_array(self, path: Path, values: np.ndarray) -> None:
+        # Write to a temporary file and replace, so open memory maps keep their old data
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            np.save(f, np.ascontiguousarray(values))
+        os.replace(tmp, path)
+
+    def _read_meta(self, symbol: str) -> dict:
+        path = self._symbol_dir(symbol) / "meta.json"
+        if not path.exists():
+            return {}
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol: str, meta: dict) -> None:
+        directory = self._symbol_dir(symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / "meta.tmp"
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, directory / "meta.json")
+
+    def _symbol_dir(self, symbol: str) -> Path:
+        normalized = normalize_symbol(symbol)
+        if normalized is None:
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        root = self.root if self.root is not None else HISTORY_DIR / get_provider().name
+        return root / normalized
+
+    def _symbol_lock(self, symbol: str) -> threading.RLock:
+        with self._locks_guard:
+            return self._locks.setdefault(str(self._symbol_dir(symbol)), threading.RLock())
+
+# Shared store used by the finance utilities and agent tools
+history_store = HistoryStore(refresh_interval=float(os.environ.get("HISTORY_REFRESH_INTERVAL", "900")))
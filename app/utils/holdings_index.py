@@ -0,0 +1,224 @@
+"""
+Inverted index from stock symbol to the users holding it.
+The index is kept in sync with every portfolio.json written through storage.write_json_with_lock
+and persisted with each user's portfolio version (see storage.version), so a restart only re-reads portfolios that changed outside
+the storage layer.
+"""
+
+import atexit
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Set
+
+from app.utils import storage
+from app.utils.storage import add_write_listener, read_json, write_json_with_lock, user_versions
+
+# File holding the persisted index
+INDEX_PATH = Path(__file__).resolve().parents[2] / "data" / "holdings_index.json"
+
+# Seconds between saves caused only by version changes (e.g. price revaluations)
+SAVE_INTERVAL = 5.0
+
+class HoldingsIndex:
+    """
+    Symbol -> usernames index over the users' portfolio.json files.
+
+    Args:
+        users_dir: Directory with one sub-directory per user, defaults to data/users
+        path: JSON file the index is persisted to, defaults to data/holdings_index.json
+    """
+
+    def __init__(self, users_dir: Optional[Path] = None, path: Optional[Path] = None):
+        self.users_dir = Path(users_dir) if users_dir is not None else storage.BASE
+        self.path = Path(path) if path is not None else INDEX_PATH
+        self._lock = threading.RLock()
+        # username -> {"version": portfolio version when indexed, "symbols": sorted symbols held}
+        self._users = None
+        self._by_symbol = {}
+        # Unsaved version changes and when the index was last saved
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def holders(self, symbol: str) -> Set[str]:
+        """
+        Get the users holding a symbol.
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL')
+
+        Returns:
+            Set of usernames
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._by_symbol.get(symbol, ()))
+
+    def symbols(self) -> List[str]:
+        """
+        Get every symbol held by at least one user.
+
+        Returns:
+            Sorted list of symbols
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self._by_symbol)
+
+    def portfolio_path(self, username: str) -> Path:
+        """Path of a user's portfolio file."""
+        return self.users_dir / username / "portfolio.json"
+
+    def update(self, username: str, portfolio: Optional[list], version=None) -> None:
+        """
+        Record the holdings of a user.
+        The index is persisted right away when the user's set of symbols changes; a
+        write that only changes prices is persisted at most every SAVE_INTERVAL seconds.
+
+        Args:
+            username: Username
+            portfolio: Holdings as stored in portfolio.json, None or empty if the user holds nothing
+            version: Version of the portfolio the holdings came from (see storage.version)
+        """
+        symbols = _held_symbols(portfolio)
+        with self._lock:
+            self._ensure_loaded()
+            changed = self._set_user(username, symbols, version)
+            self._dirty = True
+            if changed or time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self.save()
+
+    def remove(self, username: str) -> None:
+        """
+        Drop a user from the index.
+
+        Args:
+            username: Username
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._set_user(username, [], None):
+                self.save()
+
+    def refresh(self) -> bool:
+        """
+        Re-read portfolios changed since they were indexed, e.g. written by another process.
+
+        Returns:
+            True if the index changed
+        """
+        with self._lock:
+            if self._users is None:
+                self._ensure_loaded()
+                return True
+            changed = self._reconcile()
+            if changed:
+                self.save()
+            return changed
+
+    def rebuild(self) -> None:
+        """Re-read every portfolio and persist a fresh index."""
+        with self._lock:
+            self._users, self._by_symbol = {}, {}
+            self._reconcile()
+            self.save()
+
+    def save(self) -> None:
+        """Persist the index."""
+        with self._lock:
+            if self._users is None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_with_lock(self.path, {"users": self._users})
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            except OSError as e:
+                print(f"Error writing holdings index {self.path}: {e}")
+
+    def flush(self) -> None:
+        """Persist changes that are not saved yet."""
+        with self._lock:
+            if self._dirty:
+                self.save()
+
+    def on_write(self, path: Path, data, version) -> None:
+        """Storage write listener: re-index a user when their portfolio.json is written."""
+        path = Path(path)
+        if path.name != "portfolio.json" or path.parent.parent != self.users_dir:
+            return
+        self.update(path.parent.name, data, version)
+
+    def _set_user(self, username: str, symbols: list, user_version) -> bool:
+        """Update the maps for one user. Returns True if the user's symbols changed. Caller holds the lock."""
+        previous = self._users.get(username)
+        old_symbols = previous["symbols"] if previous else []
+        # Users without holdings are kept while their file exists, so it is not re-read on startup
+        if symbols or user_version is not None:
+            self._users[username] = {"version": user_version, "symbols": symbols}
+        else:
+            self._users.pop(username, None)
+        if old_symbols == symbols:
+            return False
+
+        for symbol in set(old_symbols) - set(symbols):
+            holders = self._by_symbol.get(symbol)
+            if holders is not None:
+                holders.discard(username)
+                if not holders:
+                    del self._by_symbol[symbol]
+        for symbol in symbols:
+            self._by_symbol.setdefault(symbol, set()).add(username)
+        return True
+
+    def _ensure_loaded(self) -> None:
+        """Load the persisted index on first use and re-read portfolios that changed since. Caller holds the lock."""
+        if self._users is not None:
+            return
+        self._users, self._by_symbol = {}, {}
+        persisted = {}
+        try:
+            persisted = (read_json(self.path) or {}).get("users", {})
+        except (OSError, ValueError) as e:
+            print(f"Error reading holdings index {self.path}: {e}")
+        for username, entry in persisted.items():
+            self._set_user(username, entry.get("symbols", []), entry.get("version"))
+        if self._reconcile():
+            self.save()
+
+    def _reconcile(self) -> bool:
+        """
+        Compare indexed users with the stored portfolios (one stat per user, or one query
+        with the sqlite backend), re-reading only portfolios whose version differs. Caller holds the lock.
+
+        Returns:
+            True if the index changed
+        """
+        changed = False
+        stored = user_versions("portfolio.json", self.users_dir)
+
+        for username in set(self._users) - set(stored):
+            self._set_user(username, [], None)
+            changed = True
+
+        for username, user_version in stored.items():
+            entry = self._users.get(username)
+            if entry is not None and entry["version"] == user_version:
+                continue
+            try:
+                portfolio = read_json(self.portfolio_path(username))
+            except (OSError, ValueError) as e:
+                print(f"Error reading portfolio for {username}: {e}")
+                continue
+            symbols = _held_symbols(portfolio)
+            self._set_user(username, symbols, user_version)
+            changed = True
+        return changed
+
+def _held_symbols(portfolio: Optional[list]) -> list:
+    return sorted({stock.get('stock_code') for stock in portfolio or [] if stock.get('stock_code')})
+
+# Shared index, kept in sync with portfolio writes made through the storage module
+holdings_index = HoldingsIndex()
+add_write_listener(holdings_index.on_write)
+atexit.register(holdings_index.flush)
@@ -0,0 +1,332 @@
+"""
+Technical indicators (SMA, EMA, RSI, MACD, Bollinger bands) for the agent tools.
+Each symbol keeps rolling state so a new bar updates every indicator in O(1);
+a vectorized batch mode computes full series for backfill from the history store.
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.utils.history_store import history_store
+
+# Default indicator parameters
+DEFAULT_PARAMS = {
+    "sma_window": 20,
+    "ema_span": 20,
+    "rsi_period": 14,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "bollinger_k": 2.0
+}
+
+# Recompute the running sums from the window every this many updates to bound rounding drift
+RESUM_INTERVAL = 1000
+
+def compute_indicators(closes: np.ndarray, **params) -> Dict[str, np.ndarray]:
+    """
+    Compute full indicator series for a price history in one vectorized pass.
+
+    Args:
+        closes: Closing prices in date order
+        **params: Overrides for DEFAULT_PARAMS
+
+    Returns:
+        Dictionary of arrays aligned with closes (NaN where an indicator is not yet defined):
+        sma, ema, rsi, macd, macd_signal, macd_histogram, bollinger_upper, bollinger_lower
+    """
+    p = {**DEFAULT_PARAMS, **params}
+    closes = np.asarray(closes, dtype=np.float64)
+    n = len(closes)
+    series = pd.Series(closes)
+
+    # SMA and Bollinger bands over a sliding window
+    window = p["sma_window"]
+    sma = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if n >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(closes, window)
+        sma[window - 1:] = windows.mean(axis=1)
+        std[window - 1:] = windows.std(axis=1)
+
+    ema = _ewm(series, 2.0 / (p["ema_span"] + 1))
+
+    # RSI with Wilder smoothing of gains and losses
+    changes = series.diff().iloc[1:]
+    avg_gain = _wilder(changes.clip(lower=0), p["rsi_period"])
+    avg_loss = _wilder((-changes).clip(lower=0), p["rsi_period"])
+    rsi = np.full(n, np.nan)
+    if n > p["rsi_period"]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain / avg_loss
+            values = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+        rsi[p["rsi_period"]:] = values[p["rsi_period"] - 1:]
+
+    macd = _ewm(series, 2.0 / (p["macd_fast"] + 1)) - _ewm(series, 2.0 / (p["macd_slow"] + 1))
+    signal = _ewm(pd.Series(macd), 2.0 / (p["macd_signal"] + 1))
+    macd_ready = np.arange(n) >= p["macd_slow"] - 1
+    signal_ready = np.arange(n) >= p["macd_slow"] + p["macd_signal"] - 2
+
+    return {
+        "sma": sma,
+        "ema": ema,
+        "rsi": rsi,
+        "macd": np.where(macd_ready, macd, np.nan),
+        "macd_signal": np.where(signal_ready, signal, np.nan),
+        "macd_histogram": np.where(signal_ready, macd - signal, np.nan),
+        "bollinger_upper": sma + p["bollinger_k"] * std,
+        "bollinger_lower": sma - p["bollinger_k"] * std
+    }
+
+class IndicatorState:
+    """
+    Rolling indicator state for one symbol, updated in O(1) per bar.
+
+    Updating with the same date as the previous bar replaces that bar, so an
+    in-progress daily bar can be refreshed without double counting.
+    """
+
+    def __init__(self, **params):
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.window = deque(maxlen=self.params["sma_window"])
+        self.values = {
+            "sum": 0.0, "sumsq": 0.0, "ema": None, "ema_fast": None, "ema_slow": None, "signal": None,
+            "avg_gain": None, "avg_loss": None, "last_close": None, "last_date": None, "count": 0
+        }
+        # Values and evicted window entry from before the latest update, to replace the last bar
+        self._undo = None
+
+    @classmethod
+    def from_history(cls, closes: np.ndarray, dates: Optional[np.ndarray] = None, **params) -> "IndicatorState":
+        """
+        Build state from a full price history using the vectorized batch mode.
+
+        Args:
+            closes: Closing prices in date order
+            dates: Matching dates, optional
+            **params: Overrides for DEFAULT_PARAMS
+
+        Returns:
+            IndicatorState positioned after the last bar
+        """
+        state = cls(**params)
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(closes) == 0:
+            return state
+
+        # Backfill everything but the last bar in bulk, then apply the last bar
+        # incrementally so it can still be replaced by a later update
+        head = closes[:-1]
+        p = state.params
+        if len(head):
+            state.window.extend(head[-p["sma_window"]:].tolist())
+            v = state.values
+            v["sum"] = float(sum(state.window))
+            v["sumsq"] = float(sum(x * x for x in state.window))
+            series = pd.Series(head)
+            v["ema"] = float(_ewm(series, 2.0 / (p["ema_span"] + 1))[-1])
+            v["ema_fast"] = float(_ewm(series, 2.0 / (p["macd_fast"] + 1))[-1])
+            v["ema_slow"] = float(_ewm(series, 2.0 / (p["macd_slow"] + 1))[-1])
+            macd = _ewm(series, 2.0 / (p["macd_fast"] + 1)) - _ewm(series, 2.0 / (p["macd_slow"] + 1))
+            v["signal"] = float(_ewm(pd.Series(macd), 2.0 / (p["macd_signal"] + 1))[-1])
+            if len(head) > 1:
+                changes = series.diff().iloc[1:]
+                v["avg_gain"] = float(_wilder(changes.clip(lower=0), p["rsi_period"])[-1])
+                v["avg_loss"] = float(_wilder((-changes).clip(lower=0), p["rsi_period"])[-1])
+            v["last_close"] = float(head[-1])
+            v["last_date"] = None if dates is None else _as_date(dates[-2])
+            v["count"] = len(head)
+
+        state.update(float(closes[-1]), None if dates is None else _as_date(dates[-1]))
+        return state
+
+    def update(self, close: float, bar_date: Optional[date] = None) -> dict:
+        """
+        Apply a new bar.
+
+        Args:
+            close: Closing price of the bar
+            bar_date: Date of the bar; a bar with the same date as the last one replaces it
+
+        Returns:
+            Current indicator values (see snapshot)
+        """
+        if bar_date is not None and bar_date == self.values["last_date"] and self._undo is not None:
+            self._revert()
+
+        p = self.params
+        v = self.values
+        evicted = self.window[0] if len(self.window) == self.window.maxlen else None
+        self._undo = (dict(v), evicted)
+
+        # SMA / Bollinger running sums
+        if evicted is not None:
+            v["sum"] -= evicted
+            v["sumsq"] -= evicted * evicted
+        self.window.append(close)
+        v["sum"] += close
+        v["sumsq"] += close * close
+
+        # Exponential averages
+        v["ema"] = _ema_step(v["ema"], close, 2.0 / (p["ema_span"] + 1))
+        v["ema_fast"] = _ema_step(v["ema_fast"], close, 2.0 / (p["macd_fast"] + 1))
+        v["ema_slow"] = _ema_step(v["ema_slow"], close, 2.0 / (p["macd_slow"] + 1))
+        v["signal"] = _ema_step(v["signal"], v["ema_fast"] - v["ema_slow"], 2.0 / (p["macd_signal"] + 1))
+
+        # RSI gains and losses: a running mean over the first rsi_period changes, then Wilder's smoothing
+        if v["last_close"] is not None:
+            change = close - v["last_close"]
+            alpha = 1.0 / min(v["count"], p["rsi_period"])
+            v["avg_gain"] = _ema_step(v["avg_gain"], max(change, 0.0), alpha)
+            v["avg_loss"] = _ema_step(v["avg_loss"], max(-change, 0.0), alpha)
+
+        v["last_close"] = close
+        v["last_date"] = bar_date
+        v["count"] += 1
+        if v["count"] % RESUM_INTERVAL == 0:
+            v["sum"] = float(sum(self.window))
+            v["sumsq"] = float(sum(x * x for x in self.window))
+        return self.snapshot()
+
+    def snapshot(self) -> dict:
+        """
+        Current indicator values, None where not enough bars have been seen.
+
+        Returns:
+            Dictionary with close, date, sma, ema, rsi, macd, macd_signal,
+            macd_histogram, bollinger_upper and bollinger_lower
+        """
+        p = self.params
+        v = self.values
+        count = v["count"]
+        result = {key: None for key in ("sma", "ema", "rsi", "macd", "macd_signal", "macd_histogram",
+                                        "bollinger_upper", "bollinger_lower")}
+        result["close"] = v["last_close"]
+        result["date"] = v["last_date"].isoformat() if v["last_date"] else None
+        if count == 0:
+            return result
+
+        result["ema"] = v["ema"]
+        if len(self.window) == self.window.maxlen:
+            n = len(self.window)
+            mean = v["sum"] / n
+            std = math.sqrt(max(v["sumsq"] / n - mean * mean, 0.0))
+            result["sma"] = mean
+            result["bollinger_upper"] = mean + p["bollinger_k"] * std
+            result["bollinger_lower"] = mean - p["bollinger_k"] * std
+        if count > p["rsi_period"]:
+            result["rsi"] = 100.0 if v["avg_loss"] == 0 else 100.0 - 100.0 / (1.0 + v["avg_gain"] / v["avg_loss"])
+        if count >= p["macd_slow"]:
+            result["macd"] = v["ema_fast"] - v["ema_slow"]
+        if count >= p["macd_slow"] + p["macd_signal"] - 1:
+            result["macd_signal"] = v["signal"]
+            result["macd_histogram"] = result["macd"] - v["signal"]
+        return result
+
+    def _revert(self) -> None:
+        values, evicted = self._undo
+        self.window.pop()
+        if evicted is not None:
+            self.window.appendleft(evicted)
+        self.values = values
+        self._undo = None
+
+class IndicatorEngine:
+    """
+    Per-symbol indicator states kept in sync with the history store.
+    The least recently used state is dropped once maxsize symbols are tracked; a dropped
+    symbol is backfilled from the history store again on its next lookup.
+
+    Args:
+        months: Months of history used to backfill a new symbol
+        maxsize: Maximum number of symbols tracked at once
+        **params: Overrides for DEFAULT_PARAMS
+    """
+
+    def __init__(self, months: int = 12, maxsize: int = 1024, **params):
+        self.months = months
+        self.maxsize = maxsize
+        self.params = params
+        # symbol -> IndicatorState, ordered from least to most recently used
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, symbol: str) -> dict:
+        """
+        Get current indicator values for a symbol, applying any new bars first.
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL')
+
+        Returns:
+            Indicator snapshot (see IndicatorState.snapshot)
+        """
+        start = (pd.Timestamp.today().normalize() - pd.DateOffset(months=self.months)).date()
+        history = history_store.get(symbol, start)
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None or state.values["last_date"] is None:
+                state = IndicatorState.from_history(history.close, history.dates, **self.params)
+                self._states[symbol] = state
+                while len(self._states) > self.maxsize:
+                    self._states.popitem(last=False)
+                    self.evictions += 1
+            else:
+                # Only bars from the last seen date on are applied
+                first_new = int(np.searchsorted(history.dates, np.datetime64(state.values["last_date"], "D")))
+                for bar_date, close in zip(history.dates[first_new:], history.close[first_new:]):
+                    state.update(float(close), _as_date(bar_date))
+            self._states.move_to_end(symbol)
+            return state.snapshot()
+
+    def update(self, symbol: str, close: float, bar_date: date) -> dict:
+        """
+        Apply a live bar to a symbol that is already tracked.
+
+        Args:
+            symbol: Stock symbol
+            close: Latest closing (or last traded) price
+            bar_date: Date of the bar
+
+        Returns:
+            Indicator snapshot, or an empty dict if the symbol is not tracked yet
+        """
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                return {}
+            self._states.move_to_end(symbol)
+            return state.update(close, bar_date)
+
+def _ewm(series: pd.Series, alpha: float) -> np.ndarray:
+    """Exponentially weighted mean seeded with the first value, like the incremental update."""
+    return series.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+def _wilder(values: pd.Series, period: int) -> np.ndarray:
+    """
+    Wilder's smoothing as used by RSI: a running mean over the first period values, so the
+    first full average is their SMA, then an exponential average with alpha 1 / period.
+    """
+    values = values.to_numpy(dtype=np.float64)
+    head = np.cumsum(values[:period]) / np.arange(1, min(period, len(values)) + 1)
+    if len(values) <= period:
+        return head
+    tail = pd.Series(np.append(head[-1], values[period:])).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return np.concatenate([head, tail[1:]])
+
+def _ema_step(previous: Optional[float], value: float, alpha: float) -> float:
+    return value if previous is None else previous + alpha * (value - previous)
+
+def _as_date(value) -> date:
+    return pd.Timestamp(value).date()
+
+# Shared engine used by the agent tools
+indicator_engine = IndicatorEngine(maxsize=int(os.environ.get("INDICATOR_CACHE_MAXSIZE", "1024")))
@@ -0,0 +1,250 @@
+"""
+Write-behind journal for the JSON storage backend.
+
+Instead of rewriting and fsyncing one file per write, writes are appended to a journal and
+made durable with group commit: writers that arrive while an fsync is in progress are
+batched together and share the next fsync. The latest data of each path is kept in memory
+so reads see it immediately, and the journal is periodically compacted into the regular
+snapshot files (the portfolio.json, profile.json, ... files of the file backend).
+
+Durability:
+    - A write returns only after its journal record has been fsynced, so a write that
+      returned survives a process or machine crash, exactly as with the file backend.
+    - Snapshot files may lag behind the journal until the next compaction. After a crash
+      the journal is replayed into the snapshot files when it is opened again.
+    - Only one process writes through a journal at a time, and only while it is the only
+      process using the data tree (see storage.write_journal). Files lag behind the journal,
+      so a process writing them directly could read stale documents, pass a compare-and-swap
+      against them, and then have its write overwritten by the next compaction. A process
+      joining the data tree therefore waits until the journal's owner has compacted it and
+      switched to direct writes, and a process that finds the tree in use does not open a
+      journal at all.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Returned by pending() for paths without a journaled write
+MISSING = object()
+
+class WriteJournal:
+    """
+    Append-only journal of JSON document writes with group commit and compaction.
+
+    Args:
+        path: Journal file; compaction rotates it to <path>.old while snapshots are written
+        apply: Function writing one document to its snapshot file, called as apply(path, data); it may
+               skip the fsync where os.sync is available, as the journal syncs once after all snapshots
+        compact_bytes: Journal size that triggers a compaction
+        commit_delay: Seconds a committer waits for more writers before fsyncing
+    """
+
+    def __init__(self, path: Path, apply: Callable[[Path, Any], None],
+                 compact_bytes: int = 8 * 1024 * 1024, commit_delay: float = 0.0):
+        self.path = Path(path)
+        self.old_path = self.path.with_name(self.path.name + ".old")
+        self.compact_bytes = compact_bytes
+        self.commit_delay = commit_delay
+        self._apply = apply
+        self._cond = threading.Condition()
+        self._compact_lock = threading.Lock()
+        # Encoded records not yet written, and the sequence numbers written and fsynced so far
+        self._queue = []
+        self._seq = 0
+        self._durable_seq = 0
+        self._committing = False
+        # path -> (sequence number, data) of writes not yet compacted into snapshot files
+        self._pending = {}
+        self.commits = 0
+        self.records = 0
+        self.compactions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.recovered = self.recover()
+        self._file = self.path.open("ab")
+        self._size = self._file.tell()
+
+    def recover(self) -> int:
+        """
+        Replay journal files left by a previous process into the snapshot files.
+
+        Returns:
+            Number of documents written
+        """
+        latest = {}
+        for journal in (self.old_path, self.path):
+            for record in _read_records(journal):
+                latest[record["path"]] = record["data"]
+        for path, data in latest.items():
+            self._apply_snapshot(Path(path), data)
+        _sync()
+        # Snapshots are durable now, so the journal can be dropped
+        for journal in (self.old_path, self.path):
+            if journal.exists():
+                journal.unlink()
+        return len(latest)
+
+    def write(self, path: Path, data: Any) -> int:
+        """
+        Journal a document write and wait until it is durable.
+
+        Args:
+            path: Document path
+            data: JSON-serializable data; the journal keeps this object, so pass a private copy
+
+        Returns:
+            Sequence number of the write
+        """
+        key = str(path)
+        record = (json.dumps({"path": key, "data": data}, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self._queue.append(record)
+            self._pending[key] = (seq, data)
+
+            # Group commit: one writer fsyncs everything queued so far, the others wait for it
+            while self._durable_seq < seq:
+                if self._committing:
+                    self._cond.wait()
+                    continue
+                self._committing = True
+                self._cond.release()
+                try:
+                    if self.commit_delay:
+                        time.sleep(self.commit_delay)
+                    self._commit()
+                finally:
+                    self._cond.acquire()
+                    self._committing = False
+                    self._cond.notify_all()
+            compact = self._size >= self.compact_bytes
+
+        if compact:
+            self.compact()
+        return seq
+
+    def pending(self, path: Path) -> Any:
+        """
+        Get the journaled data of a path that is not compacted yet.
+
+        Args:
+            path: Document path
+
+        Returns:
+            The data object passed to write (do not modify it), or MISSING
+        """
+        with self._cond:
+            entry = self._pending.get(str(path))
+        return entry[1] if entry is not None else MISSING
+
+    def pending_seq(self, path: Path) -> Optional[int]:
+        """Sequence number of a path's journaled write, or None if it has none."""
+        with self._cond:
+            entry = self._pending.get(str(path))
+        return entry[0] if entry is not None else None
+
+    def pending_paths(self) -> Dict[str, int]:
+        """Paths with journaled writes and their sequence numbers."""
+        with self._cond:
+            return {path: seq for path, (seq, _) in self._pending.items()}
+
+    def compact(self) -> int:
+        """
+        Write the latest data of every journaled path to its snapshot file and drop the journal.
+        Writers are not blocked: the journal is rotated first and new writes go to a fresh file.
+
+        Returns:
+            Number of documents written
+        """
+        with self._compact_lock:
+            with self._cond:
+                while self._committing:
+                    self._cond.wait()
+                if not self._pending:
+                    return 0
+                # Records still queued are written to the new journal by their writers
+                self._file.close()
+                os.replace(self.path, self.old_path)
+                self._file = self.path.open("ab")
+                self._size = 0
+                snapshot = dict(self._pending)
+
+            for key, (_, data) in snapshot.items():
+                self._apply_snapshot(Path(key), data)
+            # One sync for every snapshot file, before the journal that covers them is dropped
+            _sync()
+
+            with self._cond:
+                # Keep paths written again during the compaction; their records are in the new journal
+                for key, (seq, _) in snapshot.items():
+                    if self._pending.get(key, (None,))[0] == seq:
+                        del self._pending[key]
+            self.old_path.unlink()
+            self.compactions += 1
+            return len(snapshot)
+
+    def close(self) -> None:
+        """Compact the journal and close it."""
+        self.compact()
+        with self._cond:
+            self._file.close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get journal counters.
+
+        Returns:
+            Dictionary with records, commits (fsyncs), compactions, pending documents and journal bytes
+        """
+        with self._cond:
+            return {
+                'records': self.records,
+                'commits': self.commits,
+                'compactions': self.compactions,
+                'pending': len(self._pending),
+                'bytes': self._size
+            }
+
+    def _apply_snapshot(self, path: Path, data: Any) -> None:
+        """Write one snapshot file, dropping documents whose directory was deleted since."""
+        if not path.parent.exists():
+            print(f"Dropping journaled write to {path}: directory no longer exists")
+            return
+        self._apply(path, data)
+
+    def _commit(self) -> None:
+        """Write and fsync every queued record. Called by the single committing writer without the lock."""
+        with self._cond:
+            batch, self._queue = self._queue, []
+            upto = self._seq
+        data = b"".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        with self._cond:
+            self._size += len(data)
+            self._durable_seq = upto
+            self.records += len(batch)
+            self.commits += 1
+
+def _sync() -> None:
+    if hasattr(os, "sync"):
+        os.sync()
+
+def _read_records(path: Path):
+    """Yield the records of a journal file, stopping at a torn final record."""
+    if not path.exists():
+        return
+    with path.open("rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
@@ -0,0 +1,225 @@
+"""
+Exchange sessions, holidays and the price refresh policy built on them.
+Sessions and holidays come from data/market_calendar.json. Outside trading hours prices
+cannot change, so the policy only asks for a fetch when a price predates the last close;
+during a session each symbol is refreshed once its data is older than its staleness budget.
+Symbols trading on other markets (crypto, futures, currencies, foreign listings) are refreshed
+on their staleness budget at all hours.
+"""
+
+import json
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Local exchange calendar file
+CALENDAR_PATH = Path(__file__).resolve().parents[2] / "data" / "market_calendar.json"
+
+# Minutes after the close before the closing price is treated as final
+SETTLE_MINUTES = 15
+
+# Yahoo symbols of instruments that do not follow the exchange's sessions: crypto pairs
+# (BTC-USD), futures and currencies (CL=F, EURUSD=X) and foreign listings (VOD.L, SHOP.TO)
+OTHER_MARKETS = [r"-(USD|USDT|USDC|EUR|GBP|JPY|BTC|ETH)$", r"=[FX]$", r"\.[A-Z]{1,3}$"]
+
+class MarketCalendar:
+    """
+    Trading sessions of one exchange.
+
+    Args:
+        path: Calendar JSON file, defaults to data/market_calendar.json
+        data: Calendar contents, used instead of reading a file
+    """
+
+    def __init__(self, path: Optional[Path] = None, data: Optional[dict] = None):
+        if data is None:
+            with Path(path or CALENDAR_PATH).open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.exchange = data.get("exchange", "")
+        self.timezone = ZoneInfo(data.get("timezone", "America/New_York"))
+        self.open_time = time.fromisoformat(data.get("open", "09:30"))
+        self.close_time = time.fromisoformat(data.get("close", "16:00"))
+        self.early_close_time = time.fromisoformat(data.get("early_close", "13:00"))
+        self.holidays = {date.fromisoformat(d) for d in data.get("holidays", [])}
+        self.early_closes = {date.fromisoformat(d) for d in data.get("early_closes", [])}
+        # Holidays are only known up to the last year listed in the file
+        self.last_year = max((day.year for day in self.holidays), default=None)
+        self._warned_past_end = False
+        self.other_markets = [re.compile(pattern) for pattern in data.get("other_markets", OTHER_MARKETS)]
+        staleness = data.get("staleness_seconds", {})
+        self.default_staleness = float(staleness.get("default", 300))
+        self.symbol_staleness = {symbol: float(seconds) for symbol, seconds in staleness.get("symbols", {}).items()}
+
+    def is_trading_day(self, day: date) -> bool:
+        """Whether the exchange holds a session on a date."""
+        if self.last_year is not None and day.year > self.last_year and not self._warned_past_end:
+            self._warned_past_end = True
+            print(f"Warning: market calendar {self.exchange} lists no holidays after {self.last_year}, "
+                  f"every weekday of {day.year} is treated as a trading day; add them to {CALENDAR_PATH.name}")
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session(self, day: date) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Get the session of a date.
+
+        Args:
+            day: Date in the exchange's timezone
+
+        Returns:
+            Tuple of timezone-aware (open, close), or None if the exchange is closed all day
+        """
+        if not self.is_trading_day(day):
+            return None
+        close = self.early_close_time if day in self.early_closes else self.close_time
+        return (datetime.combine(day, self.open_time, self.timezone),
+                datetime.combine(day, close, self.timezone))
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        """
+        Whether a session is in progress.
+
+        Args:
+            now: Time to check, defaults to the current time
+
+        Returns:
+            True between the open and close of a trading day
+        """
+        now = self._local(now)
+        session = self.session(now.date())
+        return session is not None and session[0] <= now < session[1]
+
+    def last_close(self, now: Optional[datetime] = None) -> datetime:
+        """
+        Get the most recent session close at or before a time.
+
+        Args:
+            now: Reference time, defaults to the current time
+
+        Returns:
+            Timezone-aware close time
+        """
+        now = self._local(now)
+        day = now.date()
+        for _ in range(30):
+            session = self.session(day)
+            if session is not None and session[1] <= now:
+                return session[1]
+            day -= timedelta(days=1)
+        raise ValueError("No trading session found in the last 30 days")
+
+    def next_open(self, now: Optional[datetime] = None) -> datetime:
+        """
+        Get the next session open after a time.
+
+        Args:
+            now: Reference time, defaults to the current time
+
+        Returns:
+            Timezone-aware open time
+        """
+        now = self._local(now)
+        day = now.date()
+        for _ in range(30):
+            session = self.session(day)
+            if session is not None and session[0] > now:
+                return session[0]
+            day += timedelta(days=1)
+        raise ValueError("No trading session found in the next 30 days")
+
+    def follows_calendar(self, symbol: str) -> bool:
+        """Whether a symbol trades in this exchange's sessions, as opposed to crypto, futures, currencies or foreign listings."""
+        return not any(pattern.search(symbol) for pattern in self.other_markets)
+
+    def staleness_budget(self, symbol: str) -> float:
+        """Seconds a symbol's price may age during a session before it is refreshed."""
+        return self.symbol_staleness.get(symbol, self.default_staleness)
+
+    def quote_ttl(self, default: float, now: Optional[datetime] = None, symbol: Optional[str] = None) -> float:
+        """
+        How long a quote fetched now stays valid.
+
+        Args:
+            default: TTL used during sessions
+            now: Reference time, defaults to the current time
+            symbol: Symbol the quote is for; symbols of other markets always get the default
+
+        Returns:
+            The default TTL while the market is open or the close is still settling,
+            otherwise the seconds until the next open
+        """
+        if symbol is not None and not self.follows_calendar(symbol):
+            return default
+        now = self._local(now)
+        if self.is_open(now) or now < self.last_close(now) + timedelta(minutes=SETTLE_MINUTES):
+            return default
+        return max(default, (self.next_open(now) - now).total_seconds())
+
+    def due_symbols(self, last_updated: Dict[str, Optional[str]], now: Optional[datetime] = None,
+                    limit: Optional[int] = None) -> List[str]:
+        """
+        Refresh policy: pick the symbols whose prices need fetching, stalest first.
+
+        During a session a symbol is due once its price is older than its staleness budget.
+        Outside sessions it is due only if its price predates the settled last close, so
+        weekends, holidays and nights cause no fetches once the close has been recorded.
+        Symbols of other markets are due on their staleness budget at any time.
+
+        Args:
+            last_updated: Symbol -> ISO timestamp of its current price (None if never priced);
+                          naive timestamps are read as local time
+            now: Reference time, defaults to the current time
+            limit: Maximum number of symbols to return
+
+        Returns:
+            Due symbols ordered from the stalest to the freshest
+        """
+        now = self._local(now)
+        market_open = self.is_open(now)
+        settled_close = self.last_close(now) + timedelta(minutes=SETTLE_MINUTES)
+
+        ages = {}
+        for symbol, timestamp in last_updated.items():
+            updated = _parse_time(timestamp)
+            if updated is None:
+                ages[symbol] = float("inf")
+                continue
+            age = (now - updated).total_seconds()
+            if market_open or not self.follows_calendar(symbol):
+                due = age >= self.staleness_budget(symbol)
+            else:
+                # The close is only final once it has settled
+                due = updated < settled_close <= now or (now < settled_close and age >= self.staleness_budget(symbol))
+            if due:
+                ages[symbol] = age
+
+        due = sorted(ages, key=ages.get, reverse=True)
+        return due[:limit] if limit is not None else due
+
+    def _local(self, now: Optional[datetime]) -> datetime:
+        now = now or datetime.now(self.timezone)
+        if now.tzinfo is None:
+            now = now.astimezone()
+        return now.astimezone(self.timezone)
+
+def _parse_time(timestamp: Optional[str]) -> Optional[datetime]:
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.astimezone()
+
+def _load_calendar() -> Optional[MarketCalendar]:
+    path = Path(os.getenv("MARKET_CALENDAR", str(CALENDAR_PATH)))
+    try:
+        return MarketCalendar(path)
+    except (OSError, ValueError) as e:
+        print(f"Error loading market calendar {path}: {e}")
+        return None
+
+# Shared calendar; None if the calendar file is missing, in which case every refresh fetches
+market_calendar = _load_calendar()
@@ -0,0 +1,320 @@
+"""
+Market data providers for the trading agent platform.
+Price lookups go through a provider so the yfinance backend can be swapped for an
+offline replay provider when running tests, benchmarks or load tests without network.
+
+The active provider is chosen with the MARKET_DATA_PROVIDER environment variable
+('yfinance' or 'replay'), or set in code with set_provider().
+"""
+
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError, YFRateLimitError, YFTzMissingError
+
+from app.utils.quote_cache import quote_cache
+
+class RateLimitError(Exception):
+    """Raised by a provider when the backend throttles requests; the request can be retried later."""
+
+class MarketDataProvider:
+    """
+    Interface for market data backends.
+    Implementations return None for symbols the backend reports as unknown, and raise
+    RateLimitError when the backend throttles requests. Any other failure (network,
+    timeouts, bad responses) is not evidence of an unknown symbol: get_quote raises it,
+    and get_quotes leaves the symbol out of its result.
+    """
+
+    name = "base"
+
+    def get_quote(self, symbol: str) -> Optional[float]:
+        """
+        Get the current price of a single symbol.
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL')
+
+        Returns:
+            Current price as float or None if symbol not found
+        """
+        prices = self.get_quotes([symbol])
+        if symbol not in prices:
+            raise LookupError(f"No quote returned for {symbol}")
+        return prices[symbol]
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Get the current prices of several symbols in one request.
+
+        Args:
+            symbols: List of stock symbols
+
+        Returns:
+            Dictionary mapping each symbol to its price as float, or None if the symbol
+            was not found; symbols whose request failed are absent
+        """
+        raise NotImplementedError
+
+    def get_history(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        """
+        Get daily bars for [start, end).
+
+        Args:
+            symbol: Stock symbol
+            start: First date to fetch
+            end: Day after the last date to fetch
+
+        Returns:
+            DataFrame with Open/High/Low/Close/Volume columns indexed by date
+        """
+        raise NotImplementedError
+
+class YFinanceProvider(MarketDataProvider):
+    """Market data from Yahoo Finance through yfinance."""
+
+    name = "yfinance"
+
+    # Concurrent quote requests per get_quotes call; Yahoo serves one chart request per symbol
+    QUOTE_WORKERS = int(os.getenv("YFINANCE_QUOTE_WORKERS", "8"))
+
+    def __init__(self):
+        # Each symbol is fetched with its own Ticker, so calls can overlap freely; yf.download
+        # would share its results and errors between concurrent calls through module globals
+        self._pool = ThreadPoolExecutor(max_workers=self.QUOTE_WORKERS, thread_name_prefix="yfinance-quote")
+
+    def get_quote(self, symbol: str) -> Optional[float]:
+        try:
+            return self._last_close(symbol)
+        except YFRateLimitError as e:
+            raise RateLimitError(str(e)) from e
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        futures = {symbol: self._pool.submit(self._last_close, symbol) for symbol in symbols}
+        prices = {}
+        for symbol, future in futures.items():
+            try:
+                prices[symbol] = future.result()
+            except YFRateLimitError as e:
+                # One throttled symbol fails the batch so the whole batch is retried later
+                raise RateLimitError(str(e)) from e
+            except Exception as e:
+                # A failed request says nothing about the symbol, so it is left out
+                print(f"Error fetching price for {symbol}: {e}")
+        return prices
+
+    def _last_close(self, symbol: str) -> Optional[float]:
+        """Latest close of a symbol; unknown symbols give None, any other failure raises."""
+        # Using history with period='1d' to get the most recent day's data. With raise_errors
+        # yfinance raises request failures instead of returning an empty frame for them
+        try:
+            data = yf.Ticker(symbol).history(period='1d', auto_adjust=True, raise_errors=True)
+        except (YFPricesMissingError, YFTzMissingError):
+            # Yahoo has no prices or no exchange timezone for the symbol: unknown or delisted
+            return None
+        # Symbols without any bar in the period come back as an empty frame or without closes
+        if data is None or data.empty:
+            return None
+        closes = data['Close'].dropna()
+        if closes.empty:
+            return None
+        return round(float(closes.iloc[-1]), 2)
+
+    def get_history(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        return yf.Ticker(symbol).history(start=start.isoformat(), end=end.isoformat(), auto_adjust=True)
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Deterministic offline provider.
+
+    Bars are replayed from recorded CSV files (<data_dir>/<SYMBOL>.csv with Date, Open,
+    High, Low, Close and Volume columns). Symbols without a recording get a seeded
+    random walk when synthetic is enabled, so any portfolio can be replayed.
+
+    Args:
+        data_dir: Directory with recorded CSV files, optional
+        latency: Seconds to sleep per request, to simulate network round trips
+        synthetic: Generate bars for symbols without a recording
+        seed: Seed mixed into the synthetic random walks
+        as_of: Date treated as "today" for quotes and history, defaults to the real date
+        invalid_symbols: Symbols to treat as unknown, e.g. to exercise fallback paths
+        rate_limit_rate: Fraction of requests that fail with RateLimitError, to exercise retries
+    """
+
+    name = "replay"
+
+    # First day of generated synthetic history
+    SYNTHETIC_START = date(2000, 1, 3)
+
+    def __init__(self, data_dir: Optional[Path] = None, latency: float = 0.0, synthetic: bool = True,
+                 seed: int = 0, as_of: Optional[date] = None, invalid_symbols: Iterable[str] = (),
+                 rate_limit_rate: float = 0.0):
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.latency = latency
+        self.synthetic = synthetic
+        self.seed = seed
+        self.as_of = as_of
+        self.invalid_symbols = set(invalid_symbols)
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def get_quote(self, symbol: str) -> Optional[float]:
+        self._request()
+        return self._last_close(symbol)
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        self._request()
+        return {symbol: self._last_close(symbol) for symbol in symbols}
+
+    def get_history(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        self._request()
+        frame = self._frame(symbol)
+        if frame is None:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+        end = min(end, self._today() + timedelta(days=1))
+        return frame.loc[pd.Timestamp(start):pd.Timestamp(end) - pd.Timedelta(days=1)]
+
+    def _request(self) -> None:
+        # Every provider call counts as one simulated round trip
+        with self._lock:
+            self.requests += 1
+            throttled = self.rate_limit_rate > 0 and self._random.random() < self.rate_limit_rate
+            if throttled:
+                self.rate_limited += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise RateLimitError("Too many requests (simulated)")
+
+    def _today(self) -> date:
+        return self.as_of or date.today()
+
+    def _last_close(self, symbol: str) -> Optional[float]:
+        frame = self._frame(symbol)
+        if frame is None:
+            return None
+        closes = frame["Close"].loc[:pd.Timestamp(self._today())]
+        if closes.empty:
+            return None
+        return round(float(closes.iloc[-1]), 2)
+
+    def _frame(self, symbol: str) -> Optional[pd.DataFrame]:
+        if symbol in self.invalid_symbols:
+            return None
+        with self._lock:
+            if symbol not in self._frames:
+                self._frames[symbol] = self._load(symbol)
+            return self._frames[symbol]
+
+    def _load(self, symbol: str) -> Optional[pd.DataFrame]:
+        if self.data_dir is not None:
+            path = self.data_dir / f"{symbol}.csv"
+            if path.exists():
+                frame = pd.read_csv(path, index_col="Date")
+                frame.index = pd.to_datetime(frame.index, utc=True).tz_localize(None).normalize()
+                return frame.sort_index()
+        if self.synthetic:
+            return self._synthetic_frame(symbol)
+        return None
+
+    def _synthetic_frame(self, symbol: str) -> pd.DataFrame:
+        """Generate a reproducible geometric random walk for a symbol."""
+        days = np.arange(np.datetime64(self.SYNTHETIC_START), np.datetime64(self._today()) + 1, dtype="datetime64[D]")
+        dates = pd.DatetimeIndex(days[np.is_busday(days)])
+        rng = np.random.default_rng(zlib.crc32(symbol.encode("utf-8")) ^ self.seed)
+        start_price = rng.uniform(20, 500)
+        returns = rng.normal(0.0003, 0.02, len(dates))
+        close = start_price * np.exp(np.cumsum(returns))
+        spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+        return pd.DataFrame({
+            "Open": np.round(close * (1 + rng.normal(0, 0.005, len(dates))), 4),
+            "High": np.round(close + spread, 4),
+            "Low": np.round(close - spread, 4),
+            "Close": np.round(close, 4),
+            "Volume": rng.integers(100_000, 10_000_000, len(dates)).astype(float)
+        }, index=dates)
+
+def record_history(symbols: Iterable[str], data_dir: Path, start: date, end: Optional[date] = None,
+                   source: Optional[MarketDataProvider] = None) -> List[str]:
+    """
+    Record daily bars from a provider into CSV files that ReplayProvider can replay.
+
+    Args:
+        symbols: Symbols to record
+        data_dir: Directory to write <SYMBOL>.csv files to
+        start: First date to record
+        end: Day after the last date to record, defaults to tomorrow
+        source: Provider to record from, defaults to yfinance
+
+    Returns:
+        List of symbols that were recorded
+    """
+    source = source or YFinanceProvider()
+    end = end or date.today() + timedelta(days=1)
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    recorded = []
+    for symbol in symbols:
+        frame = source.get_history(symbol, start, end)
+        if frame is None or frame.empty:
+            print(f"No history to record for {symbol}")
+            continue
+        frame = frame[["Open", "High", "Low", "Close", "Volume"]]
+        frame.index.name = "Date"
+        frame.to_csv(data_dir / f"{symbol}.csv")
+        recorded.append(symbol)
+    return recorded
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def _provider_from_env() -> MarketDataProvider:
+    kind = os.environ.get("MARKET_DATA_PROVIDER", "yfinance").lower()
+    if kind == "replay":
+        return ReplayProvider(
+            data_dir=os.environ.get("MARKET_DATA_REPLAY_DIR") or None,
+            latency=float(os.environ.get("MARKET_DATA_LATENCY", "0")),
+            rate_limit_rate=float(os.environ.get("MARKET_DATA_RATE_LIMIT", "0"))
+        )
+    return YFinanceProvider()
+
+def get_provider() -> MarketDataProvider:
+    """
+    Get the active market data provider, creating it from the environment on first use.
+
+    Returns:
+        The active MarketDataProvider
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = _provider_from_env()
+        return _provider
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """
+    Replace the active market data provider.
+    Cached quotes from the previous provider are discarded.
+
+    Args:
+        provider: Provider to use for all subsequent lookups
+    """
+    global _provider
+    with _provider_lock:
+        _provider = provider
+    quote_cache.clear()
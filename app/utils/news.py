@@ -3,10 +3,25 @@ News utility for generating and retrieving news related to stocks.
 Uses news_agent.py to fetch real news when available, with static fallback data.
 """
 
+import os
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from agents.news_agent import run_workflow
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from agents.news_agent import run_workflow, run_batch_workflow
+from app.utils.news_cache import news_cache
+
+# News items kept per symbol in the cache (the agent verdict plus reference links)
+NEWS_CACHE_ITEMS = 5
+
+# News agent workflows allowed to run at once in this process, to stay within LLM rate limits
+NEWS_CONCURRENCY = int(os.getenv("NEWS_CONCURRENCY", "3"))
+_agent_slots = threading.BoundedSemaphore(NEWS_CONCURRENCY)
+
+# Shared pool running news requests for the portfolio page, created on first use
+_news_pool = None
+_news_pool_lock = threading.Lock()
 
 # Sample news headlines and snippets for different stock sectors
 TECH_NEWS = [
@@ -58,7 +73,8 @@ STOCK_CATEGORIES = {
 def get_news_for_stock(symbol: str, count: int = 3) -> List[Dict[str, Any]]:
     """
     Get news articles for a specific stock symbol using news_agent.py.
-    Falls back to static sample data if the agent fails.
+    Digests are served from the shared news cache, so the agent runs at most once per
+    symbol per NEWS_CACHE_TTL for all users. Falls back to static sample data if the agent fails.
     
     Args:
         symbol: Stock symbol (e.g., 'AAPL')
@@ -67,41 +83,140 @@ def get_news_for_stock(symbol: str, count: int = 3) -> List[Dict[str, Any]]:
     Returns:
         List of news items with headlines, snippets, and dates
     """
-    try:
-        # Attempt to get real news using news_agent
-        agent_result = run_workflow(symbol)
+    news_items = news_cache.get(symbol, fetch_agent_news)
+    if news_items:
+        return news_items[:count]
+    return get_static_news(symbol, count)
+
+def iter_news_for_stocks(symbols: Iterable[str], count: int = 3) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Get news for several symbols, yielding each symbol's items as soon as they are available.
+    Cached symbols are yielded first; the others run on a bounded pool in parallel and are
+    yielded in the order they finish.
+    
+    Args:
+        symbols: Stock symbols (duplicates are fetched once)
+        count: Number of news items per symbol
         
-        if agent_result and "final_verdict" in agent_result and agent_result["final_verdict"]:
-            # Process agent result
-            now = datetime.now()
-            formatted_date = now.strftime("%b %d, %Y at %I:%M %p")
-            
-            # Create a news item from the agent result
-            result = [{
-                "headline": f"Latest {symbol} Analysis",
-                "snippet": agent_result["final_verdict"],
-                "date": formatted_date,
-                "source": "Trading Agent News Analysis",
-                "symbol": symbol
-            }]
-            
-            # If URLs are available in the agent result, add them
-            if "urls" in agent_result and agent_result["urls"]:
-                for i, url in enumerate(agent_result["urls"][:min(count-1, len(agent_result["urls"]))]):
-                    result.append({
-                        "headline": f"Additional Source {i+1}",
-                        "snippet": f"Reference link: {url}",
-                        "date": formatted_date,
-                        "source": "Reference",
-                        "symbol": symbol
-                    })
-            
-            return result
+    Yields:
+        Tuples of (symbol, news items)
+    """
+    pending = []
+    for symbol in dict.fromkeys(symbol for symbol in symbols if symbol):
+        # Digests already in the cache (even stale ones) are served without waiting
+        if news_cache.age(symbol) is not None:
+            yield symbol, get_news_for_stock(symbol, count)
+        else:
+            pending.append(symbol)
+    if not pending:
+        return
+    
+    pool = _get_news_pool()
+    futures = {pool.submit(get_news_for_stock, symbol, count): symbol for symbol in pending}
+    for future in as_completed(futures):
+        symbol = futures[future]
+        try:
+            yield symbol, future.result()
+        except Exception as e:
+            print(f"Error getting news for {symbol}: {e}")
+            yield symbol, get_static_news(symbol, count)
+
+def fetch_agent_news(symbol: str, count: int = NEWS_CACHE_ITEMS) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run the news agent workflow for a symbol.
+    
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL')
+        count: Maximum number of news items to build from the result
+        
+    Returns:
+        List of news items, or None if the agent produced no verdict
+    """
+    try:
+        # Attempt to get real news using news_agent, within the process-wide concurrency cap
+        with _agent_slots:
+            agent_result = run_workflow(symbol)
+        return _news_items(symbol, agent_result, count)
     except Exception as e:
         print(f"Error getting news from agent: {e}")
-        # Fall back to static news data
+    return None
+
+def fetch_agent_news_batch(symbols: List[str], count: int = NEWS_CACHE_ITEMS) -> Tuple[Dict[str, Optional[List[Dict[str, Any]]]], dict]:
+    """
+    Run the news agent for several symbols in one batch workflow, so related symbols
+    share search results. At most NEWS_CONCURRENCY symbols are researched at once.
     
-    # Fallback: Use static news data
+    Args:
+        symbols: Stock symbols
+        count: Maximum number of news items to build per symbol
+        
+    Returns:
+        Tuple of (symbol -> news items or None, batch accounting with 'tokens', 'seconds' and 'search')
+    """
+    try:
+        batch = run_batch_workflow(symbols, max_concurrency=NEWS_CONCURRENCY)
+    except Exception as e:
+        print(f"Error getting batch news from agent: {e}")
+        return {symbol: None for symbol in symbols}, {}
+    
+    items = {}
+    for symbol in symbols:
+        result = batch['results'].get(symbol)
+        try:
+            items[symbol] = _news_items(symbol, result, count) if result and not result.get('error') else None
+        except Exception as e:
+            print(f"Error building news for {symbol}: {e}")
+            items[symbol] = None
+    return items, {key: value for key, value in batch.items() if key != 'results'}
+
+def _news_items(symbol: str, agent_result: Optional[dict], count: int) -> Optional[List[Dict[str, Any]]]:
+    """Build news items from a news agent result, or None if it has no verdict."""
+    if agent_result and "final_verdict" in agent_result and agent_result["final_verdict"]:
+        # Process agent result
+        now = datetime.now()
+        formatted_date = now.strftime("%b %d, %Y at %I:%M %p")
+        
+        # Create a news item from the agent result
+        result = [{
+            "headline": f"Latest {symbol} Analysis",
+            "snippet": agent_result["final_verdict"],
+            "date": formatted_date,
+            "source": "Trading Agent News Analysis",
+            "symbol": symbol
+        }]
+        
+        # If URLs are available in the agent result, add them
+        if "urls" in agent_result and agent_result["urls"]:
+            for i, url in enumerate(agent_result["urls"][:min(count-1, len(agent_result["urls"]))]):
+                result.append({
+                    "headline": f"Additional Source {i+1}",
+                    "snippet": f"Reference link: {url}",
+                    "date": formatted_date,
+                    "source": "Reference",
+                    "symbol": symbol
+                })
+        
+        return result
+    return None
+
+def _get_news_pool() -> ThreadPoolExecutor:
+    global _news_pool
+    with _news_pool_lock:
+        if _news_pool is None:
+            _news_pool = ThreadPoolExecutor(max_workers=NEWS_CONCURRENCY, thread_name_prefix="news")
+        return _news_pool
+
+def get_static_news(symbol: str, count: int = 3) -> List[Dict[str, Any]]:
+    """
+    Build sample news items from the static headlines of the symbol's sector.
+    
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL')
+        count: Number of news items to return
+        
+    Returns:
+        List of news items with headlines, snippets, and dates
+    """
     news_category = STOCK_CATEGORIES.get(symbol, STOCK_CATEGORIES["DEFAULT"])
     news_items = random.sample(news_category, min(count, len(news_category)))
     
@@ -0,0 +1,259 @@
+"""
+News digest cache shared by every user and persisted to data/news_cache.json.
+Running the news workflow takes several LLM calls and web fetches, so each symbol's digest
+is produced once and served to every user holding it until its TTL expires. An expired
+digest is still returned immediately while a background refresh replaces it
+(stale-while-revalidate); only a symbol that was never fetched makes the caller wait.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.utils.storage import read_json, transaction, version
+
+# File the digests are persisted to, shared by the UI and background workers
+CACHE_PATH = Path(__file__).resolve().parents[2] / "data" / "news_cache.json"
+
+class NewsCache:
+    """
+    Symbol -> news items cache with TTL, stale-while-revalidate and single-flight loads.
+
+    Args:
+        path: JSON file the cache is persisted to, defaults to data/news_cache.json
+        ttl: Seconds a digest is served without being refreshed
+        retry_ttl: Seconds before a symbol whose fetch failed is tried again
+        workers: Threads running background refreshes
+        clock: Wall-clock time function (timestamps are persisted), injectable for tests
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl: float = 3600.0, retry_ttl: float = 300.0,
+                 workers: int = 2, clock: Callable[[], float] = time.time):
+        self.path = Path(path) if path is not None else CACHE_PATH
+        self.ttl = ttl
+        self.retry_ttl = retry_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="news-refresh")
+        # symbol -> {"items": list, or None if no fetch succeeded yet, "fetched_at": epoch seconds of the
+        # items, "retry_at": epoch seconds the next refresh is due, set when the last refresh failed}
+        self._entries = None
+        self._version = None
+        # symbol -> Event set when its in-flight load finishes
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self, symbol: str, loader: Callable[[str], Optional[List[dict]]]) -> Optional[List[dict]]:
+        """
+        Get the news digest of a symbol.
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL')
+            loader: Function producing the news items of a symbol, or None if unavailable
+
+        Returns:
+            Copy of the cached items (possibly stale, a refresh is then running in the
+            background), freshly loaded items on a miss, or None if news is unavailable
+        """
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                if not self._expired(entry):
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    self._refresh_in_background(symbol, loader)
+                return _copy_items(entry)
+
+            self.misses += 1
+            event = self._inflight.get(symbol)
+            owner = event is None
+            if owner:
+                event = self._inflight[symbol] = threading.Event()
+
+        # Concurrent misses for the same symbol share one load
+        if owner:
+            self._load(symbol, loader, event)
+        else:
+            event.wait()
+        with self._lock:
+            return _copy_items(self._entries.get(symbol))
+
+    def refresh(self, symbol: str, loader: Callable[[str], Optional[List[dict]]]) -> Optional[List[dict]]:
+        """
+        Load a symbol's digest now, unless another load of it is already running.
+
+        Args:
+            symbol: Stock symbol
+            loader: Function producing the news items of a symbol
+
+        Returns:
+            Copy of the cached items after the load
+        """
+        with self._lock:
+            self._sync()
+            event = self._inflight.get(symbol)
+            owner = event is None
+            if owner:
+                event = self._inflight[symbol] = threading.Event()
+        if owner:
+            self._load(symbol, loader, event)
+        else:
+            event.wait()
+        with self._lock:
+            return _copy_items(self._entries.get(symbol))
+
+    def age(self, symbol: str) -> Optional[float]:
+        """
+        Seconds since a symbol's digest was fetched.
+
+        Args:
+            symbol: Stock symbol
+
+        Returns:
+            Age in seconds, or None if the symbol was never fetched
+        """
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(symbol)
+            return self._clock() - entry["fetched_at"] if entry is not None else None
+
+    def is_fresh(self, symbol: str) -> bool:
+        """Whether a symbol has a digest (or a failed fetch) that has not expired."""
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(symbol)
+            return entry is not None and not self._expired(entry)
+
+    def retrying(self, symbol: str) -> bool:
+        """Whether the last refresh of a symbol failed and its digest is kept until the retry time."""
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(symbol)
+            return entry is not None and "retry_at" in entry
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for running loads and background refreshes to finish.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if nothing is in flight anymore
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                events = list(self._inflight.values())
+            if not events:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            events[0].wait(remaining)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with entries, hits, stale_hits, misses, refreshes and in-flight loads
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries or {}),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'inflight': len(self._inflight)
+            }
+
+    def _expired(self, entry: dict) -> bool:
+        if "retry_at" in entry:
+            return self._clock() >= entry["retry_at"]
+        ttl = self.ttl if entry.get("items") is not None else self.retry_ttl
+        return self._clock() - entry["fetched_at"] >= ttl
+
+    def _refresh_in_background(self, symbol: str, loader) -> None:
+        """Start a background load of a stale symbol unless one is running. Caller holds the lock."""
+        if symbol in self._inflight:
+            return
+        event = self._inflight[symbol] = threading.Event()
+        self.refreshes += 1
+        self._pool.submit(self._load, symbol, loader, event)
+
+    def _load(self, symbol: str, loader, event: threading.Event) -> None:
+        """
+        Run the loader and persist its result, then release waiters. A failed load keeps the
+        previous digest, if any, and only schedules the next attempt after retry_ttl.
+        """
+        try:
+            try:
+                items = loader(symbol)
+            except Exception as e:
+                print(f"Error loading news for {symbol}: {e}")
+                items = None
+            now = self._clock()
+            with self._lock:
+                entry = previous = self._entries.get(symbol)
+
+            # Merge into the shared file; other processes may have stored other symbols meanwhile
+            try:
+                for txn in transaction(self.path):
+                    data = txn.data or {}
+                    previous = data.get(symbol, previous)
+                    entry = _loaded_entry(items, previous, now, self.retry_ttl)
+                    data[symbol] = entry
+                    txn.commit(data)
+            except Exception as e:
+                print(f"Error saving news cache {self.path}: {e}")
+                entry = _loaded_entry(items, previous, now, self.retry_ttl)
+            with self._lock:
+                self._entries[symbol] = entry
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+            event.set()
+
+    def _sync(self) -> None:
+        """Reload the persisted digests when the file changed, e.g. written by another process. Caller holds the lock."""
+        current = version(self.path)
+        if self._entries is not None and current == self._version:
+            return
+        try:
+            persisted = read_json(self.path) or {}
+        except (OSError, ValueError) as e:
+            print(f"Error reading news cache {self.path}: {e}")
+            persisted = {}
+        # Keep entries loaded here that are not persisted yet
+        self._entries = {**(self._entries or {}), **persisted}
+        self._version = current
+
+def _loaded_entry(items: Optional[List[dict]], previous: Optional[dict], now: float, retry_ttl: float) -> dict:
+    """Cache entry after a load: the new items, or on failure the previous items with a retry time."""
+    if items:
+        return {"items": items, "fetched_at": now}
+    if previous is not None and previous.get("items") is not None:
+        return {"items": previous["items"], "fetched_at": previous["fetched_at"], "retry_at": now + retry_ttl}
+    return {"items": None, "fetched_at": now}
+
+def _copy_items(entry: Optional[dict]) -> Optional[List[dict]]:
+    if entry is None or entry.get("items") is None:
+        return None
+    return [dict(item) for item in entry["items"]]
+
+# Shared news cache
+news_cache = NewsCache(
+    ttl=float(os.getenv("NEWS_CACHE_TTL", "3600")),
+    retry_ttl=float(os.getenv("NEWS_CACHE_RETRY", "300")),
+    workers=int(os.getenv("NEWS_CACHE_WORKERS", "2"))
+)
@@ -0,0 +1,195 @@
+"""
+Portfolio model backed by NumPy arrays.
+Quantities, purchase prices and current prices are held as parallel arrays so every
+holding is revalued in one vectorized operation, with running totals that are adjusted
+incrementally when a single price changes. Portfolios serialize to the portfolio.json format.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.storage import read_json, write_json_with_lock
+
+class Portfolio:
+    """
+    A user's holdings as parallel arrays over the portfolio.json records.
+
+    The holding dicts are kept and updated in place, so fields the model does not use
+    (company_name, custom keys) survive a round trip unchanged.
+
+    Args:
+        holdings: Holdings as stored in portfolio.json
+    """
+
+    def __init__(self, holdings: Optional[List[dict]] = None):
+        self.holdings = holdings if holdings is not None else []
+        self.symbols = [stock.get('stock_code') for stock in self.holdings]
+        self.quantity = np.array([_number(stock.get('quantity')) for stock in self.holdings], dtype=np.float64)
+        self.purchase_price = np.array([_number(stock.get('purchase_price')) for stock in self.holdings], dtype=np.float64)
+        self.current_price = np.array([_number(stock.get('current_price'), np.nan) for stock in self.holdings], dtype=np.float64)
+
+        # symbol -> positions in the arrays (a symbol may be held in several lots)
+        self._positions = {}
+        for i, symbol in enumerate(self.symbols):
+            if symbol:
+                self._positions.setdefault(symbol, []).append(i)
+
+        self.cost_basis = float((self.quantity * self.purchase_price).sum())
+        self._resum()
+
+    @classmethod
+    def load(cls, path: Path) -> "Portfolio":
+        """
+        Read a portfolio from a portfolio.json file.
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            Portfolio, empty if the file does not exist
+        """
+        return cls(read_json(path) or [])
+
+    def save(self, path: Path) -> None:
+        """
+        Write the portfolio to a portfolio.json file with file locking.
+
+        Args:
+            path: Path to the file
+        """
+        write_json_with_lock(path, self.to_json())
+
+    def to_json(self) -> List[dict]:
+        """
+        Get the holdings in the portfolio.json format.
+
+        Returns:
+            List of holding dicts (the same objects the portfolio was built from)
+        """
+        return self.holdings
+
+    def __len__(self) -> int:
+        return len(self.holdings)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Market value per holding, 0 where no price is known."""
+        return np.where(np.isnan(self.current_price), 0.0, np.round(self.quantity * self.current_price, 2))
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Running portfolio totals.
+
+        Returns:
+            Dictionary with value, cost_basis, total_return, total_return_pct and holdings
+        """
+        total_return = self.total_value - self.cost_basis
+        return {
+            'value': round(self.total_value, 2),
+            'cost_basis': round(self.cost_basis, 2),
+            'total_return': round(total_return, 2),
+            'total_return_pct': round(total_return / self.cost_basis * 100, 2) if self.cost_basis > 0 else 0.0,
+            'holdings': len(self.holdings)
+        }
+
+    def revalue(self, prices: Dict[str, Optional[float]], timestamp: Optional[str] = None,
+                fallback: bool = False, verbose: bool = False) -> int:
+        """
+        Apply new prices to every holding in one vectorized pass and recompute the totals.
+
+        Only holdings priced from prices get last_updated, so holdings whose fetch failed stay due
+        for the refresh policy. A purchase_price fallback only values the holding: its
+        current_price is left unset, as no price is known.
+
+        Args:
+            prices: Symbol -> current price (None when it could not be fetched)
+            timestamp: ISO timestamp recorded as last_updated, defaults to now
+            fallback: For holdings without a new price, keep their existing current_price,
+                      or value them at their purchase_price if they have none
+            verbose: Print which fallback was used for each holding
+
+        Returns:
+            Number of holdings updated
+        """
+        if not self.holdings:
+            return 0
+        new_prices = np.array([_number(prices.get(symbol), np.nan) if symbol else np.nan for symbol in self.symbols])
+        has_symbol = np.array([bool(symbol) for symbol in self.symbols])
+        missing = np.isnan(new_prices) & has_symbol
+        fetched = np.isfinite(new_prices)
+        use_purchase = np.zeros(len(self.holdings), dtype=bool)
+
+        if fallback and missing.any():
+            # 1. Use existing current_price if available, 2. otherwise the purchase price
+            existing = np.isfinite(self.current_price)
+            new_prices = np.where(missing & existing, self.current_price, new_prices)
+            use_purchase = missing & ~existing & np.array([stock.get('purchase_price') is not None for stock in self.holdings])
+            new_prices = np.where(use_purchase, self.purchase_price, new_prices)
+            if verbose:
+                for i in np.flatnonzero(missing):
+                    if existing[i]:
+                        print(f"Using existing price for {self.symbols[i]}: ${self.holdings[i]['current_price']}")
+                    elif use_purchase[i]:
+                        print(f"Using purchase price for {self.symbols[i]}: ${self.holdings[i]['purchase_price']}")
+                    else:
+                        print(f"No valid price found for {self.symbols[i]}, skipping")
+
+        updated = np.flatnonzero(np.isfinite(new_prices))
+        self.current_price[updated] = new_prices[updated]
+        self._write_back(updated, timestamp, fetched, use_purchase)
+        self._resum()
+        return len(updated)
+
+    def update_price(self, symbol: str, price: float, timestamp: Optional[str] = None) -> int:
+        """
+        Apply a new price for one symbol, adjusting the running totals incrementally.
+
+        Args:
+            symbol: Stock symbol
+            price: New price
+            timestamp: ISO timestamp recorded as last_updated, defaults to now
+
+        Returns:
+            Number of holdings updated
+        """
+        positions = self._positions.get(symbol)
+        if not positions or price is None:
+            return 0
+        positions = np.array(positions)
+        before = self.values[positions].sum()
+        self.current_price[positions] = price
+        self.total_value += self.values[positions].sum() - before
+        self._write_back(positions, timestamp)
+        return len(positions)
+
+    def _resum(self) -> None:
+        self.total_value = float(self.values.sum())
+
+    def _write_back(self, positions: np.ndarray, timestamp: Optional[str],
+                    fetched: Optional[np.ndarray] = None, estimated: Optional[np.ndarray] = None) -> None:
+        """
+        Store the computed fields of the given holdings in their dicts, in the portfolio.json format.
+        Positions not marked in fetched (a fallback price) keep their last_updated, and positions
+        marked in estimated (valued at purchase price) also keep their current_price.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        for i in positions:
+            stock = self.holdings[i]
+            current_price = float(self.current_price[i])
+            quantity = stock.get('quantity', 0)
+            if estimated is None or not estimated[i]:
+                stock['current_price'] = current_price
+            if fetched is None or fetched[i]:
+                stock['last_updated'] = timestamp
+            stock['value'] = round(quantity * current_price, 2)
+
+            purchase_price = stock.get('purchase_price', 0)
+            if purchase_price > 0:
+                stock['total_return'] = round(stock['value'] - (quantity * purchase_price), 2)
+                stock['percent_return'] = round((current_price - purchase_price) / purchase_price * 100, 2)
+
+def _number(value, default: float = 0.0) -> float:
+    return default if value is None else float(value)
@@ -0,0 +1,182 @@
+"""
+Process-wide quote cache shared by the UI, the portfolio updaters and the agent tools.
+Entries expire after a TTL, the cache is bounded with LRU eviction, and concurrent
+requests for the same symbol are coalesced so only one fetch is in flight at a time.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+class QuoteCache:
+    """
+    Thread-safe in-memory cache keyed by symbol.
+
+    Args:
+        ttl: Seconds an entry stays fresh
+        maxsize: Maximum number of entries before the least recently used is evicted
+        clock: Monotonic clock function, injectable for tests
+    """
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, expires_at), ordered from least to most recently used
+        self._entries = OrderedDict()
+        # key -> Event set when the in-flight load finishes
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str, loader: Callable[[str], Any], ttl: Union[float, Callable[[str], float], None] = None) -> Any:
+        """
+        Get a single value, loading it with loader(key) on a miss.
+
+        Args:
+            key: Cache key (e.g., stock symbol)
+            loader: Function returning the value for the key, or None if unavailable
+            ttl: Seconds a loaded value stays fresh (or a function of the key returning them),
+                 defaults to the cache TTL
+
+        Returns:
+            Cached or freshly loaded value, or None
+        """
+        return self.get_many([key], lambda keys: {keys[0]: loader(keys[0])}, ttl)[key]
+
+    def get_many(self, keys: Iterable[str], loader: Callable[[List[str]], Dict[str, Any]],
+                 ttl: Union[float, Callable[[str], float], None] = None) -> Dict[str, Any]:
+        """
+        Get several values, loading all misses with a single loader call.
+
+        Keys already being loaded by another thread are not loaded again; this call
+        waits for that load to finish instead.
+
+        Args:
+            keys: Cache keys to look up
+            loader: Function taking the list of missing keys and returning a dict of values
+            ttl: Seconds loaded values stay fresh (or a function of the key returning them),
+                 defaults to the cache TTL
+
+        Returns:
+            Dictionary mapping each distinct key to its value (None if unavailable)
+        """
+        keys = list(dict.fromkeys(keys))
+        results = {}
+        owned = []
+        waiting = {}
+
+        with self._lock:
+            now = self._clock()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[key] = entry[0]
+                elif key in self._inflight:
+                    # Another thread is already fetching this key
+                    self.coalesced += 1
+                    waiting[key] = self._inflight[key]
+                else:
+                    self.misses += 1
+                    self._inflight[key] = threading.Event()
+                    owned.append(key)
+
+        if owned:
+            loaded = {}
+            try:
+                loaded = loader(owned) or {}
+            finally:
+                # Store results and release waiters even if the loader failed
+                with self._lock:
+                    now = self._clock()
+                    for key in owned:
+                        value = loaded.get(key)
+                        if value is not None:
+                            self._store(key, value, now, ttl(key) if callable(ttl) else ttl)
+                        self._inflight.pop(key).set()
+            for key in owned:
+                results[key] = loaded.get(key)
+
+        for key, event in waiting.items():
+            event.wait()
+            results[key] = self.peek(key)
+
+        return {key: results.get(key) for key in keys}
+
+    def peek(self, key: str) -> Any:
+        """
+        Return a fresh cached value without loading or touching the counters.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value directly, e.g. a price obtained through another path.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        with self._lock:
+            self._store(key, value, self._clock())
+
+    def invalidate(self, key: str) -> None:
+        """Remove a single entry from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hits, misses, coalesced waits, evictions, size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _store(self, key: str, value: Any, now: float, ttl: Optional[float] = None) -> None:
+        # Caller must hold the lock
+        self._entries[key] = (value, now + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+# Shared cache for current quotes, configurable through the environment
+quote_cache = QuoteCache(
+    ttl=float(os.environ.get("QUOTE_CACHE_TTL", "60")),
+    maxsize=int(os.environ.get("QUOTE_CACHE_MAXSIZE", "4096"))
+)
+
@@ -0,0 +1,362 @@
+"""
+SQLite storage backend for the storage module.
+Every JSON document written through app.utils.storage is kept in one database in WAL mode
+instead of a file. Portfolios and stock news of the users are split into indexed tables
+(holdings, news) and current quotes are kept in a quotes table, so fleet-wide lookups and
+price refreshes run as single SQL statements instead of opening one file per user.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    username TEXT,
+    kind TEXT NOT NULL,
+    doc TEXT,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_parent ON documents (name, parent);
+
+-- Numeric columns are declared without a type so ints and floats keep their JSON type
+CREATE TABLE IF NOT EXISTS holdings (
+    username TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    stock_code TEXT,
+    company_name TEXT,
+    quantity,
+    purchase_price,
+    current_price,
+    last_updated TEXT,
+    value,
+    total_return,
+    percent_return,
+    extra TEXT,
+    PRIMARY KEY (username, position)
+);
+CREATE INDEX IF NOT EXISTS holdings_symbol ON holdings (stock_code);
+
+CREATE TABLE IF NOT EXISTS news (
+    username TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    stock_code TEXT NOT NULL,
+    items TEXT NOT NULL,
+    PRIMARY KEY (username, position)
+);
+CREATE INDEX IF NOT EXISTS news_symbol ON news (stock_code);
+
+CREATE TABLE IF NOT EXISTS quotes (
+    symbol TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# Default of SQLiteStore.write's expected version: write whatever the current version is
+UNCONDITIONAL = object()
+
+# Holding fields stored in their own columns; other keys are kept in the extra JSON column
+HOLDING_FIELDS = ('stock_code', 'company_name', 'quantity', 'purchase_price', 'current_price',
+                  'last_updated', 'value', 'total_return', 'percent_return')
+
+class SQLiteStore:
+    """
+    Path-addressed JSON documents in a SQLite database.
+
+    Documents are addressed by the same paths the file backend uses; paths under the data
+    directory are stored relative to it, so the database can be moved with the data.
+
+    Args:
+        path: Database file
+        users_dir: Directory with one sub-directory per user (data/users)
+    """
+
+    def __init__(self, path: Path, users_dir: Path):
+        self.path = Path(path)
+        self.users_dir = Path(os.path.abspath(users_dir))
+        self.root = self.users_dir.parent
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def read(self, path: Path):
+        """
+        Read a document.
+
+        Args:
+            path: Document path
+
+        Returns:
+            The stored JSON data, or None if there is no document at the path
+        """
+        key = self._key(path)
+        # One read transaction so the document and its rows come from the same snapshot
+        with self._transaction(write=False) as conn:
+            row = conn.execute("SELECT kind, doc, username FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            kind, doc, username = row
+            if kind == 'portfolio':
+                return [_holding_from_row(r) for r in conn.execute(
+                    f"SELECT extra, {', '.join(HOLDING_FIELDS)} FROM holdings WHERE username = ? ORDER BY position",
+                    (username,))]
+            data = json.loads(doc)
+            if kind == 'news':
+                data['news_items'] = {symbol: json.loads(items) for symbol, items in conn.execute(
+                    "SELECT stock_code, items FROM news WHERE username = ? ORDER BY position", (username,))}
+            return data
+
+    def write(self, path: Path, data, expected_version=UNCONDITIONAL) -> Optional[int]:
+        """
+        Replace a document atomically and bump its version.
+
+        Args:
+            path: Document path
+            data: JSON-serializable data
+            expected_version: Only write if the document is still at this version (None: does not
+                              exist yet), checked in the same transaction as the write
+
+        Returns:
+            Version of the written document, or None if the document's version did not match
+        """
+        key = self._key(path)
+        path = Path(os.path.abspath(path))
+        username = path.parent.name if path.parent.parent == self.users_dir else None
+        kind = _kind(path.name, data) if username else 'json'
+
+        with self._transaction() as conn:
+            if expected_version is not UNCONDITIONAL:
+                row = conn.execute("SELECT version FROM documents WHERE key = ?", (key,)).fetchone()
+                if (row[0] if row else None) != expected_version:
+                    return None
+            if path.name == 'portfolio.json' and username:
+                conn.execute("DELETE FROM holdings WHERE username = ?", (username,))
+            if path.name == 'stock_news.json' and username:
+                conn.execute("DELETE FROM news WHERE username = ?", (username,))
+
+            doc = None
+            if kind == 'portfolio':
+                conn.executemany(
+                    f"INSERT INTO holdings (username, position, extra, {', '.join(HOLDING_FIELDS)}) "
+                    f"VALUES (?, ?, ?{', ?' * len(HOLDING_FIELDS)})",
+                    [(username, i) + _holding_to_row(stock) for i, stock in enumerate(data)])
+            elif kind == 'news':
+                conn.executemany(
+                    "INSERT INTO news (username, position, stock_code, items) VALUES (?, ?, ?, ?)",
+                    [(username, i, symbol, json.dumps(items, ensure_ascii=False))
+                     for i, (symbol, items) in enumerate(data['news_items'].items())])
+                doc = json.dumps({k: v for k, v in data.items() if k != 'news_items'}, ensure_ascii=False)
+            else:
+                doc = json.dumps(data, ensure_ascii=False)
+
+            conn.execute(
+                "INSERT INTO documents (key, parent, name, username, kind, doc, version, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (key) DO UPDATE SET kind = excluded.kind, doc = excluded.doc, "
+                "version = documents.version + 1, updated_at = excluded.updated_at",
+                (key, self._key(path.parent), path.name, username, kind, doc, datetime.now().isoformat()))
+            return conn.execute("SELECT version FROM documents WHERE key = ?", (key,)).fetchone()[0]
+
+    def version(self, path: Path) -> Optional[int]:
+        """
+        Get the version of a document, incremented on every write.
+
+        Args:
+            path: Document path
+
+        Returns:
+            Version number, or None if there is no document at the path
+        """
+        row = self._conn().execute("SELECT version FROM documents WHERE key = ?", (self._key(path),)).fetchone()
+        return row[0] if row else None
+
+    def user_versions(self, name: str, base: Optional[Path] = None) -> Dict[str, int]:
+        """
+        Get the version of one document for every user that has it, in a single query.
+
+        Args:
+            name: Document name (e.g., 'portfolio.json')
+            base: Directory with one sub-directory per user, defaults to the users directory
+
+        Returns:
+            Dictionary mapping username -> version
+        """
+        prefix = self._key(base if base is not None else self.users_dir) + "/"
+        rows = self._conn().execute(
+            "SELECT parent, version FROM documents WHERE name = ? AND parent > ? AND parent < ?",
+            (name, prefix, prefix[:-1] + "0"))
+        return {parent[len(prefix):]: version for parent, version in rows if "/" not in parent[len(prefix):]}
+
+    def holders(self, symbol: str) -> Set[str]:
+        """
+        Get the users holding a symbol.
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL')
+
+        Returns:
+            Set of usernames
+        """
+        rows = self._conn().execute("SELECT DISTINCT username FROM holdings WHERE stock_code = ?", (symbol,))
+        return {username for (username,) in rows}
+
+    def symbol_last_updated(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Get the oldest price timestamp of every symbol in every portfolio, in a single query.
+
+        Returns:
+            Dictionary mapping username -> {symbol: oldest last_updated, None if a lot was never priced}
+        """
+        result = {}
+        rows = self._conn().execute(
+            "SELECT username, stock_code, CASE WHEN COUNT(last_updated) < COUNT(*) THEN NULL ELSE MIN(last_updated) END "
+            "FROM holdings WHERE stock_code IS NOT NULL AND stock_code != '' GROUP BY username, stock_code")
+        for username, symbol, last_updated in rows:
+            result.setdefault(username, {})[symbol] = last_updated
+        return result
+
+    def count_holdings(self) -> int:
+        """Total number of holdings across all portfolios."""
+        return self._conn().execute("SELECT COUNT(*) FROM holdings").fetchone()[0]
+
+    def apply_prices(self, prices: Dict[str, Optional[float]], timestamp: str) -> int:
+        """
+        Record quotes and revalue every holding of the quoted symbols across all users.
+
+        Args:
+            prices: Symbol -> current price (None entries are ignored)
+            timestamp: ISO timestamp recorded as the holdings' last_updated
+
+        Returns:
+            Number of portfolios updated
+        """
+        quotes = [(symbol, float(price), timestamp) for symbol, price in prices.items() if price is not None]
+        if not quotes:
+            return 0
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO quotes (symbol, price, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (symbol) DO UPDATE SET price = excluded.price, updated_at = excluded.updated_at",
+                quotes)
+            # Same fields as Portfolio.revalue writes to portfolio.json
+            conn.execute(
+                "UPDATE holdings SET current_price = q.price, last_updated = q.updated_at, "
+                "value = round(COALESCE(holdings.quantity, 0) * q.price, 2), "
+                "total_return = CASE WHEN holdings.purchase_price > 0 THEN "
+                "round(round(COALESCE(holdings.quantity, 0) * q.price, 2) - COALESCE(holdings.quantity, 0) * holdings.purchase_price, 2) "
+                "ELSE holdings.total_return END, "
+                "percent_return = CASE WHEN holdings.purchase_price > 0 THEN "
+                "round((q.price - holdings.purchase_price) / holdings.purchase_price * 100, 2) "
+                "ELSE holdings.percent_return END "
+                "FROM quotes AS q WHERE holdings.stock_code = q.symbol AND q.updated_at = ?",
+                (timestamp,))
+            return conn.execute(
+                "UPDATE documents SET version = version + 1, updated_at = ? WHERE kind = 'portfolio' "
+                "AND username IN (SELECT username FROM holdings WHERE last_updated = ?)",
+                (timestamp, timestamp)).rowcount
+
+    def close(self) -> None:
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode with explicit transactions."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL with synchronous=NORMAL is durable across application crashes without an fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, write: bool = True):
+        conn = self._conn()
+        # Writers take the write lock up front so concurrent writers wait instead of failing to upgrade
+        conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _key(self, path: Path) -> str:
+        path = os.path.abspath(path)
+        try:
+            return Path(path).relative_to(self.root).as_posix()
+        except ValueError:
+            return Path(path).as_posix()
+
+def migrate_json_tree(store: SQLiteStore, users_dir: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Copy every user's JSON files into a database.
+    Existing documents with the same paths are replaced, so the migration can be re-run.
+
+    Args:
+        store: Target database
+        users_dir: Directory with one sub-directory per user, defaults to the store's users directory
+
+    Returns:
+        Counts of users, documents, holdings and errors
+    """
+    users_dir = Path(users_dir) if users_dir is not None else store.users_dir
+    counts = {'users': 0, 'documents': 0, 'holdings': 0, 'errors': 0}
+    if not users_dir.exists():
+        return counts
+    for directory in sorted(d for d in users_dir.iterdir() if d.is_dir()):
+        counts['users'] += 1
+        for path in sorted(directory.glob("*.json")):
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+                # Stored under the store's users directory, whatever directory it was read from
+                store.write(store.users_dir / directory.name / path.name, data)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print(f"Error migrating {path}: {e}")
+                counts['errors'] += 1
+                continue
+            counts['documents'] += 1
+            if path.name == 'portfolio.json' and isinstance(data, list):
+                counts['holdings'] += len(data)
+    return counts
+
+def _kind(name: str, data) -> str:
+    """Table layout of a user document: holdings rows, news rows, or a plain JSON document."""
+    if name == 'portfolio.json' and isinstance(data, list) and all(isinstance(stock, dict) for stock in data):
+        return 'portfolio'
+    if name == 'stock_news.json' and isinstance(data, dict) and isinstance(data.get('news_items'), dict):
+        return 'news'
+    return 'json'
+
+def _holding_to_row(stock: dict) -> tuple:
+    columns, extra = [], {}
+    for field in HOLDING_FIELDS:
+        value = stock.get(field)
+        # Only plain strings and numbers go in columns; None, bools and nested values stay in extra
+        columns.append(value if type(value) in (int, float, str) else None)
+    for key, value in stock.items():
+        if key not in HOLDING_FIELDS or type(value) not in (int, float, str):
+            extra[key] = value
+    return (json.dumps(extra, ensure_ascii=False) if extra else None,) + tuple(columns)
+
+def _holding_from_row(row: tuple) -> dict:
+    stock = json.loads(row[0]) if row[0] else {}
+    for field, value in zip(HOLDING_FIELDS, row[1:]):
+        if value is not None:
+            stock[field] = value
+    return stock
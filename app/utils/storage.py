@@ -1,12 +1,349 @@
 from pathlib import Path
+import atexit
 import json
-from filelock import FileLock
+from filelock import FileLock, Timeout
 import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 
+from app.utils.journal import MISSING, WriteJournal
+from app.utils.sqlite_store import UNCONDITIONAL, SQLiteStore
+
 # Base directory for user data
 BASE = Path(__file__).resolve().parents[2] / "data" / "users"
 
+# Storage backend: "json" (one file per document) or "sqlite" (one database, see sqlite_store)
+BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+
+# Database file used by the sqlite backend
+DB_PATH = Path(os.getenv("STORAGE_DB", str(BASE.parent / "trading.db")))
+
+# Write-behind mode of the json backend: writes go to a group-commit journal (see journal.py)
+WRITE_BEHIND = os.getenv("STORAGE_WRITE_BEHIND", "0") == "1"
+JOURNAL_PATH = Path(os.getenv("STORAGE_JOURNAL", str(BASE.parent / "journal.log")))
+JOURNAL_COMPACT_BYTES = int(os.getenv("STORAGE_JOURNAL_COMPACT_BYTES", str(8 * 1024 * 1024)))
+
+# Every process using the json backend holds a lock file here; write-behind is only used while a
+# process is alone, and the journal owner hands over (compacts and writes directly) when another joins
+PROCESSES_DIR = JOURNAL_PATH.parent / "storage_processes"
+HANDOVER_INTERVAL = float(os.getenv("STORAGE_HANDOVER_INTERVAL", "1"))
+HANDOVER_TIMEOUT = float(os.getenv("STORAGE_HANDOVER_TIMEOUT", "60"))
+
+# Retries and base backoff (seconds) of optimistic transactions on conflict
+TXN_RETRIES = int(os.getenv("STORAGE_TXN_RETRIES", "5"))
+TXN_BACKOFF = float(os.getenv("STORAGE_TXN_BACKOFF", "0.01"))
+
+# Callbacks run with (path, data, version) after write_json_with_lock writes a file
+_write_listeners = []
+
+def add_write_listener(callback):
+    """
+    Register a callback run after every write_json_with_lock call, e.g. to keep an index in sync.
+    Listeners run after the write lock is released, so writes to one document may be reported
+    out of order; the version passed is the one the write produced, taken under the lock.
+    
+    Args:
+        callback: Function taking the written path, data and version (see version)
+    """
+    _write_listeners.append(callback)
+
+class ReadCache:
+    """
+    Parsed JSON files keyed by path, validated against the file's (mtime_ns, size, inode).
+    A file that has not changed since it was parsed is served without re-reading it; entries
+    are evicted least recently used first once the cached files exceed max_bytes in total.
+    
+    Args:
+        max_bytes: Maximum total size of the cached files, 0 disables the cache
+    """
+    
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # path -> (signature, size, data), ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, path: Path, signature: tuple):
+        """
+        Get a private copy of a cached file's data.
+        
+        Args:
+            path: Path to the JSON file
+            signature: Current (mtime_ns, size, inode) of the file
+            
+        Returns:
+            Copy of the parsed data, or None if the file is not cached or changed since
+        """
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            data = entry[2]
+        return _copy_json(data)
+    
+    def put(self, path: Path, signature: tuple, data) -> None:
+        """
+        Cache the parsed data of a file. The cache keeps its own copy.
+        
+        Args:
+            path: Path to the JSON file
+            signature: (mtime_ns, size, inode) of the file the data was parsed from
+            data: Parsed JSON data
+        """
+        size = signature[1]
+        if size > self.max_bytes:
+            return
+        data = _copy_json(data)
+        key = str(path)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (signature, size, data)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+    
+    def invalidate(self, path: Path) -> None:
+        """Drop a file from the cache."""
+        with self._lock:
+            self._discard(str(path))
+    
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with entries, bytes, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+    
+    def _discard(self, key: str) -> None:
+        """Remove one entry. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+def _parse(f):
+    """Parse an open JSON file; every file read_json parses goes through here."""
+    return json.load(f)
+
+def _copy_json(data):
+    """Copy parsed JSON (dicts, lists and scalars); much cheaper than copy.deepcopy."""
+    if isinstance(data, dict):
+        return {key: _copy_json(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_copy_json(value) for value in data]
+    return data
+
+# Shared cache of parsed JSON files, bounded by STORAGE_CACHE_BYTES
+read_cache = ReadCache(int(os.getenv("STORAGE_CACHE_BYTES", str(32 * 1024 * 1024))))
+
+_store = None
+_store_lock = threading.Lock()
+
+def sqlite_store():
+    """
+    Get the database of the sqlite backend, opening it on first use.
+    
+    Returns:
+        SQLiteStore, or None when the json backend is configured
+    """
+    global _store
+    if BACKEND != "sqlite":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(DB_PATH, BASE)
+        return _store
+
+_journal = None
+_journal_cond = threading.Condition()
+_journal_file_lock = None
+# Storage calls using the journal right now, which a handover waits for
+_journal_users = 0
+_handing_over = False
+# Lock file announcing this process on the data tree, taken on first use of the json backend
+_process_lock = None
+
+def write_journal():
+    """
+    Get the write-behind journal, opening it (and replaying what a crashed process left) on first use.
+    The first call also registers this process on the data tree. Without a journal of its own, it
+    waits until a write-behind process has handed over, so files never lag behind a journal.
+    
+    Returns:
+        WriteJournal, or None when write-behind is off, other processes use the data tree or
+        this process has handed over; writes then go straight to the files
+    """
+    global _journal, _journal_file_lock, _process_lock
+    if BACKEND == "sqlite":
+        return None
+    with _journal_cond:
+        while _handing_over:
+            _journal_cond.wait()
+        if _journal is not None or _process_lock is not None:
+            return _journal
+        _process_lock = _join_data_tree()
+        
+        if WRITE_BEHIND:
+            # Released by whichever thread hands the journal over, so not thread-local
+            journal_lock = FileLock(str(JOURNAL_PATH) + ".lock", thread_local=False)
+            try:
+                journal_lock.acquire(timeout=0)
+            except Timeout:
+                journal_lock = None
+            if journal_lock is not None and _other_processes():
+                print("Other processes use the data tree, writing files directly")
+                journal_lock.release()
+            elif journal_lock is not None:
+                _journal_file_lock = journal_lock
+                _journal = WriteJournal(JOURNAL_PATH, _write_snapshot, JOURNAL_COMPACT_BYTES)
+                if _journal.recovered:
+                    print(f"Recovered {_journal.recovered} documents from journal {JOURNAL_PATH}")
+                threading.Thread(target=_watch_data_tree, name="journal-handover", daemon=True).start()
+                return _journal
+        
+        # Writing directly: wait for a process with a journal to fold it into the files and let go
+        journal_lock = FileLock(str(JOURNAL_PATH) + ".lock")
+        try:
+            journal_lock.acquire(timeout=HANDOVER_TIMEOUT)
+        except Timeout:
+            print(f"Journal {JOURNAL_PATH} was not handed over within {HANDOVER_TIMEOUT:.0f} s, writing files directly")
+            return None
+        try:
+            # A write-behind process that crashed left its journal behind: replay it into the files first
+            if JOURNAL_PATH.exists() or JOURNAL_PATH.with_name(JOURNAL_PATH.name + ".old").exists():
+                leftover = WriteJournal(JOURNAL_PATH, _write_snapshot, JOURNAL_COMPACT_BYTES)
+                if leftover.recovered:
+                    print(f"Recovered {leftover.recovered} documents from journal {JOURNAL_PATH}")
+                leftover.close()
+                JOURNAL_PATH.unlink()
+        finally:
+            journal_lock.release()
+        return None
+
+@contextmanager
+def _journal_session():
+    """The journal (or None) for one storage operation; a handover waits until the operation ends."""
+    global _journal_users
+    journal = write_journal()
+    with _journal_cond:
+        # Handed over between the lookup and now: the files are current once the handover is done
+        while _handing_over:
+            _journal_cond.wait()
+        if journal is not None and journal is not _journal:
+            journal = None
+        if journal is not None:
+            _journal_users += 1
+    try:
+        yield journal
+    finally:
+        if journal is not None:
+            with _journal_cond:
+                _journal_users -= 1
+                _journal_cond.notify_all()
+
+def _join_data_tree() -> FileLock:
+    PROCESSES_DIR.mkdir(parents=True, exist_ok=True)
+    lock = FileLock(str(PROCESSES_DIR / f"{os.getpid()}.lock"), thread_local=False)
+    lock.acquire()
+    return lock
+
+def _other_processes() -> bool:
+    """True if another live process has joined the data tree; cleans up after processes that died."""
+    own = Path(_process_lock.lock_file) if _process_lock is not None else None
+    for path in PROCESSES_DIR.glob("*.lock"):
+        if path == own:
+            continue
+        lock = FileLock(str(path))
+        try:
+            lock.acquire(timeout=0)
+        except Timeout:
+            return True
+        lock.release()
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    return False
+
+def _watch_data_tree():
+    """Hand the journal over as soon as another process joins the data tree."""
+    while True:
+        time.sleep(HANDOVER_INTERVAL)
+        if _journal is None:
+            return
+        try:
+            if _other_processes():
+                print("Another process joined the data tree, compacting the journal and writing files directly")
+                _hand_over()
+                return
+        except Exception as e:
+            print(f"Error watching the data tree: {e}")
+
+def _hand_over():
+    """Fold the journal into the files and switch this process to direct writes for good."""
+    global _journal, _journal_file_lock, _handing_over
+    with _journal_cond:
+        if _journal is None:
+            return
+        _handing_over = True
+        while _journal_users:
+            _journal_cond.wait()
+        journal, _journal = _journal, None
+    try:
+        journal.close()
+    finally:
+        with _journal_cond:
+            if _journal_file_lock is not None:
+                _journal_file_lock.release()
+                _journal_file_lock = None
+            _handing_over = False
+            _journal_cond.notify_all()
+
+def _write_snapshot(path: Path, data):
+    # The journal syncs all snapshots at once after a compaction where the OS supports it
+    atomic_write(path, data, fsync=not hasattr(os, "sync"))
+
+def _close_journal():
+    # Registered before any module that writes at exit, so it runs after them
+    _hand_over()
+    if _process_lock is not None:
+        _process_lock.release()
+        try:
+            Path(_process_lock.lock_file).unlink()
+        except OSError:
+            pass
+
+atexit.register(_close_journal)
+
 def user_dir(username: str) -> Path:
     """
     Create and return a user directory path.
@@ -18,27 +355,84 @@ def user_dir(username: str) -> Path:
         Path object to the user directory
     """
     p = BASE / username
-    p.mkdir(parents=True, exist_ok=True)
+    # The sqlite backend addresses documents by path but keeps no files
+    if BACKEND != "sqlite":
+        p.mkdir(parents=True, exist_ok=True)
     return p
 
-def atomic_write(path: Path, data):
+def exists(path: Path) -> bool:
+    """
+    Check whether a document exists.
+    
+    Args:
+        path: Path to the JSON document
+        
+    Returns:
+        True if the document exists in the configured backend
+    """
+    store = sqlite_store()
+    if store is not None:
+        return store.version(path) is not None
+    with _journal_session() as journal:
+        if journal is not None and journal.pending_seq(os.path.abspath(path)) is not None:
+            return True
+        return Path(path).exists()
+
+def user_versions(name: str, base: Path = None) -> dict:
+    """
+    Get the version of one document for every user that has it.
+    
+    Args:
+        name: Document name (e.g., 'portfolio.json')
+        base: Directory with one sub-directory per user, defaults to BASE
+        
+    Returns:
+        Dictionary mapping username -> version (see version)
+    """
+    base = Path(base) if base is not None else BASE
+    store = sqlite_store()
+    if store is not None:
+        return store.user_versions(name, base)
+    versions = {}
+    if base.exists():
+        for directory in base.iterdir():
+            value = version(directory / name)
+            if value is not None:
+                versions[directory.name] = value
+    # Users whose document so far only exists in the journal
+    with _journal_session() as journal:
+        if journal is not None:
+            base = Path(os.path.abspath(base))
+            for key, seq in journal.pending_paths().items():
+                path = Path(key)
+                if path.name == name and path.parent.parent == base:
+                    versions[path.parent.name] = _journal_version(seq)
+    return versions
+
+def atomic_write(path: Path, data, fsync: bool = True):
     """
     Atomically write data to a file using a temporary file and replace operation.
     
     Args:
         path: Path to write to
         data: JSON-serializable data to write
+        fsync: Flush the file to disk before replacing; callers that sync many files at
+               once (journal compaction) pass False
     """
     tmp = path.with_suffix('.tmp')
     with tmp.open('w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
         f.flush()
-        os.fsync(f.fileno())  # Ensure data is written to disk
+        if fsync:
+            os.fsync(f.fileno())  # Ensure data is written to disk
     tmp.replace(path)  # Atomic replacement
+    read_cache.invalidate(path)  # Later reads must see the new contents
 
 def read_json(path: Path):
     """
     Read and parse a JSON file.
+    Unchanged files are served from the shared read cache; every call returns its own
+    copy, so callers may modify the result freely.
     
     Args:
         path: Path to the JSON file
@@ -46,19 +440,206 @@ def read_json(path: Path):
     Returns:
         Parsed JSON data or None if file doesn't exist
     """
-    if not path.exists():
+    store = sqlite_store()
+    if store is not None:
+        return store.read(path)
+    
+    # Journaled writes not yet compacted into the file
+    with _journal_session() as journal:
+        if journal is not None:
+            data = journal.pending(os.path.abspath(path))
+            if data is not MISSING:
+                return _copy_json(data)
+    
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
         return None
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    # Served without parsing when the file has not changed since it was cached
+    data = read_cache.get(path, signature)
+    if data is not None:
+        return data
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        opened = os.fstat(f.fileno())
+        data = _parse(f)
+    # Only cache if the parsed file is the one that was stat'ed (not replaced in between)
+    if (opened.st_mtime_ns, opened.st_size, opened.st_ino) == signature:
+        read_cache.put(path, signature, data)
+    return data
 
 def write_json_with_lock(path: Path, data):
     """
     Write JSON data to a file with file locking to prevent concurrent writes.
+    With the sqlite backend the document is replaced in a single transaction instead, and in
+    write-behind mode it is appended to the journal; either way it is durable on return.
     
     Args:
         path: Path to write to
         data: JSON-serializable data to write
     """
-    lock = FileLock(str(path) + ".lock")
-    with lock:
-        atomic_write(path, data)
+    _write(path, data, UNCONDITIONAL)
+
+def version(path: Path):
+    """
+    Get the change token of a document: used by compare_and_swap, passed to write listeners
+    and persisted by indexes to detect documents changed since they were indexed.
+    
+    Args:
+        path: Path to the JSON document
+        
+    Returns:
+        Opaque JSON-serializable value that changes on every write (file mtime, size and inode;
+        journal sequence number; or sqlite document version), None if the document does not exist
+    """
+    store = sqlite_store()
+    if store is not None:
+        return store.version(path)
+    with _journal_session() as journal:
+        return _version(path, journal)
+
+def _version(path: Path, journal):
+    if journal is not None:
+        seq = journal.pending_seq(os.path.abspath(path))
+        if seq is not None:
+            return _journal_version(seq)
+    try:
+        return _file_version(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+def _file_version(st: os.stat_result) -> str:
+    return f"{st.st_mtime_ns}-{st.st_size}-{st.st_ino}"
+
+def _journal_version(seq: int) -> str:
+    return f"journal-{seq}"
+
+def read_versioned(path: Path):
+    """
+    Read a document together with its version.
+    
+    Args:
+        path: Path to the JSON document
+        
+    Returns:
+        Tuple of (data or None, version) describing the same state of the document
+    """
+    while True:
+        before = version(path)
+        data = read_json(path)
+        # Retry if a writer replaced the document while it was being read
+        if version(path) == before:
+            return data, before
+
+def compare_and_swap(path: Path, data, expected_version) -> bool:
+    """
+    Write a document only if it has not been written since it was read.
+    The file lock is held only for the version check and the write itself.
+    
+    Args:
+        path: Path to write to
+        data: JSON-serializable data to write
+        expected_version: Version returned by read_versioned
+        
+    Returns:
+        True if written, False if another writer got there first
+    """
+    return _write(path, data, expected_version)
+
+def _write(path: Path, data, expected_version) -> bool:
+    store = sqlite_store()
+    # Version produced by this write, taken under the lock so listeners never see a later writer's
+    written = None
+    if store is not None:
+        written = store.write(path, data, expected_version)
+    else:
+        with _journal_session() as journal, FileLock(str(path) + ".lock"):
+            if expected_version is UNCONDITIONAL or _version(path, journal) == expected_version:
+                if journal is not None:
+                    written = _journal_version(journal.write(os.path.abspath(path), _copy_json(data)))
+                else:
+                    atomic_write(path, data)
+                    written = _file_version(os.stat(path))
+    if written is None:
+        return False
+    
+    # Notify listeners; a failing listener must not fail the write
+    for callback in _write_listeners:
+        try:
+            callback(path, data, written)
+        except Exception as e:
+            print(f"Error in write listener for {path}: {e}")
+    return True
+
+class ConflictError(Exception):
+    """Raised when a transaction keeps losing to concurrent writers."""
+
+class Transaction:
+    """
+    One optimistic read-modify-write attempt on a JSON document, see transaction().
+    
+    Attributes:
+        path: Document path
+        data: Private copy of the document when the attempt started (None if it does not exist)
+        version: Version of that state
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.data, self.version = read_versioned(path)
+        self.committed = False
+        self.conflicted = False
+    
+    def commit(self, data) -> bool:
+        """
+        Write the document if nobody else wrote it since this attempt started.
+        
+        Args:
+            data: New document; pass it explicitly, as data is None when the document did not exist
+            
+        Returns:
+            True if written; False on conflict, in which case transaction() starts a new attempt
+        """
+        if self.committed or self.conflicted:
+            raise RuntimeError("Transaction already finished")
+        if compare_and_swap(self.path, data, self.version):
+            self.committed = True
+        else:
+            self.conflicted = True
+        return self.committed
+
+def transaction(path: Path, retries: int = None):
+    """
+    Read-modify-write a document with optimistic concurrency.
+    Each attempt reads the document and its version; commit() compare-and-swaps it, and on
+    a conflict the loop runs again with fresh data. No lock is held between read and commit,
+    so slow work (like fetching prices) done before or inside the loop never blocks writers.
+    
+        for txn in transaction(path):
+            portfolio = txn.data or []
+            portfolio.append(holding)
+            txn.commit(portfolio)
+    
+    An attempt that ends without commit() ends the loop without writing.
+    
+    Args:
+        path: Path to the JSON document
+        retries: Attempts after the first one, defaults to STORAGE_TXN_RETRIES
+        
+    Yields:
+        Transaction for each attempt
+        
+    Raises:
+        ConflictError: If every attempt conflicted
+    """
+    retries = TXN_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        txn = Transaction(path)
+        yield txn
+        if not txn.conflicted:
+            return
+        # Jittered backoff so conflicting writers do not retry in lockstep
+        time.sleep(random.uniform(0, TXN_BACKOFF * 2 ** attempt))
+    raise ConflictError(f"Transaction on {path} conflicted {retries + 1} times")
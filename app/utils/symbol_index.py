@@ -0,0 +1,194 @@
+"""
+Persistent index of symbols the market data provider could not find.
+Unknown or delisted tickers are recorded with an exponential backoff retry schedule,
+so price lookups skip them instead of paying a full request and error path on every refresh.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.market_data import get_provider
+from app.utils.storage import read_json, version, write_json_with_lock
+
+# Base directory for the symbol index files, one per market data provider
+INDEX_DIR = Path(__file__).resolve().parents[2] / "data" / "symbol_index"
+
+class SymbolIndex:
+    """
+    Negative cache of invalid symbols, persisted as JSON.
+
+    A symbol that fails a lookup is skipped until its retry time. Each further failure
+    doubles the wait (base_backoff, 2 x base_backoff, ...) up to max_backoff; a successful
+    lookup removes the symbol from the index.
+
+    Args:
+        path: JSON file holding the index; defaults to data/symbol_index/<provider>.json
+              so symbols unknown to one provider are not skipped for another
+        base_backoff: Seconds before the first retry of a failed symbol
+        max_backoff: Upper bound on the seconds between retries
+        clock: Wall-clock function returning epoch seconds, injectable for tests
+    """
+
+    def __init__(self, path: Optional[Path] = None, base_backoff: float = 900.0,
+                 max_backoff: float = 7 * 86400.0, clock: Callable[[], float] = time.time):
+        self.path = Path(path) if path is not None else None
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Loaded entries and the (path, storage version) they were read from
+        self._entries = {}
+        self._loaded_from = None
+
+    def is_known_bad(self, symbol: str) -> bool:
+        """
+        Check whether a symbol is recorded as invalid and not yet due for a retry.
+
+        Args:
+            symbol: Stock symbol
+
+        Returns:
+            True if lookups for the symbol should be skipped
+        """
+        with self._lock:
+            entry = self._load().get(symbol)
+            return entry is not None and entry["next_retry"] > self._clock()
+
+    def partition(self, symbols: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split symbols into those to look up and those to skip.
+
+        Args:
+            symbols: Stock symbols
+
+        Returns:
+            Tuple of (symbols to fetch, known-bad symbols to skip), each in input order
+        """
+        now = self._clock()
+        with self._lock:
+            entries = self._load()
+            fetch, skip = [], []
+            for symbol in symbols:
+                entry = entries.get(symbol)
+                (skip if entry is not None and entry["next_retry"] > now else fetch).append(symbol)
+            return fetch, skip
+
+    def record_results(self, prices: Dict[str, Optional[float]]) -> None:
+        """
+        Update the index from a batch of lookups.
+        Only symbols the provider reported as unknown count as failures; symbols whose
+        request failed are absent from prices and left as they are. A batch of several
+        symbols where every one came back unknown is treated as a provider outage and
+        not recorded.
+
+        Args:
+            prices: Symbol -> price, None for symbols the provider could not find
+        """
+        if len(prices) > 1 and all(price is None for price in prices.values()):
+            return
+        self._update(
+            invalid=[symbol for symbol, price in prices.items() if price is None],
+            valid=[symbol for symbol, price in prices.items() if price is not None]
+        )
+
+    def record_invalid(self, symbol: str, reason: str = "not found") -> None:
+        """
+        Record a failed lookup and schedule the next retry.
+
+        Args:
+            symbol: Stock symbol
+            reason: Short description stored with the entry
+        """
+        self._update(invalid=[symbol], reason=reason)
+
+    def record_valid(self, symbol: str) -> None:
+        """
+        Remove a symbol from the index after a successful lookup.
+
+        Args:
+            symbol: Stock symbol
+        """
+        self._update(valid=[symbol])
+
+    def status(self, symbol: str) -> Optional[dict]:
+        """
+        Get the index entry for a symbol.
+
+        Args:
+            symbol: Stock symbol
+
+        Returns:
+            Dictionary with failures, first_failed, last_failed, next_retry (epoch seconds)
+            and reason, or None if the symbol is not recorded
+        """
+        with self._lock:
+            entry = self._load().get(symbol)
+            return dict(entry) if entry is not None else None
+
+    def clear(self) -> None:
+        """Forget every recorded symbol."""
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+    def _update(self, invalid: List[str] = (), valid: List[str] = (), reason: str = "not found") -> None:
+        with self._lock:
+            entries = self._load()
+            changed = False
+            now = self._clock()
+            timestamp = datetime.now().isoformat()
+
+            for symbol in valid:
+                changed |= entries.pop(symbol, None) is not None
+
+            for symbol in invalid:
+                entry = entries.get(symbol) or {"failures": 0, "first_failed": timestamp}
+                entry["failures"] += 1
+                entry["last_failed"] = timestamp
+                entry["reason"] = reason
+                # Exponential backoff: base, 2 x base, 4 x base, ... capped at max_backoff
+                delay = min(self.base_backoff * 2 ** (entry["failures"] - 1), self.max_backoff)
+                entry["next_retry"] = now + delay
+                entries[symbol] = entry
+                changed = True
+
+            if changed:
+                self._save()
+
+    def _index_path(self) -> Path:
+        return self.path if self.path is not None else INDEX_DIR / f"{get_provider().name}.json"
+
+    def _load(self) -> dict:
+        """Return the entries, re-reading them if another process changed them. Caller holds the lock."""
+        path = self._index_path()
+        loaded_from = (path, version(path))
+        if loaded_from != self._loaded_from:
+            entries = {}
+            if loaded_from[1] is not None:
+                try:
+                    entries = read_json(path) or {}
+                except (OSError, ValueError) as e:
+                    print(f"Error reading symbol index {path}: {e}")
+            self._entries = entries
+            self._loaded_from = loaded_from
+        return self._entries
+
+    def _save(self) -> None:
+        """Persist the entries. Caller holds the lock."""
+        path = self._index_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_with_lock(path, self._entries)
+            self._loaded_from = (path, version(path))
+        except OSError as e:
+            print(f"Error writing symbol index {path}: {e}")
+
+# Shared index used by the price lookups
+symbol_index = SymbolIndex(
+    base_backoff=float(os.getenv("SYMBOL_RETRY_BASE", "900")),
+    max_backoff=float(os.getenv("SYMBOL_RETRY_MAX", str(7 * 86400)))
+)
@@ -0,0 +1,26 @@
+"""
+Refresh the prices of every user's portfolio in one batch.
+
+Usage:
+    python batch_refresh.py [--workers 8] [--users-dir data/users] [--force]
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+# Load .env before importing app modules, which read their settings at import time
+load_dotenv()
+
+from app.src.batch_refresh import refresh_all_portfolios, format_report
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Refresh prices for all user portfolios with one fetch per symbol")
+    parser.add_argument("--workers", type=int, default=8, help="Threads used to read and write portfolio files")
+    parser.add_argument("--users-dir", default=None, help="Directory with one sub-directory per user")
+    parser.add_argument("--force", action="store_true", help="Refresh every holding, even outside market hours")
+    args = parser.parse_args()
+
+    report = refresh_all_portfolios(args.users_dir, workers=args.workers, force=args.force)
+    print(format_report(report))
@@ -0,0 +1,55 @@
+"""
+Benchmark for the vectorized backtesting engine.
+
+Runs the built-in strategies on synthetic daily prices (10 years x 500 symbols by
+default) and reports bars processed per second, including a process-pool sweep.
+
+Usage:
+    python benchmarks/bench_backtest.py [--years 10] [--symbols 500] [--processes 4]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.analytics import TRADING_DAYS
+from app.utils.backtest import run_backtest, parameter_sweep
+
+def synthetic_closes(years: int, symbols: int, seed: int = 0) -> np.ndarray:
+    """Geometric random walks, one column per symbol."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, (years * TRADING_DAYS, symbols))
+    return 100 * np.cumprod(1 + returns, axis=0)
+
+def timed(label: str, bars: int, func) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:>8.3f} s {bars / elapsed:>16,.0f} bars/s")
+
+def run(years: int, symbols: int, processes: int) -> None:
+    closes = synthetic_closes(years, symbols)
+    bars = closes.size
+    print(f"{years} years x {symbols} symbols = {bars:,} bars\n")
+
+    timed("ma_crossover 50/200", bars, lambda: run_backtest(closes, "ma_crossover", fast=50, slow=200))
+    timed("threshold_rebalance 5%", bars, lambda: run_backtest(closes, "threshold_rebalance", threshold=0.05))
+
+    grid = {"fast": [10, 20, 50], "slow": [100, 150, 200, 250]}
+    sweep_bars = bars * 12
+    timed("sweep 12 combos, in-process", sweep_bars, lambda: parameter_sweep(closes, "ma_crossover", grid, processes=1))
+    timed(f"sweep 12 combos, {processes} processes", sweep_bars, lambda: parameter_sweep(closes, "ma_crossover", grid, processes=processes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    run(args.years, args.symbols, args.processes)
@@ -0,0 +1,78 @@
+"""
+Benchmark for the fleet-wide batch portfolio refresh.
+
+Generates synthetic users in a temporary directory (each holding 5-15 symbols drawn
+from a shared universe, popular symbols more often) and times each phase of
+refresh_all_portfolios against the offline replay provider.
+
+Usage:
+    python benchmarks/bench_batch_refresh.py [--sizes 10 100 1000 10000] [--latency 0.05]
+
+Run with STORAGE_WRITE_BEHIND=1 to write through the group-commit journal; the compact
+column is the time to fold the journal into the portfolio files afterwards.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils import finance
+from app.utils.storage import write_journal
+from app.utils.market_data import ReplayProvider, set_provider
+from app.src.batch_refresh import refresh_all_portfolios
+
+def create_users(base: Path, count: int, universe: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    # Zipf-like popularity so a few symbols are held by most users
+    popularity = 1.0 / np.arange(1, universe + 1)
+    popularity /= popularity.sum()
+    for i in range(count):
+        symbols = rng.choice(universe, size=rng.integers(5, 16), replace=False, p=popularity)
+        portfolio = [
+            {"company_name": f"Company {s}", "stock_code": f"SYM{s}", "quantity": int(rng.integers(1, 100)),
+             "purchase_price": round(float(rng.uniform(10, 500)), 2)}
+            for s in symbols
+        ]
+        user = base / f"user{i:05d}"
+        user.mkdir(parents=True)
+        (user / "portfolio.json").write_text(json.dumps(portfolio))
+
+def run(sizes: list, latency: float, universe: int, workers: int) -> None:
+    provider = ReplayProvider(latency=latency)
+    set_provider(provider)
+    # Generate the synthetic bars up front so fetch timings only include simulated latency
+    provider.get_quotes([f"SYM{s}" for s in range(universe)])
+    print(f"Simulated latency per request: {latency * 1000:.0f} ms, symbol universe: {universe}\n")
+    print(f"{'users':>7} {'symbols':>8} {'requests':>9} {'scan':>8} {'fetch':>8} {'revalue':>8} {'write':>8} {'compact':>8} {'total':>8} {'users/s':>9}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            create_users(Path(tmp), size, universe)
+            finance.quote_cache.clear()
+            provider.requests = 0
+            report = refresh_all_portfolios(Path(tmp), workers=workers, force=True)
+            t = report["timings"]
+            # Fold journaled writes into the files before the directory is removed
+            started = time.perf_counter()
+            journal = write_journal()
+            if journal is not None:
+                journal.compact()
+            compact = time.perf_counter() - started
+            print(f"{size:>7} {report['symbols']:>8} {provider.requests:>9} {t['scan']:>8.3f} {t['fetch']:>8.3f} "
+                  f"{t['revalue']:>8.3f} {t['write']:>8.3f} {compact:>8.3f} {t['total']:>8.3f} {size / t['total']:>9.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per request")
+    parser.add_argument("--universe", type=int, default=500, help="Number of distinct symbols users can hold")
+    parser.add_argument("--workers", type=int, default=8, help="Threads used to read and write portfolio files")
+    args = parser.parse_args()
+    run(args.sizes, args.latency, args.universe, args.workers)
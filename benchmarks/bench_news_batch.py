@@ -0,0 +1,119 @@
+"""
+Benchmark for the batch news workflow.
+
+Researches a group of related symbols once as separate single-stock runs and once as one
+batch run, with a scripted stand-in for the LLM and simulated search and page latency, and
+counts the LLM calls, tokens, searches and page downloads of each. The scripted agent searches
+its own symbol and then its sector, so symbols of one sector issue one identical query and
+land on the same sector pages.
+
+A batch run shares searches and pages between its symbols; every symbol still runs its own
+agent loop and summary, so it makes the same LLM calls. Input tokens can even be higher in a
+batch: pages another symbol already fetched are ready at once, so a search keeps more of its
+pages before WEB_SEARCH_MIN_PAGES cuts the remaining downloads off.
+
+Usage:
+    python benchmarks/bench_news_batch.py [--symbols NVDA AMD INTC AVGO] [--latency 0.05]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Add parent directory to path to allow importing app modules
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from agents import news_agent, tools
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.searches = 0
+        self.pages = 0
+
+    def add(self, key: str) -> None:
+        with self.lock:
+            setattr(self, key, getattr(self, key) + 1)
+
+class ScriptedLLM:
+    """Searches the symbol, then its sector, then concludes; summaries are a fixed text."""
+
+    def __init__(self, sector: str):
+        self.sector = sector
+
+    def bind_tools(self, tools):
+        return self
+
+    def invoke(self, messages):
+        # Rough token count of the prompt: about four characters per token
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        usage = {"input_tokens": input_tokens, "output_tokens": 40, "total_tokens": input_tokens + 40}
+        if isinstance(messages[0], SystemMessage) and messages[0].content.startswith("Analyze"):
+            return AIMessage(content="Summary of recent news.", usage_metadata=usage)
+
+        symbol = next(m.content.rsplit(" ", 1)[-1] for m in messages if isinstance(m, HumanMessage))
+        searches = sum(isinstance(m, ToolMessage) for m in messages)
+        if searches == 0:
+            call = {"name": "web_search", "args": {"query": f"{symbol} stock news"}}
+        elif searches == 1:
+            call = {"name": "web_search", "args": {"query": f"{self.sector} stocks news this week"}}
+        else:
+            call = {"name": "reach_conclusion", "args": {}}
+        call.update(id=f"call_{symbol}_{searches}", type="tool_call")
+        return AIMessage(content="", tool_calls=[call], usage_metadata=usage)
+
+def run(symbols: list, sector: str, latency: float) -> None:
+    counters = Counters()
+
+    def search(query: str) -> list:
+        counters.add("searches")
+        time.sleep(latency)
+        # Symbol queries land on the symbol's own pages, the sector query on shared ones
+        slug = query.split()[0].lower()
+        return [{"href": f"https://news.example.com/{slug}/{i}"} for i in range(5)]
+
+    def fetch(url: str, cancel=None) -> str:
+        counters.add("pages")
+        time.sleep(latency)
+        return f"Article at {url}. " * 50
+
+    page_cache = mock.Mock()
+    page_cache.fetch.side_effect = fetch
+    with mock.patch.object(news_agent, "get_llm", lambda: ScriptedLLM(sector)), \
+         mock.patch.object(tools, "_ddg_search", search), \
+         mock.patch.object(tools, "page_cache", page_cache):
+        print(f"Symbols: {' '.join(symbols)} ({sector}), simulated latency {latency * 1000:.0f} ms\n")
+        print(f"{'mode':>10} {'llm calls':>10} {'in tokens':>10} {'searches':>9} {'pages':>6} {'seconds':>8}")
+
+        counters.searches = counters.pages = 0
+        started = time.perf_counter()
+        calls = input_tokens = 0
+        for symbol in symbols:
+            totals = news_agent.usage_totals(news_agent.run_workflow(symbol).get("graph_execution", []))
+            calls += totals["llm_calls"]
+            input_tokens += totals["input_tokens"]
+        seconds = time.perf_counter() - started
+        print(f"{'separate':>10} {calls:>10} {input_tokens:>10} {counters.searches:>9} {counters.pages:>6} {seconds:>8.2f}")
+
+        counters.searches = counters.pages = 0
+        batch = news_agent.run_batch_workflow(symbols)
+        tokens = batch["tokens"]
+        print(f"{'batch':>10} {tokens['llm_calls']:>10} {tokens['input_tokens']:>10} {counters.searches:>9} "
+              f"{counters.pages:>6} {batch['seconds']:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="+", default=["NVDA", "AMD", "INTC", "AVGO"])
+    parser.add_argument("--sector", default="semiconductor", help="Sector searched by every symbol")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per search and page download")
+    args = parser.parse_args()
+    # The agent reads its instructions relative to the repository root
+    os.chdir(ROOT)
+    run(args.symbols, args.sector, args.latency)
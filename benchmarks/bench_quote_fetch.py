@@ -0,0 +1,75 @@
+"""
+Benchmark for portfolio price refresh latency.
+
+Compares the per-symbol quote path (one get_current_price call per holding)
+with the batched get_current_prices path (batches fetched concurrently), and first
+vs repeat history lookups, against the offline replay provider so it runs without
+network access.
+
+Usage:
+    python benchmarks/bench_quote_fetch.py [--latency 0.05] [--batch-size 10] [--concurrency 8]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils import finance
+from app.utils.market_data import ReplayProvider, set_provider
+
+def bench_quotes(provider: ReplayProvider, sizes: list) -> None:
+    print(f"{'holdings':>10} {'serial (s)':>12} {'requests':>10} {'batched (s)':>12} {'requests':>10} {'speedup':>9}")
+    for size in sizes:
+        symbols = [f"SYM{i}" for i in range(size)]
+
+        finance.quote_cache.clear()
+        provider.requests = 0
+        start = time.perf_counter()
+        serial = {symbol: finance.get_current_price(symbol) for symbol in symbols}
+        serial_time = time.perf_counter() - start
+        serial_requests = provider.requests
+
+        finance.quote_cache.clear()
+        provider.requests = 0
+        start = time.perf_counter()
+        batched = finance.get_current_prices(symbols)
+        batched_time = time.perf_counter() - start
+        batched_requests = provider.requests
+
+        assert serial == batched, "batched prices differ from per-symbol prices"
+        print(f"{size:>10} {serial_time:>12.3f} {serial_requests:>10} {batched_time:>12.3f} {batched_requests:>10} {serial_time / batched_time:>8.1f}x")
+
+def bench_history(symbols: list) -> None:
+    print(f"\n{'lookup':>10} {'total (s)':>12} {'per symbol (ms)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        finance.history_store.root = Path(tmp)
+        for label in ("first", "repeat"):
+            start = time.perf_counter()
+            for symbol in symbols:
+                finance.get_recent_prices(symbol)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>10} {elapsed:>12.3f} {elapsed / len(symbols) * 1000:>16.2f}")
+        finance.history_store.root = None
+
+def run(latency: float, sizes: list) -> None:
+    provider = ReplayProvider(latency=latency)
+    set_provider(provider)
+    print(f"Simulated latency per request: {latency * 1000:.0f} ms")
+    bench_quotes(provider, sizes)
+    bench_history([f"SYM{i}" for i in range(20)])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per request")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 40, 100])
+    parser.add_argument("--batch-size", type=int, default=finance.FETCH_BATCH_SIZE, help="Symbols per request")
+    parser.add_argument("--concurrency", type=int, default=finance.FETCH_CONCURRENCY, help="Concurrent requests")
+    args = parser.parse_args()
+    finance.FETCH_BATCH_SIZE = args.batch_size
+    finance.FETCH_CONCURRENCY = args.concurrency
+    run(args.latency, args.sizes)
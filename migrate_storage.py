@@ -0,0 +1,30 @@
+"""
+Migrate the JSON user data tree into the SQLite storage backend.
+
+Usage:
+    python migrate_storage.py [--users-dir data/users] [--db data/trading.db]
+
+Afterwards set STORAGE_BACKEND=sqlite (and STORAGE_DB if a custom --db was used).
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+# Load .env before importing app modules, which read their settings at import time
+load_dotenv()
+
+from app.utils import storage
+from app.utils.sqlite_store import SQLiteStore, migrate_json_tree
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Copy data/users/*/*.json into the SQLite storage backend")
+    parser.add_argument("--users-dir", default=None, help="Directory with one sub-directory per user")
+    parser.add_argument("--db", default=str(storage.DB_PATH), help="Database file to create or update")
+    args = parser.parse_args()
+
+    store = SQLiteStore(args.db, storage.BASE)
+    counts = migrate_json_tree(store, args.users_dir)
+    print(f"Migrated {counts['documents']} documents ({counts['holdings']} holdings) for {counts['users']} users "
+          f"into {args.db}" + (f", {counts['errors']} errors" if counts['errors'] else ""))
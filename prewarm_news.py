@@ -0,0 +1,31 @@
+"""
+Pre-warm the shared news cache for every symbol held by a user.
+
+Usage:
+    python prewarm_news.py [--interval 60] [--once] [--lead 600] [--limit N] [--batch-size 4]
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+# Load .env before importing app modules, which read their settings at import time
+load_dotenv()
+
+from app.src.news_prewarm import prewarm_news, run_prewarm_worker, format_report
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Generate news digests for held symbols ahead of demand")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between pre-warming passes")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    parser.add_argument("--lead", type=float, default=600.0, help="Refresh digests expiring within this many seconds")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum symbols refreshed per pass")
+    parser.add_argument("--batch-size", type=int, default=4, help="Symbols researched per batch workflow")
+    args = parser.parse_args()
+
+    options = {"lead": args.lead, "limit": args.limit, "batch_size": args.batch_size}
+    if args.once:
+        print(format_report(prewarm_news(**options)))
+    else:
+        run_prewarm_worker(args.interval, **options)
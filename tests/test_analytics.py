@@ -0,0 +1,90 @@
+"""
+Test module for the vectorized portfolio analytics.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.analytics import compute_analytics, analyze_portfolio, _forward_fill
+from app.utils.market_data import ReplayProvider, get_provider, set_provider
+from app.utils.history_store import HistoryStore
+
+def test_known_metrics():
+    """Test returns, drawdown, beta and correlation on constructed series."""
+    rng = np.random.default_rng(1)
+    market_returns = rng.normal(0, 0.01, 250)
+    market = 100 * np.cumprod(np.append(1.0, 1 + market_returns))
+    # A holding that moves exactly twice as much as the market
+    levered = 50 * np.cumprod(np.append(1.0, 1 + 2 * market_returns))
+    closes = np.column_stack([market, levered])
+
+    metrics = compute_analytics(closes, quantities=np.array([1.0, 2.0]), benchmark=market)
+
+    assert np.allclose(metrics["beta"], [1.0, 2.0])
+    assert np.isclose(metrics["correlation"][0, 1], 1.0)
+    assert np.isclose(metrics["total_return"][0], market[-1] / market[0] - 1)
+
+    expected_drawdown = (levered / np.maximum.accumulate(levered) - 1).min()
+    assert np.isclose(metrics["max_drawdown"][1], expected_drawdown)
+
+    values = closes @ np.array([1.0, 2.0])
+    assert np.isclose(metrics["portfolio_total_return"], values[-1] / values[0] - 1)
+    assert np.isclose(metrics["weights"].sum(), 1.0)
+
+def test_forward_fill():
+    """Test that gaps are filled and leading NaNs are kept."""
+    matrix = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [4.0, 5.0]])
+    filled = _forward_fill(matrix)
+
+    assert np.isnan(filled[0, 0])
+    assert list(filled[:, 0][1:]) == [2.0, 2.0, 4.0]
+    assert list(filled[:, 1]) == [1.0, 1.0, 1.0, 5.0]
+
+def test_analyze_portfolio_offline():
+    """Test the agent-facing summary against the replay provider."""
+    previous = get_provider()
+    set_provider(ReplayProvider(invalid_symbols=["FAKE"]))
+    # Replayed bars go to a throwaway store instead of data/history
+    with tempfile.TemporaryDirectory() as tmp, \
+         mock.patch("app.utils.analytics.history_store", HistoryStore(root=tmp)):
+        try:
+            result = analyze_portfolio(["AAPL", "MSFT", "FAKE"], [10, 5, 20], months=6)
+
+            assert result["missing_symbols"] == ["FAKE"]
+            assert set(result["holdings"]) == {"AAPL", "MSFT"}
+            assert result["benchmark"] == "SPY"
+            assert result["correlation"]["most_correlated"][0][:2] == ["AAPL", "MSFT"]
+            print(f"✓ Portfolio metrics: {result['portfolio']}")
+        finally:
+            set_provider(previous)
+
+def test_analyze_portfolio_combines_lots():
+    """Test that several lots of one symbol are analyzed as one position with their total quantity."""
+    previous = get_provider()
+    set_provider(ReplayProvider())
+    with tempfile.TemporaryDirectory() as tmp, \
+         mock.patch("app.utils.analytics.history_store", HistoryStore(root=tmp)):
+        try:
+            lots = analyze_portfolio(["AAPL", "MSFT", "AAPL"], [4, 5, 6], months=6)
+            combined = analyze_portfolio(["AAPL", "MSFT"], [10, 5], months=6)
+
+            assert list(lots["holdings"]) == ["AAPL", "MSFT"]
+            assert lots["holdings"] == combined["holdings"]
+            assert lots["portfolio"] == combined["portfolio"]
+            pairs = lots["correlation"]["most_correlated"] + lots["correlation"]["least_correlated"]
+            assert all(pair[0] != pair[1] for pair in pairs)
+        finally:
+            set_provider(previous)
+
+if __name__ == "__main__":
+    test_known_metrics()
+    test_forward_fill()
+    test_analyze_portfolio_offline()
+    test_analyze_portfolio_combines_lots()
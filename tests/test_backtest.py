@@ -0,0 +1,105 @@
+"""
+Test module for the vectorized backtesting engine.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.backtest import moving_average, ma_crossover, threshold_rebalance, run_backtest, parameter_sweep, backtest_symbols
+from app.utils.market_data import ReplayProvider, get_provider, set_provider
+from app.utils.history_store import HistoryStore
+
+def _closes(n=400, symbols=4, seed=5):
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0.0003, 0.015, (n, symbols)), axis=0)
+
+def test_moving_average_matches_pandas():
+    """Test the cumulative-sum moving average with and without missing prices."""
+    closes = _closes()
+    gapped = closes.copy()
+    gapped[:30, 1] = np.nan
+    gapped[100, 2] = np.nan
+
+    for matrix in (closes, gapped):
+        expected = pd.DataFrame(matrix).rolling(20).mean().to_numpy()
+        assert np.allclose(moving_average(matrix, 20), expected, equal_nan=True)
+
+def test_crossover_on_known_series():
+    """Test that positions lag the signal by one bar and equity follows held returns."""
+    # Falling then rising prices: the crossover turns long once the fast average overtakes
+    prices = np.concatenate([np.linspace(100, 80, 30), np.linspace(80, 120, 30)])[:, None]
+    result = ma_crossover(prices, fast=3, slow=10)
+
+    positions = result["positions"][:, 0]
+    returns = prices[1:, 0] / prices[:-1, 0] - 1
+    expected = np.cumprod(1 + positions[:-1] * returns)
+    assert np.allclose(result["equity"][1:, 0], expected)
+    assert result["trades"][0] == 1
+    assert result["equity"][-1, 0] > 1.0
+
+def test_threshold_rebalance_matches_loop():
+    """Test the jump-to-next-breach rebalancing against a bar-by-bar simulation."""
+    closes = _closes(300, 3)
+    weights = np.full(3, 1 / 3)
+    result = threshold_rebalance(closes, threshold=0.02, lookahead=20)
+
+    holdings = weights / closes[0]
+    equity = [1.0]
+    rebalances = 0
+    for row in closes[1:]:
+        value = holdings @ row
+        equity.append(value)
+        if np.abs(holdings * row / value - weights).max() > 0.02:
+            holdings = value * weights / row
+            rebalances += 1
+
+    assert result["rebalances"][0] == rebalances > 0
+    assert np.allclose(result["equity"][:, 0], equity)
+
+def test_run_backtest_and_sweep():
+    """Test the summary against buy-and-hold and that in-process sweeps are ranked by Sharpe."""
+    closes = _closes()
+    summary = run_backtest(closes, "threshold_rebalance", threshold=1.0)
+    # A threshold that is never breached is plain buy-and-hold
+    assert summary["rebalances"][0] == 0
+    assert np.isclose(summary["portfolio"]["total_return"], summary["buy_and_hold"]["total_return"])
+
+    results = parameter_sweep(closes, "ma_crossover", {"fast": [5, 10], "slow": [50, 100]}, processes=1)
+    sharpes = [r["portfolio"]["sharpe"] for r in results]
+    assert len(results) == 4 and sharpes == sorted(sharpes, reverse=True)
+
+def test_backtest_symbols_offline():
+    """Test the agent-facing summary against the replay provider."""
+    previous = get_provider()
+    set_provider(ReplayProvider(invalid_symbols=["FAKE"]))
+    # Replayed bars go to a throwaway store instead of data/history
+    with tempfile.TemporaryDirectory() as tmp, \
+         mock.patch("app.utils.analytics.history_store", HistoryStore(root=tmp)):
+        try:
+            result = backtest_symbols(["AAPL", "MSFT", "FAKE"], "ma_crossover", years=2, fast=20, slow=50)
+
+            assert result["missing_symbols"] == ["FAKE"]
+            assert set(result["per_symbol"]) == {"AAPL", "MSFT"}
+            assert "sharpe" in result["portfolio"] and "cagr_pct" in result["buy_and_hold"]
+            print(f"✓ Backtest: {result['portfolio']} vs {result['buy_and_hold']}")
+
+            # Duplicate lots of a symbol are backtested once
+            lots = backtest_symbols(["AAPL", "MSFT", "AAPL", "FAKE"], "ma_crossover", years=2, fast=20, slow=50)
+            assert lots["portfolio"] == result["portfolio"] and lots["per_symbol"] == result["per_symbol"]
+        finally:
+            set_provider(previous)
+
+if __name__ == "__main__":
+    test_moving_average_matches_pandas()
+    test_crossover_on_known_series()
+    test_threshold_rebalance_matches_loop()
+    test_run_backtest_and_sweep()
+    test_backtest_symbols_offline()
@@ -0,0 +1,58 @@
+"""
+Test module for the fleet-wide batch portfolio refresh.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.src.batch_refresh import refresh_all_portfolios, format_report
+from app.utils.market_data import ReplayProvider, get_provider, set_provider
+from app.utils.symbol_index import symbol_index
+from app.utils.storage import read_json
+
+PORTFOLIOS = {
+    "alice": [{"stock_code": "AAPL", "quantity": 10, "purchase_price": 100.0},
+              {"stock_code": "MSFT", "quantity": 5, "purchase_price": 200.0}],
+    "bob": [{"stock_code": "AAPL", "quantity": 1, "purchase_price": 120.0},
+            {"stock_code": "FAKE", "quantity": 20, "purchase_price": 50.0}],
+    "carol": []
+}
+
+def test_refresh_all_portfolios():
+    """Test that shared symbols are fetched once and every portfolio is revalued."""
+    previous_provider, previous_path = get_provider(), symbol_index.path
+    provider = ReplayProvider(invalid_symbols=["FAKE"])
+    set_provider(provider)
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "users"
+        symbol_index.path = Path(tmp) / "index.json"
+        for username, portfolio in PORTFOLIOS.items():
+            (base / username).mkdir(parents=True)
+            (base / username / "portfolio.json").write_text(json.dumps(portfolio))
+        try:
+            report = refresh_all_portfolios(base, workers=2)
+
+            assert report["users"] == 2 and report["symbols"] == 3 and report["priced"] == 2
+            assert report["updated"] == 2 and not report["failed"]
+            assert provider.requests == 1, "all distinct symbols should go out in one batch"
+            assert set(report["timings"]) == {"scan", "fetch", "revalue", "write", "total"}
+
+            alice = read_json(base / "alice" / "portfolio.json")
+            bob = read_json(base / "bob" / "portfolio.json")
+            assert alice[0]["current_price"] == bob[0]["current_price"]
+            assert alice[0]["value"] == round(10 * alice[0]["current_price"], 2)
+            # Unpriced holdings are valued at their purchase price but stay unpriced, so they stay due
+            assert bob[1]["value"] == round(bob[1]["quantity"] * 50.0, 2)
+            assert "current_price" not in bob[1] and "last_updated" not in bob[1]
+            print(format_report(report))
+        finally:
+            symbol_index.path = previous_path
+            set_provider(previous_provider)
+
+if __name__ == "__main__":
+    test_refresh_all_portfolios()
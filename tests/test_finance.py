@@ -5,7 +5,13 @@ from pathlib import Path
 # Add parent directory to path to allow importing app modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.utils.finance import get_recent_prices
+import time
+
+import numpy as np
+
+from app.utils import finance
+from app.utils.finance import get_recent_prices, get_current_prices, get_price_series, fetch_in_batches, _format_price_entries
+from app.utils.market_data import ReplayProvider, RateLimitError
 
 def test_get_recent_prices():
     """Test that get_recent_prices returns correctly formatted price data."""
@@ -31,5 +37,89 @@ def test_get_recent_prices():
     else:
         print("No price data was retrieved. Check your internet connection or the symbol.")
 
+def test_get_current_prices():
+    """Test that get_current_prices returns one entry per distinct symbol."""
+    symbols = ["AAPL", "MSFT", "AAPL"]
+    prices = get_current_prices(symbols)
+    
+    # Duplicates are fetched once and every symbol gets an entry
+    assert list(prices.keys()) == ["AAPL", "MSFT"]
+    
+    for symbol, price in prices.items():
+        assert price is None or isinstance(price, float), f"Unexpected price for {symbol}: {price}"
+        print(f"{symbol}: {price}")
+    
+    # An empty request does not hit the network
+    assert get_current_prices([]) == {}
+
+def test_format_price_entries():
+    """Test that vectorized formatting matches the per-row string format."""
+    dates = np.array(["2025-10-06", "2025-10-07"], dtype="datetime64[D]")
+    closes = np.array([256.684, 150.0])
+    entries = _format_price_entries(dates, closes)
+    
+    assert entries == [
+        '"date":"2025-10-06", "closing_price":256.68',
+        '"date":"2025-10-07", "closing_price":150.0'
+    ]
+    assert _format_price_entries(dates[:0], closes[:0]) == []
+
+def test_get_price_series():
+    """Test the compact columnar price payload."""
+    series = get_price_series("AAPL", months=12)
+    
+    # Long periods are downsampled to weekly closes
+    assert series["interval"] == "1wk"
+    assert len(series["dates"]) == len(series["closes"])
+    print(f"Retrieved {len(series['dates'])} weekly closes for AAPL")
+    
+    assert get_price_series("AAPL", months=3)["interval"] == "1d"
+
+def test_fetch_in_batches_concurrent():
+    """Test that batches run concurrently, so a refresh costs about one round trip."""
+    provider = ReplayProvider(latency=0.2)
+    symbols = [f"SYM{i}" for i in range(40)]
+    
+    start = time.perf_counter()
+    prices = fetch_in_batches(symbols, provider.get_quotes, batch_size=10)
+    elapsed = time.perf_counter() - start
+    
+    assert provider.requests == 4
+    assert set(prices) == set(symbols)
+    assert elapsed < 0.6, f"4 batches took {elapsed:.2f}s, expected about one round trip"
+    print(f"40 symbols in 4 batches: {elapsed:.2f}s")
+
+def test_fetch_in_batches_retries_and_timeout():
+    """Test backoff retries on rate limits and that slow batches are dropped at the timeout."""
+    previous = finance.FETCH_BACKOFF
+    finance.FETCH_BACKOFF = 0.01
+    try:
+        calls = []
+        def throttled_twice(batch):
+            calls.append(batch)
+            if len(calls) <= 2:
+                raise RateLimitError("Too many requests")
+            return {symbol: 1.0 for symbol in batch}
+        
+        assert fetch_in_batches(["AAPL"], throttled_twice) == {"AAPL": 1.0}
+        assert len(calls) == 3
+        
+        # A provider that is always throttled gives up after the retries
+        always = ReplayProvider(rate_limit_rate=1.0)
+        assert fetch_in_batches(["AAPL"], always.get_quotes) == {}
+        assert always.requests == finance.FETCH_RETRIES + 1
+    finally:
+        finance.FETCH_BACKOFF = previous
+    
+    slow = ReplayProvider(latency=0.5)
+    start = time.perf_counter()
+    assert fetch_in_batches(["AAPL"], slow.get_quotes, timeout=0.1) == {}
+    assert time.perf_counter() - start < 0.4
+
 if __name__ == "__main__":
     test_get_recent_prices()
+    test_get_current_prices()
+    test_format_price_entries()
+    test_get_price_series()
+    test_fetch_in_batches_concurrent()
+    test_fetch_in_batches_retries_and_timeout()
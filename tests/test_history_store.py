@@ -0,0 +1,124 @@
+"""
+Test module for the local OHLCV history store.
+"""
+
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.history_store import HistoryStore
+
+class FakeFetcher:
+    """Returns one synthetic bar per weekday and records the requested ranges."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, start, end):
+        self.calls.append((start, end))
+        dates = pd.bdate_range(start, end - timedelta(days=1))
+        closes = np.arange(len(dates), dtype=float) + 100.0
+        return pd.DataFrame(
+            {"Open": closes, "High": closes + 1, "Low": closes - 1, "Close": closes, "Volume": 1000.0},
+            index=dates
+        )
+
+def test_incremental_fetch():
+    """Test that repeat lookups are served locally and only missing ranges are fetched."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = FakeFetcher()
+        store = HistoryStore(root=Path(tmp), fetcher=fetcher, refresh_interval=3600)
+        today = date.today()
+        start = today - timedelta(days=90)
+
+        history = store.get("AAPL", start)
+        assert len(history) > 0
+        assert fetcher.calls == [(start, today + timedelta(days=1))]
+
+        # A second lookup within the refresh interval is served from disk
+        store.get("AAPL", start)
+        assert len(fetcher.calls) == 1
+
+        # Extending the range backwards only fetches the missing front
+        earlier = start - timedelta(days=30)
+        history = store.get("AAPL", earlier)
+        assert fetcher.calls[-1] == (earlier, start)
+        assert np.all(np.diff(history.dates.astype("int64")) > 0), "dates must be sorted and unique"
+        print(f"✓ Stored {len(history)} bars with {len(fetcher.calls)} fetches")
+
+def test_stale_tail_refetches_last_bar_only():
+    """Test that an expired refresh only downloads from the last stored bar."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = FakeFetcher()
+        store = HistoryStore(root=Path(tmp), fetcher=fetcher, refresh_interval=0)
+        start = date.today() - timedelta(days=30)
+
+        first = store.get("MSFT", start)
+        store.get("MSFT", start)
+        tail_start, _ = fetcher.calls[-1]
+        assert tail_start == first.dates[-1].astype(object)
+
+def test_reads_are_memory_mapped():
+    """Test that reads are slices of memory maps rather than copies."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(root=Path(tmp), fetcher=FakeFetcher())
+        store.get("NVDA", date.today() - timedelta(days=60))
+        history = store.read("NVDA", start=date.today() - timedelta(days=30))
+
+        assert isinstance(history.close, np.memmap)
+        assert not history.close.flags.writeable
+        assert history.dates[0] >= np.datetime64(date.today() - timedelta(days=30), "D")
+
+def test_append_replaces_existing_bars():
+    """Test that appended bars overwrite stored bars for the same date."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(root=Path(tmp), fetcher=FakeFetcher())
+        index = pd.DatetimeIndex(["2025-01-02", "2025-01-03"])
+        frame = pd.DataFrame({"Open": 1.0, "High": 1.0, "Low": 1.0, "Close": [10.0, 11.0], "Volume": 1.0}, index=index)
+        store.append("AMD", frame)
+
+        update = frame.iloc[1:].assign(Close=12.0)
+        assert store.append("AMD", update) == 2
+        assert list(store.read("AMD").close) == [10.0, 12.0]
+
+def test_symbols_are_validated():
+    """Test that symbols are normalized and that path-like or unknown symbols leave nothing on disk."""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "history"
+        fetcher = FakeFetcher()
+        store = HistoryStore(root=root, fetcher=fetcher, refresh_interval=3600)
+        start = date.today() - timedelta(days=30)
+
+        assert len(store.get(" aapl ", start).close) > 0
+        assert (root / "AAPL" / "meta.json").exists()
+
+        for symbol in ("../escape", "AAPL/../../x", "", "..", "A" * 16):
+            assert len(store.get(symbol, start).close) == 0
+            try:
+                store.append(symbol, pd.DataFrame())
+                assert False, f"append accepted {symbol!r}"
+            except ValueError:
+                pass
+        assert len(fetcher.calls) == 1
+        assert sorted(path.name for path in Path(tmp).iterdir()) == ["history"]
+        assert sorted(path.name for path in root.iterdir()) == ["AAPL"]
+
+        # A symbol the provider knows nothing about is throttled without creating a directory
+        empty = lambda symbol, start, end: pd.DataFrame()
+        store = HistoryStore(root=root, fetcher=empty, refresh_interval=3600)
+        assert len(store.get("NOPE", start).close) == 0
+        assert not (root / "NOPE").exists()
+
+if __name__ == "__main__":
+    test_incremental_fetch()
+    test_stale_tail_refetches_last_bar_only()
+    test_reads_are_memory_mapped()
+    test_append_replaces_existing_bars()
+    test_symbols_are_validated()
@@ -0,0 +1,79 @@
+"""
+Test module for the symbol -> users holdings index.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.holdings_index import HoldingsIndex
+from app.utils.storage import add_write_listener, read_json, version, write_json_with_lock, _write_listeners
+from app.src.portfolio_updater import apply_price_tick
+
+def _holding(symbol, quantity=10, purchase_price=100.0):
+    return {"stock_code": symbol, "quantity": quantity, "purchase_price": purchase_price}
+
+def test_index_follows_storage_writes():
+    """Test that writes through storage keep the index current and it survives a restart."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users = Path(tmp) / "users"
+        index_path = Path(tmp) / "index.json"
+        index = HoldingsIndex(users, index_path)
+        add_write_listener(index.on_write)
+        try:
+            for username, symbols in {"alice": ["AAPL", "MSFT"], "bob": ["AAPL"]}.items():
+                (users / username).mkdir(parents=True)
+                write_json_with_lock(users / username / "portfolio.json", [_holding(s) for s in symbols])
+            assert index.holders("AAPL") == {"alice", "bob"}
+            assert index.holders("MSFT") == {"alice"}
+
+            # Selling MSFT removes alice from its holders
+            write_json_with_lock(users / "alice" / "portfolio.json", [_holding("AAPL")])
+            assert index.holders("MSFT") == set()
+
+            # The index records the version each write produced, so a restart re-reads nothing
+            index.flush()
+            persisted = read_json(index_path)["users"]
+            assert persisted["alice"]["version"] == version(users / "alice" / "portfolio.json")
+        finally:
+            _write_listeners.remove(index.on_write)
+
+        # A file changed outside the storage layer is picked up on the next start
+        portfolio_path = users / "bob" / "portfolio.json"
+        portfolio_path.write_text(json.dumps([_holding("NVDA")]))
+        os.utime(portfolio_path, ns=(1, 1))
+        restarted = HoldingsIndex(users, index_path)
+        assert restarted.holders("NVDA") == {"bob"}
+        assert restarted.holders("AAPL") == {"alice"}
+        assert restarted.symbols() == ["AAPL", "NVDA"]
+
+def test_apply_price_tick_touches_only_holders():
+    """Test that a price tick revalues the holders of one symbol and nothing else."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users = Path(tmp) / "users"
+        portfolios = {
+            "alice": [_holding("AAPL", 10, 100.0), _holding("MSFT", 5, 200.0)],
+            "bob": [_holding("MSFT", 1, 300.0)]
+        }
+        for username, portfolio in portfolios.items():
+            (users / username).mkdir(parents=True)
+            (users / username / "portfolio.json").write_text(json.dumps(portfolio))
+        bob_mtime = (users / "bob" / "portfolio.json").stat().st_mtime_ns
+
+        index = HoldingsIndex(users, Path(tmp) / "index.json")
+        assert apply_price_tick("AAPL", 150.0, index) == ["alice"]
+
+        alice = read_json(users / "alice" / "portfolio.json")
+        assert alice[0]["current_price"] == 150.0 and alice[0]["value"] == 1500.0
+        assert alice[0]["percent_return"] == 50.0
+        assert "current_price" not in alice[1], "other holdings are left untouched"
+        assert (users / "bob" / "portfolio.json").stat().st_mtime_ns == bob_mtime
+
+if __name__ == "__main__":
+    test_index_follows_storage_writes()
+    test_apply_price_tick_touches_only_holders()
@@ -0,0 +1,114 @@
+"""
+Test module for the incremental technical indicator engine.
+"""
+
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.indicators import IndicatorState, IndicatorEngine, compute_indicators
+from app.utils.market_data import ReplayProvider, get_provider, set_provider
+from app.utils.history_store import HistoryStore
+
+KEYS = ["sma", "ema", "rsi", "macd", "macd_signal", "macd_histogram", "bollinger_upper", "bollinger_lower"]
+
+def _closes(n=120, seed=3):
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0, 0.02, n))
+
+def _assert_matches(snapshot, batch, i):
+    for key in KEYS:
+        expected = batch[key][i]
+        if np.isnan(expected):
+            assert snapshot[key] is None, f"{key} should be undefined at bar {i}"
+        else:
+            assert np.isclose(snapshot[key], expected), f"{key} differs at bar {i}"
+
+def test_incremental_matches_batch():
+    """Test that O(1) updates reproduce the vectorized series at every bar."""
+    closes = _closes()
+    batch = compute_indicators(closes)
+    state = IndicatorState()
+
+    for i, close in enumerate(closes):
+        snapshot = state.update(float(close))
+        _assert_matches(snapshot, batch, i)
+
+    print(f"✓ RSI {snapshot['rsi']:.2f}, MACD {snapshot['macd']:.4f}")
+
+def test_rsi_uses_wilder_seed():
+    """Test RSI against the textbook definition: SMA of the first 14 changes, then Wilder's smoothing."""
+    closes = _closes(60)
+    changes = np.diff(closes)
+    gains, losses = np.clip(changes, 0, None), np.clip(-changes, 0, None)
+    avg_gain, avg_loss = gains[:14].mean(), losses[:14].mean()
+    expected = [100 - 100 / (1 + avg_gain / avg_loss)]
+    for gain, loss in zip(gains[14:], losses[14:]):
+        avg_gain = (avg_gain * 13 + gain) / 14
+        avg_loss = (avg_loss * 13 + loss) / 14
+        expected.append(100 - 100 / (1 + avg_gain / avg_loss))
+
+    rsi = compute_indicators(closes)["rsi"]
+    assert np.isnan(rsi[:14]).all()
+    assert np.allclose(rsi[14:], expected)
+
+def test_backfill_then_update():
+    """Test that state built in batch continues like a fully incremental state."""
+    closes = _closes()
+    dates = [date(2025, 1, 1) + timedelta(days=i) for i in range(len(closes))]
+    state = IndicatorState.from_history(closes[:100], np.array(dates[:100], dtype="datetime64[D]"))
+    _assert_matches(state.snapshot(), compute_indicators(closes[:100]), 99)
+
+    for i in range(100, len(closes)):
+        snapshot = state.update(float(closes[i]), dates[i])
+    _assert_matches(snapshot, compute_indicators(closes), len(closes) - 1)
+
+def test_same_date_replaces_last_bar():
+    """Test that a revised bar for the same date is not double counted."""
+    closes = _closes(60)
+    dates = [date(2025, 1, 1) + timedelta(days=i) for i in range(len(closes))]
+    state = IndicatorState.from_history(closes, np.array(dates, dtype="datetime64[D]"))
+
+    # Revise the last bar twice
+    state.update(999.0, dates[-1])
+    snapshot = state.update(float(closes[-1]) * 1.01, dates[-1])
+
+    revised = closes.copy()
+    revised[-1] *= 1.01
+    _assert_matches(snapshot, compute_indicators(revised), len(closes) - 1)
+
+def test_engine_with_replay_provider():
+    """Test the engine against the offline provider."""
+    previous = get_provider()
+    set_provider(ReplayProvider())
+    # Replayed bars go to a throwaway store instead of data/history
+    with tempfile.TemporaryDirectory() as tmp, \
+         mock.patch("app.utils.indicators.history_store", HistoryStore(root=tmp)):
+        try:
+            engine = IndicatorEngine(months=6, maxsize=2)
+            first = engine.get("AAPL")
+            assert first["rsi"] is not None and 0 <= first["rsi"] <= 100
+            assert engine.get("AAPL") == first
+
+            # Tracked symbols are bounded; the least recently used one is dropped
+            engine.get("MSFT")
+            engine.get("AAPL")
+            engine.get("NVDA")
+            assert list(engine._states) == ["AAPL", "NVDA"] and engine.evictions == 1
+            assert engine.update("MSFT", 100.0, date.today()) == {}
+        finally:
+            set_provider(previous)
+
+if __name__ == "__main__":
+    test_incremental_matches_batch()
+    test_rsi_uses_wilder_seed()
+    test_backfill_then_update()
+    test_same_date_replaces_last_bar()
+    test_engine_with_replay_provider()
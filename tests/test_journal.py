@@ -0,0 +1,186 @@
+"""
+Test module for the write-behind journal: group commit, compaction and crash recovery.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils import storage
+from app.utils.journal import MISSING, WriteJournal
+from app.utils.storage import atomic_write
+
+def _read(path):
+    with Path(path).open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_group_commit_and_compaction():
+    """Test that concurrent writers share fsyncs and compaction writes the latest snapshots."""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = WriteJournal(Path(tmp) / "journal.log", atomic_write, commit_delay=0.002)
+        paths = [Path(tmp) / f"user{i}.json" for i in range(8)]
+
+        def writer(path):
+            for version in range(25):
+                journal.write(path, {"version": version})
+
+        threads = [threading.Thread(target=writer, args=(path,)) for path in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = journal.stats()
+        print(f"Journal stats: {stats}")
+        assert stats["records"] == 200
+        assert stats["commits"] < stats["records"], "writers should share fsyncs"
+        assert journal.pending(paths[0]) == {"version": 24}
+        assert not paths[0].exists(), "snapshots are written on compaction"
+
+        assert journal.compact() == 8
+        assert all(_read(path) == {"version": 24} for path in paths)
+        assert journal.pending(paths[0]) is MISSING
+        journal.close()
+        assert not (Path(tmp) / "journal.log.old").exists()
+
+def test_crash_recovery_replays_journal():
+    """Test that a journal left by a crashed process is replayed, ignoring a torn last record."""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_path = Path(tmp) / "journal.log"
+        alice, bob = Path(tmp) / "alice.json", Path(tmp) / "bob.json"
+        atomic_write(alice, {"version": 0})
+
+        journal = WriteJournal(journal_path, atomic_write)
+        journal.write(alice, {"version": 1})
+        journal.write(bob, {"version": 1})
+        journal.write(alice, {"version": 2})
+        # Crash: no compaction, and a record torn in the middle of being appended
+        journal._file.close()
+        with journal_path.open("ab") as f:
+            f.write(b'{"path": "' + str(bob).encode() + b'", "data": {"vers')
+        assert _read(alice) == {"version": 0}
+
+        recovered = WriteJournal(journal_path, atomic_write)
+        assert recovered.recovered == 2
+        assert _read(alice) == {"version": 2}
+        assert _read(bob) == {"version": 1}
+        assert journal_path.stat().st_size == 0
+        recovered.close()
+
+def test_crash_during_compaction():
+    """Test recovery when a crash interrupted a compaction after the journal was rotated."""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_path = Path(tmp) / "journal.log"
+        alice = Path(tmp) / "alice.json"
+        record = lambda version: json.dumps({"path": str(alice), "data": {"version": version}}) + "\n"
+        # Rotated journal from the interrupted compaction, newer writes in the fresh journal
+        (Path(tmp) / "journal.log.old").write_text(record(1) + record(2))
+        journal_path.write_text(record(3))
+
+        journal = WriteJournal(journal_path, atomic_write)
+        assert _read(alice) == {"version": 3}
+        assert not (Path(tmp) / "journal.log.old").exists()
+        journal.close()
+
+def test_storage_write_behind():
+    """Test that storage reads see journaled writes before they are compacted."""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = WriteJournal(Path(tmp) / "journal.log", atomic_write)
+        path = Path(tmp) / "portfolio.json"
+        previous = storage.WRITE_BEHIND, storage._journal
+        storage.WRITE_BEHIND, storage._journal = True, journal
+        try:
+            data = [{"stock_code": "AAPL", "quantity": 10}]
+            storage.write_json_with_lock(path, data)
+            data[0]["quantity"] = 99  # the journal keeps its own copy
+            assert not path.exists()
+            assert storage.exists(path)
+            assert storage.read_json(path) == [{"stock_code": "AAPL", "quantity": 10}]
+            journal.compact()
+            assert _read(path) == [{"stock_code": "AAPL", "quantity": 10}]
+            assert storage.read_json(path) == [{"stock_code": "AAPL", "quantity": 10}]
+        finally:
+            storage.WRITE_BEHIND, storage._journal = previous
+            journal.close()
+
+# Runs storage commands read from stdin in a separate process: "write <json>", "read", "mode"
+WORKER = """
+import json, sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+from app.utils import storage
+path = Path(sys.argv[2])
+# Storage reports to stdout; keep it clear for the results
+results, sys.stdout = sys.stdout, sys.stderr
+for line in sys.stdin:
+    command, _, arg = line.strip().partition(" ")
+    if command == "write":
+        storage.write_json_with_lock(path, json.loads(arg))
+        result = "ok"
+    elif command == "read":
+        result = storage.read_json(path)
+    else:
+        result = "journal" if storage.write_journal() is not None else "direct"
+    print(json.dumps(result), file=results, flush=True)
+"""
+
+def _start_worker(tmp, write_behind):
+    env = dict(os.environ, STORAGE_BACKEND="json", STORAGE_WRITE_BEHIND="1" if write_behind else "0",
+               STORAGE_JOURNAL=str(Path(tmp) / "journal.log"), STORAGE_HANDOVER_INTERVAL="0.1")
+    return subprocess.Popen([sys.executable, "-c", WORKER, str(Path(__file__).resolve().parents[1]), str(Path(tmp) / "doc.json")],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+
+def _ask(worker, command):
+    worker.stdin.write(command + "\n")
+    worker.stdin.flush()
+    return json.loads(worker.stdout.readline())
+
+def test_journal_is_handed_over_to_other_processes():
+    """Test that a process joining the data tree sees journaled writes and its own writes are never compacted over."""
+    with tempfile.TemporaryDirectory() as tmp:
+        owner = _start_worker(tmp, write_behind=True)
+        other = None
+        try:
+            assert _ask(owner, "mode") == "journal"
+            _ask(owner, 'write {"by": "owner"}')
+            assert not (Path(tmp) / "doc.json").exists()
+
+            # The newcomer waits for the owner to compact, then works on current files
+            other = _start_worker(tmp, write_behind=False)
+            assert _ask(other, "read") == {"by": "owner"}
+            _ask(other, 'write {"by": "other"}')
+
+            # The owner has switched to direct writes and sees the newer file
+            assert _ask(owner, "mode") == "direct"
+            assert _ask(owner, "read") == {"by": "other"}
+        finally:
+            for worker in (owner, other):
+                if worker is not None:
+                    worker.stdin.close()
+                    worker.wait(timeout=10)
+        assert _read(Path(tmp) / "doc.json") == {"by": "other"}
+
+        # A write-behind process started while another uses the tree writes directly
+        other = _start_worker(tmp, write_behind=False)
+        late = _start_worker(tmp, write_behind=True)
+        try:
+            assert _ask(other, "read") == {"by": "other"}
+            assert _ask(late, "mode") == "direct"
+        finally:
+            for worker in (other, late):
+                worker.stdin.close()
+                worker.wait(timeout=10)
+
+if __name__ == "__main__":
+    test_group_commit_and_compaction()
+    test_crash_recovery_replays_journal()
+    test_crash_during_compaction()
+    test_storage_write_behind()
+    test_journal_is_handed_over_to_other_processes()
@@ -0,0 +1,95 @@
+"""
+Test module for the market calendar and market-hours refresh policy.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.market_calendar import MarketCalendar
+
+NY = ZoneInfo("America/New_York")
+
+def _calendar():
+    return MarketCalendar(data={
+        "timezone": "America/New_York",
+        "holidays": ["2025-07-04"],
+        "early_closes": ["2025-07-03"],
+        "staleness_seconds": {"default": 300, "symbols": {"SPY": 60}}
+    })
+
+def test_sessions_and_holidays():
+    """Test open/closed checks across a holiday weekend with an early close."""
+    calendar = _calendar()
+    assert calendar.is_open(datetime(2025, 7, 3, 12, 0, tzinfo=NY))
+    assert not calendar.is_open(datetime(2025, 7, 3, 14, 0, tzinfo=NY)), "early close at 13:00"
+    assert not calendar.is_open(datetime(2025, 7, 4, 12, 0, tzinfo=NY)), "holiday"
+
+    saturday = datetime(2025, 7, 5, 12, 0, tzinfo=NY)
+    assert calendar.last_close(saturday) == datetime(2025, 7, 3, 13, 0, tzinfo=NY)
+    assert calendar.next_open(saturday) == datetime(2025, 7, 7, 9, 30, tzinfo=NY)
+
+    # Quotes fetched over the weekend are kept until Monday's open
+    assert calendar.quote_ttl(60, saturday) == (calendar.next_open(saturday) - saturday).total_seconds()
+    assert calendar.quote_ttl(60, datetime(2025, 7, 3, 12, 0, tzinfo=NY)) == 60
+
+def test_due_symbols_policy():
+    """Test staleness budgets in session and that closed markets need only the last close."""
+    calendar = _calendar()
+    in_session = datetime(2025, 7, 2, 11, 0, tzinfo=NY)
+    last_updated = {
+        "AAPL": (in_session - timedelta(minutes=10)).isoformat(),
+        "MSFT": (in_session - timedelta(minutes=2)).isoformat(),
+        "SPY": (in_session - timedelta(minutes=2)).isoformat(),
+        "NVDA": None
+    }
+    # Never-priced first, then the stalest; MSFT is within its 5 minute budget, SPY is not within 1 minute
+    assert calendar.due_symbols(last_updated, in_session) == ["NVDA", "AAPL", "SPY"]
+    assert calendar.due_symbols(last_updated, in_session, limit=2) == ["NVDA", "AAPL"]
+
+    saturday = datetime(2025, 7, 5, 12, 0, tzinfo=NY)
+    weekend = {
+        "AAPL": datetime(2025, 7, 3, 12, 59, tzinfo=NY).isoformat(),   # before the close
+        "MSFT": datetime(2025, 7, 3, 13, 30, tzinfo=NY).isoformat(),   # settled close
+        "NVDA": datetime(2025, 7, 5, 9, 0, tzinfo=NY).isoformat()
+    }
+    assert calendar.due_symbols(weekend, saturday) == ["AAPL"]
+
+def test_other_markets_ignore_sessions():
+    """Test that crypto, futures and foreign listings are refreshed on their budget while the exchange is closed."""
+    calendar = _calendar()
+    saturday = datetime(2025, 7, 5, 12, 0, tzinfo=NY)
+    stale = (saturday - timedelta(minutes=10)).isoformat()
+    last_updated = {"AAPL": stale, "BRK-B": stale, "BTC-USD": stale, "CL=F": stale, "VOD.L": stale,
+                    "ETH-USD": (saturday - timedelta(minutes=1)).isoformat()}
+    assert calendar.due_symbols(last_updated, saturday) == ["BTC-USD", "CL=F", "VOD.L"]
+
+    # Their quotes are not kept until Monday's open
+    assert calendar.quote_ttl(60, saturday, symbol="BTC-USD") == 60
+    assert calendar.quote_ttl(60, saturday, symbol="AAPL") > 60
+
+def test_warns_past_last_calendar_year(capsys):
+    """Test that a date past the last listed holiday year warns once."""
+    calendar = _calendar()
+    assert calendar.is_trading_day(datetime(2025, 7, 7).date())
+    assert "Warning" not in capsys.readouterr().out
+
+    assert calendar.is_trading_day(datetime(2026, 7, 3).date())
+    calendar.is_trading_day(datetime(2026, 7, 6).date())
+    assert capsys.readouterr().out.count("no holidays after 2025") == 1
+
+def test_shared_calendar_file():
+    """Test that the bundled calendar file loads."""
+    calendar = MarketCalendar()
+    assert calendar.exchange == "NYSE"
+    assert not calendar.is_trading_day(datetime(2026, 12, 25).date())
+
+if __name__ == "__main__":
+    test_sessions_and_holidays()
+    test_due_symbols_policy()
+    test_other_markets_ignore_sessions()
+    test_shared_calendar_file()
@@ -0,0 +1,142 @@
+"""
+Test module for the market data providers.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+import pytest
+from yfinance.exceptions import YFRateLimitError, YFTzMissingError
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.market_data import (ReplayProvider, YFinanceProvider, RateLimitError, record_history,
+                                   get_provider, set_provider)
+from app.utils.finance import get_current_prices, get_price_series
+from app.utils.history_store import HistoryStore
+
+AS_OF = date(2025, 10, 8)
+
+def test_synthetic_replay_is_deterministic():
+    """Test that two replay providers return identical synthetic data."""
+    first = ReplayProvider(as_of=AS_OF)
+    second = ReplayProvider(as_of=AS_OF)
+
+    assert first.get_quotes(["AAPL", "MSFT"]) == second.get_quotes(["AAPL", "MSFT"])
+    assert first.get_quote("AAPL") != first.get_quote("MSFT")
+
+    history = first.get_history("AAPL", AS_OF - timedelta(days=30), AS_OF + timedelta(days=1))
+    assert len(history) > 15
+    assert history.index[-1].date() <= AS_OF
+    assert round(float(history["Close"].iloc[-1]), 2) == first.get_quote("AAPL")
+
+def test_replay_from_recorded_files():
+    """Test that recorded CSV files replay the same bars."""
+    source = ReplayProvider(as_of=AS_OF, seed=7)
+    start = AS_OF - timedelta(days=60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorded = record_history(["NVDA"], Path(tmp), start, AS_OF + timedelta(days=1), source=source)
+        assert recorded == ["NVDA"]
+
+        replay = ReplayProvider(data_dir=Path(tmp), synthetic=False, as_of=AS_OF)
+        original = source.get_history("NVDA", start, AS_OF + timedelta(days=1))
+        replayed = replay.get_history("NVDA", start, AS_OF + timedelta(days=1))
+        assert list(replayed["Close"]) == list(original["Close"])
+
+        # Symbols without a recording are unknown when synthetic data is off
+        assert replay.get_quote("AMD") is None
+
+def test_latency_and_invalid_symbols():
+    """Test simulated latency accounting and unknown symbols."""
+    provider = ReplayProvider(latency=0.01, invalid_symbols=["FAKE"])
+    quotes = provider.get_quotes(["AAPL", "FAKE"])
+
+    assert quotes["FAKE"] is None
+    assert quotes["AAPL"] is not None
+    assert provider.requests == 1
+
+def test_finance_reads_through_provider():
+    """Test that the finance utilities use the active provider."""
+    previous = get_provider()
+    provider = ReplayProvider(as_of=AS_OF)
+    set_provider(provider)
+    try:
+        prices = get_current_prices(["AAPL", "MSFT", "AAPL"])
+        assert prices == provider.get_quotes(["AAPL", "MSFT"])
+
+        # History lookups are relative to the real date; bars go to a throwaway store
+        set_provider(ReplayProvider())
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch("app.utils.finance.history_store", HistoryStore(root=tmp)):
+            series = get_price_series("AAPL", months=3)
+        assert len(series["dates"]) == len(series["closes"]) > 0
+        print(f"✓ Replayed {len(series['closes'])} closes for AAPL")
+    finally:
+        set_provider(previous)
+
+class FakeTicker:
+    """Stands in for yf.Ticker: one slow chart request per symbol, tracking how many overlap."""
+
+    running = 0
+    overlap = 0
+    lock = threading.Lock()
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, **kwargs):
+        with FakeTicker.lock:
+            FakeTicker.running += 1
+            FakeTicker.overlap = max(FakeTicker.overlap, FakeTicker.running)
+        try:
+            time.sleep(0.05)
+            if self.symbol == "LIMITED":
+                raise YFRateLimitError()
+            if self.symbol == "FAKE":
+                raise YFTzMissingError(self.symbol)
+            if self.symbol == "DOWN":
+                raise ConnectionError("connection reset")
+            return pd.DataFrame({"Close": [100.0, 101.234]})
+        finally:
+            with FakeTicker.lock:
+                FakeTicker.running -= 1
+
+def test_yfinance_quotes_run_concurrently():
+    """Test that yfinance quote calls overlap, report unknown symbols as None and surface failures."""
+    provider = YFinanceProvider()
+    FakeTicker.overlap = 0
+    with mock.patch("app.utils.market_data.yf.Ticker", FakeTicker):
+        results = []
+        calls = [threading.Thread(target=lambda: results.append(provider.get_quotes(["AAPL", "FAKE"])))
+                 for _ in range(3)]
+        for call in calls:
+            call.start()
+        for call in calls:
+            call.join()
+
+        assert results == [{"AAPL": 101.23, "FAKE": None}] * 3
+        # Calls from different threads are not serialized behind each other
+        assert FakeTicker.overlap > 2
+
+        with pytest.raises(RateLimitError):
+            provider.get_quotes(["AAPL", "LIMITED"])
+
+        # A failed request is not an unknown symbol: it is left out or raised
+        assert provider.get_quotes(["AAPL", "DOWN"]) == {"AAPL": 101.23}
+        with pytest.raises(ConnectionError):
+            provider.get_quote("DOWN")
+
+if __name__ == "__main__":
+    test_synthetic_replay_is_deterministic()
+    test_replay_from_recorded_files()
+    test_latency_and_invalid_symbols()
+    test_finance_reads_through_provider()
+    test_yfinance_quotes_run_concurrently()
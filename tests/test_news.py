@@ -3,37 +3,72 @@ Test module for the news utility.
 """
 import sys
 import os
+import tempfile
+import time
 import unittest
-from app.utils.news import get_news_for_stock
+from pathlib import Path
+from unittest import mock
+from app.utils.news import get_news_for_stock, iter_news_for_stocks, NEWS_CONCURRENCY
+from app.utils.news_cache import NewsCache
 
 class NewsTest(unittest.TestCase):
     """Test case for news utility functions."""
     
     def test_get_news_for_stock_with_agent(self):
         """Test getting news for a stock symbol using the news agent."""
-        # Test with a tech company symbol
-        news_items = get_news_for_stock("AAPL", count=2)
+        # A private cache, so test digests never reach the shared data/news_cache.json
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch("app.utils.news.news_cache", NewsCache(Path(tmp) / "news_cache.json")):
+            # Test with a tech company symbol
+            news_items = get_news_for_stock("AAPL", count=2)
         
-        # Verify we got some news items
-        self.assertIsNotNone(news_items)
-        self.assertGreater(len(news_items), 0)
+            # Verify we got some news items
+            self.assertIsNotNone(news_items)
+            self.assertGreater(len(news_items), 0)
         
-        # Verify the structure of the first news item
-        first_item = news_items[0]
-        self.assertIn("headline", first_item)
-        self.assertIn("snippet", first_item)
-        self.assertIn("date", first_item)
-        self.assertIn("source", first_item)
-        self.assertIn("symbol", first_item)
+            # Verify the structure of the first news item
+            first_item = news_items[0]
+            self.assertIn("headline", first_item)
+            self.assertIn("snippet", first_item)
+            self.assertIn("date", first_item)
+            self.assertIn("source", first_item)
+            self.assertIn("symbol", first_item)
         
-        # Verify the symbol is correctly set
-        self.assertEqual(first_item["symbol"], "AAPL")
+            # Verify the symbol is correctly set
+            self.assertEqual(first_item["symbol"], "AAPL")
         
-        # Test with a finance company symbol
-        news_items = get_news_for_stock("JPM", count=1)
-        self.assertIsNotNone(news_items)
-        self.assertGreater(len(news_items), 0)
-        self.assertEqual(news_items[0]["symbol"], "JPM")
+            # Test with a finance company symbol
+            news_items = get_news_for_stock("JPM", count=1)
+            self.assertIsNotNone(news_items)
+            self.assertGreater(len(news_items), 0)
+            self.assertEqual(news_items[0]["symbol"], "JPM")
+
+    def test_iter_news_for_stocks_runs_in_parallel(self):
+        """Test that news for several symbols is fetched concurrently and yielded as it arrives."""
+        delays = {"AAA": 0.3, "BBB": 0.1, "CCC": 0.2}
+
+        def fake_workflow(symbol):
+            time.sleep(delays[symbol])
+            return {"final_verdict": f"{symbol} verdict", "urls": []}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = NewsCache(Path(tmp) / "news_cache.json")
+            with mock.patch("app.utils.news.run_workflow", side_effect=fake_workflow), \
+                 mock.patch("app.utils.news.news_cache", cache):
+                started = time.perf_counter()
+                order = [symbol for symbol, items in iter_news_for_stocks(["AAA", "BBB", "CCC", "AAA"], count=1)]
+                elapsed = time.perf_counter() - started
+
+                # Results stream in completion order, each symbol once
+                self.assertEqual(order, ["BBB", "CCC", "AAA"])
+                if NEWS_CONCURRENCY >= 3:
+                    self.assertLess(elapsed, 0.5)
+
+                # A second render is served from the cache without running the workflow
+                started = time.perf_counter()
+                items = dict(iter_news_for_stocks(["AAA", "BBB", "CCC"], count=1))
+                self.assertLess(time.perf_counter() - started, 0.1)
+                self.assertEqual(items["AAA"][0]["snippet"], "AAA verdict")
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,128 @@
+"""
+Test module for the shared news digest cache.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.news_cache import NewsCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def _loader(calls, delay=0.0, fail=()):
+    def load(symbol):
+        calls.append(symbol)
+        time.sleep(delay)
+        if symbol in fail:
+            return None
+        return [{"headline": f"{symbol} digest {len(calls)}", "symbol": symbol}]
+    return load
+
+def test_hits_are_shared_and_persisted():
+    """Test that one fetch serves every caller and survives a restart."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "news_cache.json"
+        calls = []
+        cache = NewsCache(path, ttl=60, clock=FakeClock())
+
+        # Concurrent misses for one symbol run the loader once
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("AAPL", _loader(calls, delay=0.05))))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == ["AAPL"]
+        assert all(result == [{"headline": "AAPL digest 1", "symbol": "AAPL"}] for result in results)
+
+        # Callers get copies
+        results[0][0]["headline"] = "changed"
+        assert cache.get("AAPL", _loader(calls))[0]["headline"] == "AAPL digest 1"
+
+        restarted = NewsCache(path, ttl=60, clock=FakeClock())
+        assert restarted.get("AAPL", _loader(calls))[0]["headline"] == "AAPL digest 1"
+        assert calls == ["AAPL"]
+        print(f"Cache stats: {cache.stats()}")
+
+def test_stale_while_revalidate():
+    """Test that an expired digest is served immediately while it is refreshed in the background."""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        calls = []
+        cache = NewsCache(Path(tmp) / "news_cache.json", ttl=60, clock=clock)
+        cache.get("MSFT", _loader(calls))
+
+        clock.now += 61
+        started = time.perf_counter()
+        stale = cache.get("MSFT", _loader(calls, delay=0.2))
+        assert time.perf_counter() - started < 0.1, "stale hits must not wait for the refresh"
+        assert stale[0]["headline"] == "MSFT digest 1"
+        # A second stale hit does not start another refresh
+        cache.get("MSFT", _loader(calls, delay=0.2))
+
+        assert cache.wait(timeout=5)
+        assert calls == ["MSFT", "MSFT"]
+        assert cache.get("MSFT", _loader(calls))[0]["headline"] == "MSFT digest 2"
+        assert cache.stats()["refreshes"] == 1
+
+def test_failed_fetches_are_retried_later():
+    """Test that a failed fetch is remembered for the retry TTL instead of re-running every call."""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        calls = []
+        cache = NewsCache(Path(tmp) / "news_cache.json", ttl=3600, retry_ttl=300, clock=clock)
+        assert cache.get("FAKE", _loader(calls, fail={"FAKE"})) is None
+        assert cache.get("FAKE", _loader(calls, fail={"FAKE"})) is None
+        assert calls == ["FAKE"]
+
+        clock.now += 301
+        cache.get("FAKE", _loader(calls))
+        assert cache.wait(timeout=5)
+        assert cache.get("FAKE", _loader(calls))[0]["headline"] == "FAKE digest 2"
+
+def test_failed_refresh_keeps_the_last_digest():
+    """Test that a failed refresh keeps serving the previous digest and retries after the retry TTL."""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        calls = []
+        cache = NewsCache(Path(tmp) / "news_cache.json", ttl=60, retry_ttl=300, clock=clock)
+        cache.get("NVDA", _loader(calls))
+
+        def broken(symbol):
+            calls.append(symbol)
+            raise RuntimeError("agent unavailable")
+
+        clock.now += 61
+        assert cache.get("NVDA", broken)[0]["headline"] == "NVDA digest 1"
+        assert cache.wait(timeout=5)
+        assert cache.retrying("NVDA")
+
+        # The old digest is served (also to other processes) without retrying before retry_ttl
+        assert cache.get("NVDA", broken)[0]["headline"] == "NVDA digest 1"
+        reader = NewsCache(Path(tmp) / "news_cache.json", ttl=60, retry_ttl=300, clock=clock)
+        assert reader.get("NVDA", broken)[0]["headline"] == "NVDA digest 1"
+        assert calls == ["NVDA", "NVDA"]
+
+        clock.now += 301
+        cache.get("NVDA", _loader(calls))
+        assert cache.wait(timeout=5)
+        assert cache.get("NVDA", _loader(calls))[0]["headline"] == "NVDA digest 3"
+        assert not cache.retrying("NVDA")
+
+if __name__ == "__main__":
+    test_hits_are_shared_and_persisted()
+    test_stale_while_revalidate()
+    test_failed_fetches_are_retried_later()
+    test_failed_refresh_keeps_the_last_digest()
@@ -0,0 +1,91 @@
+"""
+Test module for the news pre-warming worker.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.holdings_index import HoldingsIndex
+from app.utils.news_cache import NewsCache
+from app.src.news_prewarm import plan_prewarm, prewarm_news
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def _write_portfolios(users, portfolios):
+    for username, symbols in portfolios.items():
+        (users / username).mkdir(parents=True, exist_ok=True)
+        (users / username / "portfolio.json").write_text(json.dumps([{"stock_code": s, "quantity": 1} for s in symbols]))
+
+def _fake_batch(calls, fail=()):
+    def fetch(symbols):
+        calls.append(list(symbols))
+        items = {s: None if s in fail else [{"headline": f"{s} digest", "symbol": s}] for s in symbols}
+        return items, {"tokens": {"total_tokens": 10 * len(symbols), "llm_calls": 3 * len(symbols)}}
+    return fetch
+
+def test_plan_orders_missing_then_widely_held_then_oldest():
+    """Test that never-fetched symbols come first, then by holder count and digest age."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users = Path(tmp) / "users"
+        _write_portfolios(users, {"alice": ["AAPL", "MSFT", "NVDA"], "bob": ["AAPL", "MSFT"], "carol": ["AAPL", "AMD"]})
+        index = HoldingsIndex(users, Path(tmp) / "index.json")
+        clock = FakeClock()
+        cache = NewsCache(Path(tmp) / "news_cache.json", ttl=3600, clock=clock)
+
+        # AAPL and MSFT digests are old, NVDA's is fresh, AMD was never fetched
+        loader = lambda symbol: [{"headline": symbol}]
+        cache.refresh("MSFT", loader)
+        clock.now += 10
+        cache.refresh("AAPL", loader)
+        clock.now += 990
+        cache.refresh("NVDA", loader)
+        clock.now += 2500
+
+        plan = plan_prewarm(index, cache, lead=600)
+        print(f"Pre-warm plan: {plan}")
+        assert [entry["symbol"] for entry in plan] == ["AMD", "AAPL", "MSFT"]
+        assert plan[1]["holders"] == 3
+
+def test_prewarm_pass_fills_the_cache():
+    """Test that a pass stores digests get_news_for_stock can serve and picks up new holdings."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users = Path(tmp) / "users"
+        _write_portfolios(users, {"alice": ["AAPL", "MSFT"], "bob": ["NVDA"]})
+        index = HoldingsIndex(users, Path(tmp) / "index.json")
+        cache_path = Path(tmp) / "news_cache.json"
+        clock = FakeClock()
+        cache = NewsCache(cache_path, ttl=3600, clock=clock)
+
+        calls = []
+        with mock.patch("app.src.news_prewarm.fetch_agent_news_batch", _fake_batch(calls, fail={"NVDA"})):
+            report = prewarm_news(index, cache, batch_size=2)
+            print(f"Pre-warm report: {report}")
+            assert calls == [["AAPL", "MSFT"], ["NVDA"]]
+            assert report["refreshed"] == 2 and report["failed"] == ["NVDA"]
+            assert report["tokens"] == {"total_tokens": 30, "llm_calls": 9}
+
+            # Another process (the UI) serves the digests without running the agent
+            reader = NewsCache(cache_path, ttl=3600, clock=clock)
+            assert reader.get("AAPL", lambda symbol: 1 / 0)[0]["headline"] == "AAPL digest"
+
+            # Nothing is due until a new symbol is bought or the failed one may be retried
+            calls.clear()
+            assert prewarm_news(index, cache)["due"] == 0
+            _write_portfolios(users, {"carol": ["AMD"]})
+            prewarm_news(index, cache)
+            assert calls == [["AMD"]]
+
+if __name__ == "__main__":
+    test_plan_orders_missing_then_widely_held_then_oldest()
+    test_prewarm_pass_fills_the_cache()
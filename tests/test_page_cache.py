@@ -0,0 +1,175 @@
+"""
+Test module for the on-disk page cache, against a local HTTP server standing in for news sites.
+"""
+
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from agents.page_cache import PageCache, normalize_url
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves /etag/<name> with an ETag, /dated/<name> with Last-Modified and /big/<name> without validators."""
+    protocol_version = "HTTP/1.1"
+    version = "1"
+    keep_alive = True
+    requests_seen = []
+
+    def do_GET(self):
+        SiteHandler.requests_seen.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        name = self.path.rsplit("/", 1)[-1].split("?")[0]
+        headers = {}
+        if self.path.startswith("/etag/"):
+            headers["ETag"] = f'"{name}-v{SiteHandler.version}"'
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                return self._reply(304, b"", headers)
+        elif self.path.startswith("/dated/"):
+            headers["Last-Modified"] = "Mon, 05 Oct 2026 10:00:00 GMT"
+            if self.headers.get("If-Modified-Since") == headers["Last-Modified"]:
+                return self._reply(304, b"", headers)
+        size = 2000 if self.path.startswith("/big/") else 1
+        body = f"<html><body><p>{name} v{SiteHandler.version} {'x' * size}</p></body></html>".encode("utf-8")
+        self._reply(200, body, {**headers, "Content-Type": "text/html; charset=utf-8"})
+
+    def _reply(self, status, body, headers):
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header("Content-Length", str(len(body)))
+        if not SiteHandler.keep_alive:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _serve():
+    SiteHandler.version = "1"
+    SiteHandler.keep_alive = True
+    SiteHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_normalize_url():
+    """Test that variants of one page share a key."""
+    assert normalize_url("HTTPS://Example.COM:443/news?b=2&utm_source=x&a=1#top") == "https://example.com/news?a=1&b=2"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+def test_hits_and_conditional_revalidation():
+    """Test that fresh pages are served from disk and expired ones are revalidated with their validators."""
+    server, base = _serve()
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        cache = PageCache(Path(tmp) / "pages.db", default_ttl=60, clock=clock)
+        try:
+            url = f"{base}/etag/nvda"
+            assert cache.fetch(url).startswith("nvda v1")
+            assert cache.fetch(url + "#comments").startswith("nvda v1")
+            assert len(SiteHandler.requests_seen) == 1
+
+            # Expired: a conditional request answered with 304 keeps the cached text
+            clock.now += 61
+            assert cache.fetch(url).startswith("nvda v1")
+            assert SiteHandler.requests_seen[-1][1] == '"nvda-v1"'
+
+            # Last-Modified works the same way
+            dated = f"{base}/dated/amd"
+            cache.fetch(dated)
+            clock.now += 61
+            cache.fetch(dated)
+            assert SiteHandler.requests_seen[-1][2] == "Mon, 05 Oct 2026 10:00:00 GMT"
+
+            # A changed page is downloaded again
+            SiteHandler.version = "2"
+            clock.now += 61
+            assert cache.fetch(url).startswith("nvda v2")
+
+            # The cache survives a restart
+            restarted = PageCache(Path(tmp) / "pages.db", default_ttl=60, clock=clock)
+            assert restarted.fetch(url).startswith("nvda v2")
+            assert restarted.stats()["hits"] == 1
+
+            stats = cache.stats()
+            print(f"Page cache stats: {stats}")
+            assert (stats["hits"], stats["revalidated"], stats["misses"], stats["refreshed"]) == (1, 2, 2, 1)
+            assert stats["hit_rate"] == 0.5
+        finally:
+            cache.close()
+            server.shutdown()
+
+def test_domain_ttls_and_offline_fallback():
+    """Test per-domain TTLs and that a stale page is served when the site is unreachable."""
+    server, base = _serve()
+    # No pooled connection may outlive the server
+    SiteHandler.keep_alive = False
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        cache = PageCache(Path(tmp) / "pages.db", default_ttl=60, domain_ttls={"127.0.0.1": 600, "sec.gov": 86400}, clock=clock)
+        assert cache.ttl("https://www.sec.gov/filing") == 86400
+        assert cache.ttl("https://example.com/") == 60
+
+        url = f"{base}/etag/msft"
+        cache.fetch(url)
+        clock.now += 300
+        cache.fetch(url)
+        assert len(SiteHandler.requests_seen) == 1
+
+        server.shutdown()
+        server.server_close()
+        clock.now += 600
+        assert cache.fetch(url).startswith("msft v1")
+        assert cache.stats()["stale"] == 1
+        try:
+            cache.fetch(f"{base}/etag/never-cached")
+            assert False, "expected a connection error"
+        except Exception:
+            pass
+
+def test_size_bound_evicts_least_recently_used():
+    """Test that the database stays within max_bytes by evicting the least recently used pages."""
+    server, base = _serve()
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        cache = PageCache(Path(tmp) / "pages.db", max_bytes=1700, default_ttl=3600, clock=clock)
+        try:
+            for name in ("a", "b", "c"):
+                cache.fetch(f"{base}/big/{name}")
+                clock.now += 1
+            # Reading "a" makes "b" the least recently used page
+            cache.fetch(f"{base}/big/a")
+            clock.now += 1
+            cache.fetch(f"{base}/big/d")
+
+            stats = cache.stats()
+            assert stats["entries"] == 3 and stats["bytes"] <= 1700
+            assert stats["evictions"] == 1
+            requests_before = len(SiteHandler.requests_seen)
+            cache.fetch(f"{base}/big/a")
+            assert len(SiteHandler.requests_seen) == requests_before
+            cache.fetch(f"{base}/big/b")
+            assert len(SiteHandler.requests_seen) == requests_before + 1
+        finally:
+            server.shutdown()
+
+if __name__ == "__main__":
+    test_normalize_url()
+    test_hits_and_conditional_revalidation()
+    test_domain_ttls_and_offline_fallback()
+    test_size_bound_evicts_least_recently_used()
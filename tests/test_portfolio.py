@@ -0,0 +1,94 @@
+"""
+Test module for the array-backed Portfolio model.
+"""
+
+import copy
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.portfolio import Portfolio
+
+HOLDINGS = [
+    {"company_name": "Apple Inc.", "stock_code": "AAPL", "quantity": 10, "purchase_price": 150.0},
+    {"company_name": "Microsoft Corporation", "stock_code": "MSFT", "quantity": 5, "purchase_price": 300.0,
+     "current_price": 310.0, "value": 1550.0},
+    {"company_name": "Made Up Company", "stock_code": "FAKE", "quantity": 20, "purchase_price": 50.0},
+    {"company_name": "Apple Inc.", "stock_code": "AAPL", "quantity": 2, "purchase_price": 100.0}
+]
+
+def test_revalue_and_json_round_trip():
+    """Test vectorized revaluation writes the portfolio.json fields and keeps other keys."""
+    holdings = copy.deepcopy(HOLDINGS)
+    portfolio = Portfolio(holdings)
+    updated = portfolio.revalue({"AAPL": 200.0, "MSFT": 320.0, "FAKE": None}, "2025-01-01T00:00:00")
+
+    assert updated == 3
+    data = portfolio.to_json()
+    assert data is holdings and data[0]["company_name"] == "Apple Inc."
+    assert data[0]["value"] == 2000.0 and data[0]["total_return"] == 500.0 and data[0]["percent_return"] == 33.33
+    assert data[3]["percent_return"] == 100.0 and data[3]["last_updated"] == "2025-01-01T00:00:00"
+    assert "current_price" not in data[2], "holdings without a price are left as they are"
+
+    totals = portfolio.totals()
+    assert totals["value"] == 2000.0 + 1600.0 + 400.0
+    assert totals["cost_basis"] == 1500.0 + 1500.0 + 1000.0 + 200.0
+    assert totals["total_return"] == totals["value"] - totals["cost_basis"]
+
+    # Reloading the saved file gives the same totals
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "portfolio.json"
+        portfolio.save(path)
+        assert Portfolio.load(path).totals() == totals
+
+def test_fallback_prices():
+    """Test the updater fallbacks: existing price first, then purchase price."""
+    portfolio = Portfolio(copy.deepcopy(HOLDINGS))
+    assert portfolio.revalue({}, fallback=True) == 4
+
+    data = portfolio.to_json()
+    assert data[1]["current_price"] == 310.0
+    assert data[2]["value"] == 1000.0 and data[2]["total_return"] == 0.0
+
+    # Fallback prices are not fresh prices: the holdings keep their timestamp and unknown price
+    assert "current_price" not in data[2]
+    assert all("last_updated" not in stock for stock in data)
+
+def test_fallback_holdings_stay_due():
+    """Test that only holdings priced from the fetched prices are stamped as updated."""
+    from app.src.portfolio_updater import symbol_last_updated
+    holdings = copy.deepcopy(HOLDINGS)
+    holdings[1]["last_updated"] = "2025-01-01T00:00:00"
+    portfolio = Portfolio(holdings)
+    portfolio.revalue({"AAPL": 200.0, "MSFT": None, "FAKE": None}, "2025-06-01T00:00:00", fallback=True)
+
+    last_updated = symbol_last_updated(portfolio.to_json())
+    assert last_updated == {"AAPL": "2025-06-01T00:00:00", "MSFT": "2025-01-01T00:00:00", "FAKE": None}
+
+def test_incremental_price_update():
+    """Test that single-symbol updates keep the running total equal to a full recompute."""
+    rng = np.random.default_rng(0)
+    holdings = [
+        {"stock_code": f"SYM{i % 50}", "quantity": int(rng.integers(1, 100)), "purchase_price": float(rng.uniform(10, 100))}
+        for i in range(500)
+    ]
+    portfolio = Portfolio(holdings)
+    portfolio.revalue({f"SYM{i}": float(rng.uniform(10, 100)) for i in range(50)})
+
+    for _ in range(200):
+        symbol = f"SYM{rng.integers(50)}"
+        assert portfolio.update_price(symbol, round(float(rng.uniform(10, 100)), 2)) == 10
+
+    assert np.isclose(portfolio.total_value, Portfolio(holdings).total_value)
+    assert portfolio.update_price("UNKNOWN", 1.0) == 0
+
+if __name__ == "__main__":
+    test_revalue_and_json_round_trip()
+    test_fallback_prices()
+    test_fallback_holdings_stay_due()
+    test_incremental_price_update()
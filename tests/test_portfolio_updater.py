@@ -3,6 +3,7 @@ Test script for the portfolio updater functionality.
 """
 
 import os
+import tempfile
 import time
 from pathlib import Path
 import json
@@ -11,49 +12,61 @@ import sys
 # Ensure the app module is in the path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from app.src.portfolio_updater import update_portfolio_with_fallbacks, update_portfolio_in_background
+import threading
+
+from app.src.portfolio_updater import (update_portfolio_with_fallbacks, update_portfolio_in_background, RefreshScheduler,
+                                       refresh_scheduler, add_holding, symbol_last_updated)
+from app.utils.market_data import ReplayProvider, get_provider, set_provider
+from app.utils.portfolio import Portfolio
+from app.utils import storage
 from app.utils.storage import user_dir, read_json
 
 def test_update_functionality():
     """Test the portfolio updater functionality."""
     print("Testing portfolio updater functionality...")
     
-    # Select a test user
+    # Work on a throwaway user tree, so neither the tracked sample users nor the shared
+    # holdings index (which only follows data/users) are touched
     username = "testuser"
-    
-    # Create a test portfolio if it doesn't exist
+    previous_base = storage.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.BASE = Path(tmp) / "users"
+        try:
+            _run_update_functionality(username)
+        finally:
+            storage.BASE = previous_base
+
+def _run_update_functionality(username):
+    # Create a test portfolio
     portfolio_path = user_dir(username) / "portfolio.json"
     
-    if not portfolio_path.exists():
-        print(f"Creating test portfolio for {username}...")
-        test_portfolio = [
-            {
-                "company_name": "Apple Inc.",
-                "stock_code": "AAPL",
-                "quantity": 10,
-                "purchase_price": 150.00
-            },
-            {
-                "company_name": "Microsoft Corporation",
-                "stock_code": "MSFT",
-                "quantity": 5,
-                "purchase_price": 300.00
-            },
-            {
-                "company_name": "Made Up Company",
-                "stock_code": "FAKE",  # This should trigger fallback logic
-                "quantity": 20,
-                "purchase_price": 50.00
-            }
-        ]
-        
-        # Write test portfolio
-        with portfolio_path.open('w', encoding='utf-8') as f:
-            json.dump(test_portfolio, f, indent=2, ensure_ascii=False)
-        
-        print("Test portfolio created.")
-    else:
-        print("Using existing test portfolio.")
+    print(f"Creating test portfolio for {username}...")
+    test_portfolio = [
+        {
+            "company_name": "Apple Inc.",
+            "stock_code": "AAPL",
+            "quantity": 10,
+            "purchase_price": 150.00
+        },
+        {
+            "company_name": "Microsoft Corporation",
+            "stock_code": "MSFT",
+            "quantity": 5,
+            "purchase_price": 300.00
+        },
+        {
+            "company_name": "Made Up Company",
+            "stock_code": "FAKE",  # This should trigger fallback logic
+            "quantity": 20,
+            "purchase_price": 50.00
+        }
+    ]
+    
+    # Write test portfolio
+    with portfolio_path.open('w', encoding='utf-8') as f:
+        json.dump(test_portfolio, f, indent=2, ensure_ascii=False)
+    
+    print("Test portfolio created.")
     
     # Test direct update function
     print("\nTesting direct update function:")
@@ -77,8 +90,9 @@ def test_update_functionality():
     print("\nTesting background update function:")
     update_portfolio_in_background(username)
     print("Background update initiated.")
-    print("Waiting 3 seconds for background thread to complete...")
-    time.sleep(3)
+    print("Waiting for the background refresh to complete...")
+    # The refresh must not outlive the temporary user tree
+    refresh_scheduler.wait(username, timeout=30)
     
     # Check if portfolio was updated again
     portfolio = read_json(portfolio_path)
@@ -92,5 +106,76 @@ def test_update_functionality():
     
     print("\nTest completed.")
 
+def test_refresh_scheduler_coalesces():
+    """Test that repeated requests share one refresh and respect the minimum interval."""
+    release = threading.Event()
+    calls = []
+    
+    def slow_refresh(username):
+        calls.append(username)
+        release.wait(5)
+        return True
+    
+    now = [0.0]
+    scheduler = RefreshScheduler(slow_refresh, max_workers=2, min_interval=60, clock=lambda: now[0])
+    
+    # A burst of UI reruns starts a single refresh
+    assert scheduler.request("alice")
+    assert not any(scheduler.request("alice") for _ in range(10))
+    assert scheduler.status("alice")["running"]
+    
+    # An explicit update queues exactly one more
+    assert scheduler.request("alice", force=True)
+    assert not scheduler.request("alice", force=True)
+    
+    release.set()
+    assert scheduler.wait("alice", timeout=5)
+    assert calls == ["alice", "alice"]
+    status = scheduler.status("alice")
+    assert status["last_success"] and status["last_refresh"] and not status["running"]
+    
+    # Automatic requests within the minimum interval are skipped
+    now[0] = 30
+    assert not scheduler.request("alice")
+    now[0] = 61
+    assert scheduler.request("alice")
+    assert scheduler.wait("alice", timeout=5)
+    assert len(calls) == 3
+    print(f"✓ {len(calls)} refreshes for 15 requests")
+
+def test_add_holding_to_held_symbol():
+    """Test that adding to a held symbol keeps the rows and the totals in agreement until the next refresh."""
+    previous_base, previous_provider = storage.BASE, get_provider()
+    set_provider(ReplayProvider())
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.BASE = Path(tmp) / "users"
+        try:
+            username = "lots"
+            portfolio_path = user_dir(username) / "portfolio.json"
+            assert add_holding(username, "AAPL", 10, 100.0)
+            assert update_portfolio_with_fallbacks(username)
+            priced = read_json(portfolio_path)[0]
+            assert priced.get("last_updated")
+
+            # The new lot is valued at the held price and the symbol becomes due again
+            assert add_holding(username, "AAPL", 10, 120.0)
+            portfolio = read_json(portfolio_path)
+            assert len(portfolio) == 2 and portfolio[0] == priced
+            assert portfolio[1]["current_price"] == priced["current_price"]
+            assert "last_updated" not in portfolio[1]
+            assert round(sum(stock["value"] for stock in portfolio), 2) == Portfolio(portfolio).totals()["value"]
+            assert symbol_last_updated(portfolio) == {"AAPL": None}
+
+            # The next refresh reprices every lot of the symbol
+            assert update_portfolio_with_fallbacks(username)
+            portfolio = read_json(portfolio_path)
+            assert all(stock.get("last_updated") for stock in portfolio)
+            assert round(sum(stock["value"] for stock in portfolio), 2) == Portfolio(portfolio).totals()["value"]
+        finally:
+            storage.BASE = previous_base
+            set_provider(previous_provider)
+
 if __name__ == "__main__":
     test_update_functionality()
+    test_refresh_scheduler_coalesces()
+    test_add_holding_to_held_symbol()
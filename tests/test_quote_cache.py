@@ -0,0 +1,130 @@
+"""
+Test module for the shared quote cache.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.quote_cache import QuoteCache
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_expiry_and_counters():
+    """Test that entries are served until their TTL expires."""
+    clock = FakeClock()
+    cache = QuoteCache(ttl=60, maxsize=10, clock=clock)
+    calls = []
+
+    def loader(symbol):
+        calls.append(symbol)
+        return 100.0
+
+    assert cache.get("AAPL", loader) == 100.0
+    assert cache.get("AAPL", loader) == 100.0
+    assert calls == ["AAPL"]
+
+    # After the TTL the entry is fetched again
+    clock.now = 61
+    cache.get("AAPL", loader)
+    assert calls == ["AAPL", "AAPL"]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    print(f"✓ Cache stats: {stats}")
+
+def test_per_key_ttl():
+    """Test that a TTL function gives each loaded key its own lifetime."""
+    clock = FakeClock()
+    cache = QuoteCache(ttl=60, maxsize=10, clock=clock)
+    cache.get_many(["AAPL", "BTC-USD"], lambda symbols: dict.fromkeys(symbols, 1.0),
+                   ttl=lambda symbol: 60 if symbol == "BTC-USD" else 3600)
+
+    clock.now = 61
+    assert cache.peek("AAPL") == 1.0
+    assert cache.peek("BTC-USD") is None
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted when full."""
+    cache = QuoteCache(ttl=60, maxsize=2)
+    cache.set("AAPL", 1.0)
+    cache.set("MSFT", 2.0)
+
+    # Touch AAPL so MSFT becomes least recently used
+    cache.get("AAPL", lambda symbol: None)
+    cache.set("NVDA", 3.0)
+
+    assert cache.peek("AAPL") == 1.0
+    assert cache.peek("MSFT") is None
+    assert cache.peek("NVDA") == 3.0
+    assert cache.stats()["evictions"] == 1
+
+def test_failed_loads_are_not_cached():
+    """Test that a None result is retried on the next lookup."""
+    cache = QuoteCache(ttl=60, maxsize=10)
+    calls = []
+
+    def loader(symbol):
+        calls.append(symbol)
+        return None
+
+    assert cache.get("FAKE", loader) is None
+    assert cache.get("FAKE", loader) is None
+    assert len(calls) == 2
+
+def test_get_many_fetches_only_misses():
+    """Test that batched lookups only load symbols that are not cached."""
+    cache = QuoteCache(ttl=60, maxsize=10)
+    cache.set("AAPL", 1.0)
+    requested = []
+
+    def loader(symbols):
+        requested.append(list(symbols))
+        return {symbol: 2.0 for symbol in symbols}
+
+    prices = cache.get_many(["AAPL", "MSFT", "NVDA", "MSFT"], loader)
+    assert prices == {"AAPL": 1.0, "MSFT": 2.0, "NVDA": 2.0}
+    assert requested == [["MSFT", "NVDA"]]
+
+def test_single_flight():
+    """Test that concurrent lookups for one symbol share a single fetch."""
+    cache = QuoteCache(ttl=60, maxsize=10)
+    calls = []
+
+    def slow_loader(symbol):
+        calls.append(symbol)
+        time.sleep(0.2)
+        return 42.0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("AAPL", slow_loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["AAPL"]
+    assert results == [42.0] * 8
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] + stats["coalesced"] == 7
+
+if __name__ == "__main__":
+    test_ttl_expiry_and_counters()
+    test_per_key_ttl()
+    test_lru_eviction()
+    test_failed_loads_are_not_cached()
+    test_get_many_fetches_only_misses()
+    test_single_flight()
@@ -0,0 +1,111 @@
+"""
+Test module for the search context shared by a batch run of the news agent.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from agents.search_context import SearchContext, open_context, get_context, close_context
+from agents.web_fetch import FetchCancelled
+
+def test_queries_and_pages_are_reused():
+    """Test that a query or page fetched for one symbol is reused by the others."""
+    context = SearchContext()
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        return [{"href": "https://example.com/chips"}]
+
+    first = context.search("semiconductor demand", search)
+    assert context.search("  Semiconductor   DEMAND ", search) is first
+    assert calls == ["semiconductor demand"]
+
+    pages = []
+    assert context.page("https://example.com/chips", lambda url: pages.append(url) or "text") == "text"
+    assert context.page("https://example.com/chips", lambda url: pages.append(url) or "other") == "text"
+    assert pages == ["https://example.com/chips"]
+    print(f"Search context stats: {context.stats()}")
+    assert context.stats() == {'query_hits': 1, 'query_misses': 1, 'page_hits': 1, 'page_misses': 1}
+
+def test_concurrent_lookups_share_one_fetch():
+    """Test that parallel branches asking for the same page wait for one download."""
+    context = SearchContext()
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        time.sleep(0.1)
+        return "text"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(context.page("https://example.com", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["https://example.com"]
+    assert results == ["text"] * 5
+
+def test_failed_fetch_releases_waiters():
+    """Test that an exception in a fetch is raised to its caller and the key can be retried."""
+    context = SearchContext()
+
+    def fail(query):
+        raise RuntimeError("rate limited")
+
+    try:
+        context.search("chips", fail)
+        assert False, "expected the fetch error"
+    except RuntimeError:
+        pass
+    assert context.search("chips", lambda query: ["ok"]) == ["ok"]
+
+def test_cancelled_waiter_stops_waiting():
+    """Test that a caller waiting for another symbol's download gives up once its own search is cancelled."""
+    context = SearchContext()
+    release = threading.Event()
+
+    def slow(url):
+        release.wait(5)
+        return "text"
+
+    owner = threading.Thread(target=lambda: context.page("https://example.com", slow))
+    owner.start()
+    time.sleep(0.05)
+
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    started = time.perf_counter()
+    try:
+        context.page("https://example.com", slow, cancel)
+        assert False, "expected the wait to be cancelled"
+    except FetchCancelled:
+        pass
+    assert time.perf_counter() - started < 1.0
+
+    # The owner's download still completes and is shared with later lookups
+    release.set()
+    owner.join()
+    assert context.page("https://example.com", lambda url: "other") == "text"
+
+def test_contexts_are_registered_per_batch():
+    """Test opening, looking up and closing the context of a batch run."""
+    batch_id = open_context()
+    context = get_context(batch_id)
+    assert isinstance(context, SearchContext)
+    assert get_context(None) is None
+    assert close_context(batch_id) is context
+    assert get_context(batch_id) is None
+
+if __name__ == "__main__":
+    test_queries_and_pages_are_reused()
+    test_concurrent_lookups_share_one_fetch()
+    test_failed_fetch_releases_waiters()
+    test_cancelled_waiter_stops_waiting()
+    test_contexts_are_registered_per_batch()
@@ -0,0 +1,103 @@
+"""
+Test module for the SQLite storage backend.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils import storage
+from app.utils.sqlite_store import SQLiteStore, migrate_json_tree
+
+PORTFOLIO = [
+    {"company_name": "Apple Inc.", "stock_code": "AAPL", "quantity": 10, "purchase_price": 150.0,
+     "current_price": None, "notes": {"lot": 1}},
+    {"stock_code": "MSFT", "quantity": 2.5, "purchase_price": 300}
+]
+NEWS = {"last_updated": "2025-10-07T10:00:00", "news_items": {"AAPL": [{"headline": "Up"}], "MSFT": []}}
+
+def test_documents_round_trip():
+    """Test that portfolios, news and plain documents read back unchanged, with versions."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users = Path(tmp) / "users"
+        store = SQLiteStore(Path(tmp) / "trading.db", users)
+        profile = {"name": "alice", "meta": {}}
+
+        store.write(users / "alice" / "portfolio.json", PORTFOLIO)
+        store.write(users / "alice" / "stock_news.json", NEWS)
+        store.write(users / "alice" / "profile.json", profile)
+        store.write(Path(tmp) / "holdings_index.json", {"users": {}})
+
+        assert store.read(users / "alice" / "portfolio.json") == PORTFOLIO
+        assert store.read(users / "alice" / "stock_news.json") == NEWS
+        assert store.read(users / "alice" / "profile.json") == profile
+        assert store.read(Path(tmp) / "holdings_index.json") == {"users": {}}
+        assert store.read(users / "bob" / "portfolio.json") is None
+        # Integer and float quantities keep their JSON type
+        assert type(store.read(users / "alice" / "portfolio.json")[0]["quantity"]) is int
+
+        store.write(users / "alice" / "portfolio.json", PORTFOLIO[1:])
+        assert store.read(users / "alice" / "portfolio.json") == PORTFOLIO[1:]
+        assert store.version(users / "alice" / "portfolio.json") == 2
+        assert not store.write(users / "alice" / "portfolio.json", PORTFOLIO, expected_version=1)
+        assert store.read(users / "alice" / "portfolio.json") == PORTFOLIO[1:]
+        assert store.user_versions("portfolio.json") == {"alice": 2}
+        assert store.holders("MSFT") == {"alice"} and store.holders("AAPL") == set()
+        store.close()
+
+def test_apply_prices_in_one_statement():
+    """Test the fleet-wide revaluation matches the fields Portfolio.revalue writes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users = Path(tmp) / "users"
+        store = SQLiteStore(Path(tmp) / "trading.db", users)
+        store.write(users / "alice" / "portfolio.json", PORTFOLIO)
+        store.write(users / "bob" / "portfolio.json", [{"stock_code": "AAPL", "quantity": 1, "purchase_price": 200.0}])
+        store.write(users / "carol" / "portfolio.json", [{"stock_code": "NVDA", "quantity": 1, "purchase_price": 100.0}])
+
+        assert store.symbol_last_updated()["alice"] == {"AAPL": None, "MSFT": None}
+        assert store.apply_prices({"AAPL": 160.0, "NVDA": None}, "2025-10-07T12:00:00") == 2
+
+        alice = store.read(users / "alice" / "portfolio.json")
+        assert alice[0]["current_price"] == 160.0 and alice[0]["value"] == 1600.0
+        assert alice[0]["total_return"] == 100.0 and alice[0]["percent_return"] == 6.67
+        assert alice[0]["notes"] == {"lot": 1}
+        assert "current_price" not in alice[1], "unquoted symbols are left alone"
+        assert store.read(users / "bob" / "portfolio.json")[0]["percent_return"] == -20.0
+        assert store.version(users / "carol" / "portfolio.json") == 1
+        assert store.symbol_last_updated()["bob"] == {"AAPL": "2025-10-07T12:00:00"}
+        store.close()
+
+def test_migrate_json_tree():
+    """Test migrating a JSON user tree and reading it through the storage API."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "json_users"
+        (source / "alice").mkdir(parents=True)
+        (source / "alice" / "portfolio.json").write_text(json.dumps(PORTFOLIO))
+        (source / "alice" / "stock_news.json").write_text(json.dumps(NEWS))
+        (source / "alice" / "profile.json").write_text(json.dumps({"name": "alice"}))
+
+        store = SQLiteStore(Path(tmp) / "trading.db", storage.BASE)
+        counts = migrate_json_tree(store, source)
+        print(f"Migration: {counts}")
+        assert counts == {"users": 1, "documents": 3, "holdings": 2, "errors": 0}
+
+        backend, previous = storage.BACKEND, storage._store
+        storage.BACKEND, storage._store = "sqlite", store
+        try:
+            assert storage.exists(storage.user_dir("alice") / "profile.json")
+            assert storage.read_json(storage.user_dir("alice") / "portfolio.json") == PORTFOLIO
+            assert storage.user_versions("portfolio.json") == {"alice": 1}
+            storage.write_json_with_lock(storage.user_dir("alice") / "profile.json", {"name": "alice", "meta": {}})
+            assert storage.version(storage.user_dir("alice") / "profile.json") == 2
+        finally:
+            storage.BACKEND, storage._store = backend, previous
+            store.close()
+
+if __name__ == "__main__":
+    test_documents_round_trip()
+    test_apply_prices_in_one_statement()
+    test_migrate_json_tree()
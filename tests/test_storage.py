@@ -2,13 +2,19 @@ import sys
 from pathlib import Path
 import json
 import os
+import tempfile
+import threading
+
+import pytest
 
 # Add the project root directory to sys.path to resolve imports
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
 # Import directly from the utils directory
-from app.utils.storage import user_dir, write_json_with_lock, read_json
+from app.utils import storage
+from app.utils.storage import user_dir, write_json_with_lock, read_json, read_cache, ReadCache
+from app.utils.storage import read_versioned, compare_and_swap, transaction, ConflictError
 
 def test_json_operations():
     """Test the JSON read/write operations with locking"""
@@ -21,18 +27,24 @@ def test_json_operations():
         "created_at": "2025-10-07T10:20:00"
     }
     
-    # Get user directory
-    user_path = user_dir(test_user)
-    
-    # Path for test file
-    test_file = user_path / "profile.json"
-    
-    # Write data with lock
-    write_json_with_lock(test_file, test_data)
-    print(f"✓ Successfully wrote data to {test_file}")
-    
-    # Read data back
-    read_data = read_json(test_file)
+    # Get user directory, in a throwaway user tree so the tracked sample users are left alone
+    previous_base = storage.BASE
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.BASE = Path(tmp) / "users"
+        try:
+            user_path = user_dir(test_user)
+            
+            # Path for test file
+            test_file = user_path / "profile.json"
+            
+            # Write data with lock
+            write_json_with_lock(test_file, test_data)
+            print(f"✓ Successfully wrote data to {test_file}")
+            
+            # Read data back
+            read_data = read_json(test_file)
+        finally:
+            storage.BASE = previous_base
     
     # Verify data matches
     if read_data == test_data:
@@ -45,5 +57,117 @@ def test_json_operations():
         print(f"Read: {read_data}")
         return False
 
+def test_read_cache(monkeypatch):
+    """Test that unchanged files are not parsed again and changes are always seen"""
+    parsed = []
+    real_parse = storage._parse
+
+    def counting_parse(f):
+        parsed.append(f.name)
+        return real_parse(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "portfolio.json"
+        write_json_with_lock(path, [{"stock_code": "AAPL", "quantity": 10}])
+        monkeypatch.setattr(storage, "_parse", counting_parse)
+        first = read_json(path)
+        second = read_json(path)
+        assert len(parsed) == 1, "an unchanged file is parsed once"
+
+        # Callers get their own copies and cannot corrupt the cache
+        first[0]["quantity"] = 99
+        second.append({"stock_code": "MSFT"})
+        assert read_json(path) == [{"stock_code": "AAPL", "quantity": 10}]
+
+        # A write through storage is visible to the next read
+        write_json_with_lock(path, [{"stock_code": "NVDA", "quantity": 1}])
+        assert read_json(path) == [{"stock_code": "NVDA", "quantity": 1}]
+
+        # So is a change made outside the storage layer
+        with path.open("w", encoding="utf-8") as f:
+            json.dump([], f)
+        assert read_json(path) == []
+        assert len(parsed) == 3
+    print(f"✓ Read cache stats: {read_cache.stats()}")
+
+def test_read_cache_byte_bound():
+    """Test that the cache evicts least recently used files beyond its byte budget"""
+    cache = ReadCache(max_bytes=100)
+    cache.put(Path("a"), (1, 60, 1), {"a": 1})
+    cache.put(Path("b"), (1, 30, 2), {"b": 1})
+    assert cache.get(Path("a"), (1, 60, 1)) == {"a": 1}
+    cache.put(Path("c"), (1, 30, 3), {"c": 1})
+    assert cache.get(Path("b"), (1, 30, 2)) is None, "b was least recently used"
+    assert cache.get(Path("a"), (2, 60, 1)) is None, "a changed on disk"
+    cache.put(Path("big"), (1, 500, 4), {"big": 1})
+    assert cache.stats()["bytes"] <= 100
+    print(f"✓ Byte-bounded cache stats: {cache.stats()}")
+
+def test_compare_and_swap():
+    """Test that a write based on a stale read is rejected"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "portfolio.json"
+        assert read_versioned(path) == (None, None)
+        assert compare_and_swap(path, [1], None), "create if it does not exist"
+        data, version = read_versioned(path)
+        write_json_with_lock(path, [1, 2])
+        assert not compare_and_swap(path, data + [3], version), "stale version"
+        data, version = read_versioned(path)
+        assert compare_and_swap(path, data + [3], version)
+        assert read_json(path) == [1, 2, 3]
+
+def test_transaction_retries_without_lost_updates():
+    """Test that concurrent read-modify-write transactions retry instead of overwriting each other"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "counter.json"
+        write_json_with_lock(path, {"count": 0})
+
+        def increment():
+            for _ in range(20):
+                for txn in transaction(path, retries=100):
+                    txn.data["count"] += 1
+                    txn.commit(txn.data)
+
+        threads = [threading.Thread(target=increment) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert read_json(path) == {"count": 120}
+
+        # A writer that slips in between read and commit forces a retry on fresh data
+        attempts = []
+        for txn in transaction(path):
+            attempts.append(txn.data["count"])
+            if len(attempts) == 1:
+                write_json_with_lock(path, {"count": 500})
+            txn.data["count"] += 1
+            txn.commit(txn.data)
+        assert attempts == [120, 500]
+        assert read_json(path) == {"count": 501}
+
+        # A document that does not exist yet is created from the data passed to commit
+        new_path = Path(tmp) / "portfolio.json"
+        for txn in transaction(new_path):
+            assert txn.data is None
+            portfolio = txn.data or []
+            portfolio.append({"stock_code": "AAPL"})
+            txn.commit(portfolio)
+        assert read_json(new_path) == [{"stock_code": "AAPL"}]
+
+        # Every attempt conflicting raises instead of writing stale data
+        try:
+            for txn in transaction(path, retries=1):
+                write_json_with_lock(path, {"count": 0})
+                txn.commit(txn.data)
+            assert False, "expected ConflictError"
+        except ConflictError:
+            print("✓ Transaction gave up after repeated conflicts")
+
 if __name__ == "__main__":
     test_json_operations()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_read_cache(monkeypatch)
+    test_read_cache_byte_bound()
+    test_compare_and_swap()
+    test_transaction_retries_without_lost_updates()
@@ -0,0 +1,163 @@
+"""
+Test module for the invalid-symbol index.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.utils.symbol_index import SymbolIndex, symbol_index
+from app.utils.market_data import ReplayProvider, get_provider, set_provider
+from app.utils.finance import get_current_price, get_current_prices, get_recent_prices, validate_symbol
+from app.utils import storage
+from app.utils.storage import user_dir, read_json
+from app.utils.sqlite_store import SQLiteStore
+from app.src.portfolio_updater import add_holding
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def test_backoff_schedule():
+    """Test that retries back off exponentially and a success clears the entry."""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        index = SymbolIndex(Path(tmp) / "index.json", base_backoff=60, max_backoff=200, clock=clock)
+
+        waits = []
+        for _ in range(4):
+            index.record_invalid("FAKE")
+            waits.append(index.status("FAKE")["next_retry"] - clock.now)
+        assert waits == [60, 120, 200, 200]
+        assert index.is_known_bad("FAKE")
+
+        clock.now += 200
+        assert not index.is_known_bad("FAKE"), "symbol should be due for a retry"
+        index.record_valid("FAKE")
+        assert index.status("FAKE") is None
+
+def test_persistence_and_outage():
+    """Test that entries survive a restart and an all-failed batch is not recorded."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "index.json"
+        SymbolIndex(path).record_results({"AAPL": 101.0, "FAKE": None})
+
+        reloaded = SymbolIndex(path)
+        assert reloaded.partition(["AAPL", "FAKE"]) == (["AAPL"], ["FAKE"])
+
+        reloaded.record_results({"MSFT": None, "GOOG": None})
+        assert reloaded.status("MSFT") is None
+
+def test_persistence_with_sqlite_backend():
+    """Test that the index is stored in the database with the sqlite backend and read back by a new instance."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteStore(Path(tmp) / "trading.db", Path(tmp) / "users")
+        backend, previous = storage.BACKEND, storage._store
+        storage.BACKEND, storage._store = "sqlite", store
+        try:
+            path = Path(tmp) / "symbol_index" / "replay.json"
+            SymbolIndex(path).record_invalid("FAKE")
+            assert not path.exists(), "the index belongs in the database"
+            assert SymbolIndex(path).is_known_bad("FAKE")
+
+            # Another instance's writes are picked up through the document version
+            index = SymbolIndex(path)
+            assert index.is_known_bad("FAKE")
+            SymbolIndex(path).record_valid("FAKE")
+            assert not index.is_known_bad("FAKE")
+        finally:
+            storage.BACKEND, storage._store = backend, previous
+            store.close()
+
+def test_lookups_short_circuit():
+    """Test that known-bad symbols no longer reach the provider."""
+    previous_provider, previous_path = get_provider(), symbol_index.path
+    provider = ReplayProvider(invalid_symbols=["FAKE"])
+    set_provider(provider)
+    with tempfile.TemporaryDirectory() as tmp:
+        symbol_index.path = Path(tmp) / "index.json"
+        try:
+            prices = get_current_prices(["AAPL", "FAKE"])
+            assert prices["FAKE"] is None and prices["AAPL"] is not None
+            assert symbol_index.is_known_bad("FAKE")
+
+            requests = provider.requests
+            assert get_current_price("FAKE") is None
+            assert get_recent_prices("FAKE") == []
+            assert get_current_prices(["FAKE"]) == {"FAKE": None}
+            assert provider.requests == requests
+            print(f"✓ FAKE skipped, retry at {symbol_index.status('FAKE')['next_retry']:.0f}")
+        finally:
+            symbol_index.path = previous_path
+            set_provider(previous_provider)
+
+class FlakyProvider(ReplayProvider):
+    """Replay provider whose requests for some symbols fail the way a dropped connection does."""
+
+    def __init__(self, unreachable, **kwargs):
+        super().__init__(**kwargs)
+        self.unreachable = set(unreachable)
+
+    def get_quote(self, symbol):
+        if symbol in self.unreachable:
+            raise ConnectionError(f"connection reset fetching {symbol}")
+        return super().get_quote(symbol)
+
+def test_single_symbol_failure_is_not_recorded():
+    """Test that a failed request for one symbol does not mark it invalid, while a not-found answer does."""
+    previous_provider, previous_path = get_provider(), symbol_index.path
+    provider = FlakyProvider(unreachable=["MSFT"], invalid_symbols=["FAKE"])
+    set_provider(provider)
+    with tempfile.TemporaryDirectory() as tmp:
+        symbol_index.path = Path(tmp) / "index.json"
+        try:
+            assert not validate_symbol("MSFT")
+            assert symbol_index.status("MSFT") is None
+            assert not validate_symbol("FAKE")
+            assert symbol_index.is_known_bad("FAKE")
+
+            # Once the connection is back the symbol is looked up again right away
+            provider.unreachable.clear()
+            assert validate_symbol("MSFT")
+        finally:
+            symbol_index.path = previous_path
+            set_provider(previous_provider)
+
+def test_add_holding_validates_symbol():
+    """Test that holdings are only added for symbols that can be priced."""
+    previous_provider, previous_path = get_provider(), symbol_index.path
+    set_provider(ReplayProvider(invalid_symbols=["FAKE"]))
+    previous_base = storage.BASE
+    username = "symbol_index_test"
+    with tempfile.TemporaryDirectory() as tmp:
+        symbol_index.path = Path(tmp) / "index.json"
+        # A throwaway user tree, outside the shared holdings index
+        storage.BASE = Path(tmp) / "users"
+        try:
+            assert not add_holding(username, "FAKE", 5, 10.0)
+            assert add_holding(username, "aapl", 10, 100.0, "Apple Inc.")
+            assert add_holding(username, "AAPL", 10, 200.0)
+
+            portfolio = read_json(user_dir(username) / "portfolio.json")
+            # Each purchase is its own lot
+            assert [stock["stock_code"] for stock in portfolio] == ["AAPL", "AAPL"]
+            assert [(stock["quantity"], stock["purchase_price"]) for stock in portfolio] == [(10, 100.0), (10, 200.0)]
+            assert portfolio[1]["company_name"] == "Apple Inc."
+        finally:
+            storage.BASE = previous_base
+            symbol_index.path = previous_path
+            set_provider(previous_provider)
+
+if __name__ == "__main__":
+    test_backoff_schedule()
+    test_persistence_and_outage()
+    test_persistence_with_sqlite_backend()
+    test_lookups_short_circuit()
+    test_single_symbol_failure_is_not_recorded()
+    test_add_holding_validates_symbol()
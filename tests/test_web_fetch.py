@@ -0,0 +1,125 @@
+"""
+Test module for concurrent page fetching, against a local HTTP server.
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path to allow importing app modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from agents.web_fetch import fetch_pages, fetch_page_text
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serves /fast/<name> after a short delay and trickles /slow/<name> for seconds."""
+    protocol_version = "HTTP/1.1"
+    ports = []
+    slow_finished = []
+
+    def do_GET(self):
+        PageHandler.ports.append(self.client_address[1])
+        name = self.path.rsplit("/", 1)[-1]
+        if self.path.startswith("/fast/"):
+            time.sleep(0.3)
+            body = f"<html><body><p>Article {name}</p><div>menu</div></body></html>".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith("/slow/"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(100 * 1024 * 1024))
+            self.end_headers()
+            started = time.monotonic()
+            try:
+                while time.monotonic() - started < 10:
+                    self.wfile.write(b"<p>" + b"x" * 20000 + b"</p>")
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            PageHandler.slow_finished.append(time.monotonic() - started)
+            self.close_connection = True
+        else:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def _serve():
+    PageHandler.ports = []
+    PageHandler.slow_finished = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_pages_are_fetched_concurrently():
+    """Test that five slow pages take about as long as one."""
+    server, base = _serve()
+    try:
+        urls = [f"{base}/fast/{i}" for i in range(5)]
+        started = time.perf_counter()
+        texts = fetch_pages(urls, min_pages=5, deadline=5)
+        elapsed = time.perf_counter() - started
+        print(f"Fetched {len(texts)} pages in {elapsed:.2f} s")
+        assert list(texts) == urls
+        assert texts[urls[2]] == "Article 2"
+        assert elapsed < 1.2
+    finally:
+        server.shutdown()
+
+def test_stragglers_are_cancelled():
+    """Test that the search returns once enough pages arrived and stops slow downloads."""
+    server, base = _serve()
+    try:
+        urls = [f"{base}/slow/a", f"{base}/fast/1", f"{base}/error/x", f"{base}/fast/2", f"{base}/slow/b"]
+        started = time.perf_counter()
+        texts = fetch_pages(urls, min_pages=2, deadline=5)
+        elapsed = time.perf_counter() - started
+        assert list(texts) == [f"{base}/fast/1", f"{base}/fast/2"]
+        assert elapsed < 1.5
+
+        # The slow downloads were dropped long before the server finished sending them
+        deadline = time.monotonic() + 3
+        while len(PageHandler.slow_finished) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        print(f"Slow downloads ended after {PageHandler.slow_finished} s")
+        assert len(PageHandler.slow_finished) == 2
+        assert max(PageHandler.slow_finished) < 3
+    finally:
+        server.shutdown()
+
+def test_deadline_bounds_the_search():
+    """Test that a search returns at its deadline with whatever has arrived."""
+    server, base = _serve()
+    try:
+        started = time.perf_counter()
+        texts = fetch_pages([f"{base}/slow/a", f"{base}/slow/b"], deadline=0.5)
+        assert texts == {}
+        assert time.perf_counter() - started < 1.0
+    finally:
+        server.shutdown()
+
+def test_connections_are_reused():
+    """Test that consecutive fetches from one host share a pooled connection."""
+    server, base = _serve()
+    try:
+        for i in range(3):
+            assert fetch_page_text(f"{base}/fast/{i}") == f"Article {i}"
+        assert len(set(PageHandler.ports)) == 1
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_pages_are_fetched_concurrently()
+    test_stragglers_are_cancelled()
+    test_deadline_bounds_the_search()
+    test_connections_are_reused()
@@ -12,11 +12,13 @@ from pathlib import Path
 from datetime import datetime
 
 # Import utility modules
-from app.utils.storage import user_dir, read_json, write_json_with_lock
-from app.utils.finance import update_portfolio_prices
-from app.utils.news import get_news_for_stock
+from app.utils.storage import user_dir, read_json, write_json_with_lock, exists
+from app.utils.news import iter_news_for_stocks
 from app.utils.agent_adapter import ask_agent
-from app.src.portfolio_updater import update_portfolio_in_background
+from app.utils.portfolio import Portfolio
+from app.src.portfolio_updater import (update_portfolio_in_background, refresh_scheduler, add_holding,
+                                      due_symbols, symbol_last_updated)
+from app.utils.market_calendar import market_calendar
 
 # Set page configuration
 st.set_page_config(
@@ -37,8 +39,8 @@ if "show_chat" not in st.session_state:
 
 # Helper function to check if user exists
 def user_exists(username):
-    """Check if a user directory exists."""
-    return (user_dir(username) / "profile.json").exists()
+    """Check if a user profile exists."""
+    return exists(user_dir(username) / "profile.json")
 
 # Helper function to create a new user
 def create_user(username):
@@ -246,16 +248,55 @@ def show_portfolio_interface():
             except:
                 pass
         st.markdown(f"*Last updated: {last_updated}*")
+        # Freshness comes from the scheduler's status, which never starts a refresh
+        if refresh_scheduler.status(username)["running"]:
+            st.caption("Refreshing prices in the background...")
     with col2:
         if st.button("Update Prices", type="primary"):
-            with st.spinner("Updating prices..."):
-                success = update_portfolio_prices(username)
-                if success:
-                    st.success("Prices updated successfully!")
-                    # Reload portfolio with updated prices
-                    portfolio = load_user_portfolio(username)
+            # The refresh only fetches symbols the market calendar marks as due
+            if portfolio and not due_symbols(symbol_last_updated(portfolio)):
+                if market_calendar is not None and not market_calendar.is_open():
+                    st.info("Market closed, prices are current.")
                 else:
-                    st.error("Failed to update prices.")
+                    st.info("Prices are current.")
+            else:
+                with st.spinner("Updating prices..."):
+                    # Queue behind any running refresh instead of writing the portfolio concurrently
+                    refresh_scheduler.request(username, force=True)
+                    finished = refresh_scheduler.wait(username, timeout=60)
+                    if not finished:
+                        st.info("Still updating prices in the background, they will show up shortly.")
+                    elif refresh_scheduler.status(username)["last_success"]:
+                        st.success("Prices updated successfully!")
+                        # Reload portfolio with updated prices
+                        portfolio = load_user_portfolio(username)
+                    else:
+                        st.error("Failed to update prices.")
+    
+    # Add holding form; the symbol is validated before anything is written
+    with st.expander("➕ Add Holding", expanded=not portfolio):
+        with st.form("add_holding_form", clear_on_submit=True):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                stock_code = st.text_input("Symbol", placeholder="AAPL")
+            with col2:
+                company_name = st.text_input("Company (optional)")
+            with col3:
+                quantity = st.number_input("Quantity", min_value=0.0, value=1.0, step=1.0)
+            with col4:
+                purchase_price = st.number_input("Purchase Price", min_value=0.0, value=0.0, step=0.01)
+            submit_button = st.form_submit_button("Add")
+        
+        if submit_button:
+            if quantity <= 0:
+                st.error("Quantity must be greater than zero.")
+            elif add_holding(username, stock_code, quantity, purchase_price, company_name):
+                st.success(f"Added {quantity:g} {stock_code.strip().upper()} to your portfolio.")
+                # Price the new holding in the background and show it right away
+                refresh_scheduler.request(username, force=True)
+                portfolio = load_user_portfolio(username)
+            else:
+                st.error(f"Could not add {stock_code.strip().upper() or 'holding'}; check the symbol and try again.")
     
     # Portfolio Summary
     if not portfolio:
@@ -282,11 +323,11 @@ def show_portfolio_interface():
         
         df = pd.DataFrame(df_data)
         
-        # Calculate total portfolio value
-        total_value = sum(item.get('value', 0) for item in portfolio)
-        total_purchase = sum(item.get('purchase_price', 0) * item.get('quantity', 0) for item in portfolio)
-        total_return = total_value - total_purchase
-        total_return_percent = (total_return / total_purchase * 100) if total_purchase > 0 else 0
+        # Portfolio totals from the array-backed model
+        totals = Portfolio(portfolio).totals()
+        total_value = totals['value']
+        total_return = totals['total_return']
+        total_return_percent = totals['total_return_pct']
         
         # Portfolio metrics
         col1, col2, col3 = st.columns(3)
@@ -295,8 +336,7 @@ def show_portfolio_interface():
         with col2:
             st.metric("Total Return", f"${total_return:.2f}", f"{total_return_percent:.2f}%")
         with col3:
-            num_stocks = len(portfolio)
-            st.metric("Number of Holdings", f"{num_stocks}")
+            st.metric("Number of Holdings", f"{totals['holdings']}")
         
         # Display portfolio table
         st.markdown("### Holdings")
@@ -319,23 +359,27 @@ def show_portfolio_interface():
         if chart:
             st.altair_chart(chart, use_container_width=True)
         
-        # News section
+        # News section: lay out a placeholder per symbol first, then fill each one in
+        # as its news arrives (agent runs happen in parallel, up to NEWS_CONCURRENCY)
         st.markdown("### Latest News")
+        panels = {}
         for item in portfolio:
             symbol = item.get('stock_code')
-            if not symbol:
+            if not symbol or symbol in panels:
                 continue
                 
             company_name = item.get('company_name', symbol)
             st.markdown(f"#### {company_name} ({symbol})")
-            
-            news_items = get_news_for_stock(symbol, count=2)
-            for news in news_items:
-                with st.expander(f"{news['headline']} - {news['source']}"):
-                    st.markdown(f"*{news['date']}*")
-                    st.markdown(news['snippet'])
-            
+            panels[symbol] = st.empty()
+            panels[symbol].caption("Loading news...")
             st.markdown("---")
+        
+        for symbol, news_items in iter_news_for_stocks(panels, count=2):
+            with panels[symbol].container():
+                for news in news_items:
+                    with st.expander(f"{news['headline']} - {news['source']}"):
+                        st.markdown(f"*{news['date']}*")
+                        st.markdown(news['snippet'])
 
 # Chat interface
 def show_chat_interface():